@@ -0,0 +1,371 @@
+#!/usr/bin/env python
+"""
+Evaluation benchmark and memory profile of config.py, without qtile or a display.
+
+Evaluates config.py --runs times like qtile does when it starts, against
+fake_libqtile (or the installed libqtile with --real), with the helper
+modules next to it imported afresh every time. Every statement at the top
+level of config.py is timed and counted to a section by the names it
+uses, see SECTIONS; widgets includes init_screens, so building the widgets of
+every bar. It reports
+
+•   the wall time of the whole evaluation and of every section
+•   the memory every section leaves allocated, the peak and the number of
+    blocks still allocated afterwards, and the lines allocating the most,
+    from one more evaluation traced with tracemalloc
+•   the peak RSS of the process
+•   the number of qtile objects (Key, Group, DropDown, widgets, ...) the
+    configuration holds, and the hook callbacks it subscribes
+
+Compiling config.py is not measured, like with a cached .pyc.
+
+    python bench_config.py --runs 50
+    python bench_config.py --save baseline.json
+    python bench_config.py --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import ast
+import gc
+import getpass
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+# section -> names used by its statements, the first matching section wins
+SECTIONS = {
+    # preparing the spawn commands of the bindings and scratchpads
+    "launcher": {"launcher", "install_launcher"},
+    "scratchpads": {
+        "scratchpads",
+        "dropdowns",
+        "autostart_priorities",
+        "autostart_scratchpads",
+        "get_name",
+        "get_dropdown",
+        "get_dropdown_toggle_key",
+    },
+    "widgets": {
+        "colors",
+        "prompt",
+        "widget_defaults",
+        "extension_defaults",
+        "alternating_colors",
+        "powerline_separator",
+        "powerline_sections",
+        "powerline_specs",
+        "widget_specs",
+        "init_bar",
+        "init_screens",
+        "screens",
+        "screen_hotplug",
+        "follow_outputs",
+    },
+    "keys": {
+        "keys",
+        "mod",
+        "mouse",
+        "vim_down",
+        "vim_up",
+        "vim_left",
+        "vim_right",
+        "reloader",
+        "register_reloader",
+        "emacs_take",
+        "spares",
+        "start_spares",
+        "install_launcher",
+    },
+    "groups": {"groups", "left_keys", "right_keys", "group_keys"},
+    "layouts": {"layouts", "default_layout_theme", "default_margin"},
+    "floating rules": {"floating_layout", "index_window_rules"},
+}
+# modules next to config.py that are not imported again for every run
+KEPT = ("__main__", "bench_config", "fake_libqtile")
+# sections whose baseline p50 is below this are too noisy for --compare
+MIN_COMPARED = 0.2e-3
+# the qtile types counted, by module
+COUNTED = {
+    "libqtile.config": [
+        "Key", "KeyChord", "Group", "ScratchPad", "DropDown", "Match", "Screen", "Drag", "Click",
+    ],
+    "libqtile.lazy": ["LazyCall"],
+    "libqtile.bar": ["Bar"],
+}
+
+
+def section(statement: ast.stmt) -> str:
+    if isinstance(statement, (ast.Import, ast.ImportFrom)):
+        return "imports"
+    if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        names = {statement.name}
+    else:
+        names = {node.id for node in ast.walk(statement) if isinstance(node, ast.Name)}
+    for name, members in SECTIONS.items():
+        if names & members:
+            return name
+    return "other"
+
+
+def compile_config(path: str) -> list[tuple[str, types.CodeType]]:
+    """(section, code) of every top-level statement of the config file."""
+    with open(path) as file:
+        tree = ast.parse(file.read(), path)
+    return [
+        (section(statement), compile(ast.Module([statement], type_ignores=[]), path, "exec"))
+        for statement in tree.body
+    ]
+
+
+def forget_helpers():
+    """Drop config and the helper modules next to it, so that they are imported again."""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(path)) == HERE and name not in KEPT:
+            del sys.modules[name]
+    from libqtile import hook
+
+    hook.subscriptions.clear()
+
+
+def evaluate(path: str, statements: list, measure) -> types.ModuleType:
+    """Run the statements as module config, calling measure(section, run) around each."""
+    forget_helpers()
+    module = types.ModuleType("config")
+    module.__file__ = path
+    sys.modules["config"] = module
+    for name, code in statements:
+        measure(name, lambda: exec(code, module.__dict__))
+    return module
+
+
+def run_once(path: str, statements: list) -> dict:
+    sections: dict[str, float] = {}
+
+    def measure(name, run):
+        start = time.perf_counter()
+        run()
+        sections[name] = sections.get(name, 0.0) + time.perf_counter() - start
+
+    gc.collect()
+    start = time.perf_counter()
+    evaluate(path, statements, measure)
+    return {"wall": time.perf_counter() - start, "sections": sections}
+
+
+def trace_once(path: str, statements: list, top: int) -> dict:
+    """Evaluate once under tracemalloc and return what stayed allocated."""
+    retained: dict[str, int] = {}
+
+    def measure(name, run):
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        retained[name] = retained.get(name, 0) + tracemalloc.get_traced_memory()[0] - before
+
+    forget_helpers()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    module = evaluate(path, statements, measure)
+    peak = tracemalloc.get_traced_memory()[1]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    differences = [
+        difference
+        for difference in after.compare_to(before, "lineno")
+        if difference.size_diff > 0
+    ]
+    return {
+        "module": module,
+        "retained": sum(difference.size_diff for difference in differences),
+        "blocks": sum(difference.count_diff for difference in differences),
+        "peak": peak,
+        "sections": retained,
+        "lines": [
+            (str(difference.traceback[0]), difference.size_diff, difference.count_diff)
+            for difference in differences[:top]
+        ],
+    }
+
+
+def count_objects(module: types.ModuleType) -> dict[str, int]:
+    """The number of qtile objects reachable from the namespace of the configuration."""
+    from libqtile import layout
+    from libqtile.widget import base
+
+    types_ = [
+        getattr(sys.modules[name], type_name)
+        for name, type_names in COUNTED.items()
+        for type_name in type_names
+    ]
+    layouts = tuple(value for value in vars(layout).values() if isinstance(value, type))
+
+    def label(value):
+        if isinstance(value, base._Widget):
+            return "widget." + type(value).__name__
+        if isinstance(value, layouts):
+            return "layout." + type(value).__name__
+        for type_ in types_:
+            if isinstance(value, type_):
+                return type_.__name__
+        return None
+
+    counts: dict[str, int] = {}
+    seen: set[int] = set()
+    pending = list(vars(module).values())
+    while pending:
+        value = pending.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, (list, tuple, set, frozenset)):
+            pending.extend(value)
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif (name := label(value)) is not None:
+            counts[name] = counts.get(name, 0) + 1
+            pending.extend(vars(value).values())
+    return dict(sorted(counts.items()))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def distribution(values: list[float]) -> dict:
+    return {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "max": max(values)}
+
+
+def summarize(results: list[dict], traced: dict, rss: tuple[int, int]) -> dict:
+    from libqtile import hook
+
+    names = [name for name in [*SECTIONS, "imports", "other"] if name in results[0]["sections"]]
+    return {
+        "runs": len(results),
+        "wall": distribution([result["wall"] for result in results]),
+        "sections": {
+            name: distribution([result["sections"][name] for result in results]) for name in names
+        },
+        "retained": traced["retained"],
+        "blocks": traced["blocks"],
+        "peak": traced["peak"],
+        "section_retained": traced["sections"],
+        "lines": traced["lines"],
+        "rss_before": rss[0],
+        "rss_peak": rss[1],
+        "objects": count_objects(traced["module"]),
+        "hooks": sum(len(callbacks) for callbacks in hook.subscriptions.values()),
+    }
+
+
+def report(summary: dict):
+    wall = summary["wall"]
+    print(f"== config.py, {summary['runs']} runs")
+    print(
+        f"   wall time        p50 {wall['p50'] * 1000:8.2f}  p95 {wall['p95'] * 1000:8.2f}"
+        f"  max {wall['max'] * 1000:8.2f} ms"
+    )
+    print(
+        f"   allocated        {summary['retained'] / 1024:8.1f} KiB in {summary['blocks']} blocks,"
+        f" peak {summary['peak'] / 1024:.1f} KiB"
+    )
+    print(
+        f"   peak RSS         {summary['rss_peak'] / 1024:8.1f} MiB"
+        f" ({summary['rss_before'] / 1024:.1f} MiB before the first run)"
+    )
+    print(f"   {'section':<18}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'KiB':>9}")
+    for name, times in summary["sections"].items():
+        print(
+            f"   {name:<18}{times['p50'] * 1000:>9.2f}{times['p95'] * 1000:>9.2f}"
+            f"{times['max'] * 1000:>9.2f}{summary['section_retained'].get(name, 0) / 1024:>9.1f}"
+        )
+    print(f"   {'allocated by':<56}{'KiB':>9}{'blocks':>9}")
+    for line, size, count in summary["lines"]:
+        print(f"   {line[-55:]:<56}{size / 1024:>9.1f}{count:>9}")
+    print(f"   {'objects':<27}{'count':>6}")
+    for name, count in sorted(summary["objects"].items(), key=lambda item: (-item[1], item[0])):
+        print(f"   {name:<27}{count:>6}")
+    print(f"   {'hook callbacks':<27}{summary['hooks']:>6}")
+
+
+def compare(baseline: dict, summary: dict, tolerance: float) -> bool:
+    """Print regressions against baseline and return whether there were any."""
+    problems = []
+    times = [("total", baseline["wall"], summary["wall"])]
+    times += [
+        (name, before, summary["sections"][name])
+        for name, before in baseline["sections"].items()
+        if name in summary["sections"] and before["p50"] >= MIN_COMPARED
+    ]
+    for name, before, after in times:
+        if after["p50"] > before["p50"] * (1 + tolerance):
+            problems.append(f"{name} p50 {before['p50'] * 1000:.2f} -> {after['p50'] * 1000:.2f} ms")
+    for counter in ("retained", "peak"):
+        if summary[counter] > baseline[counter] * (1 + tolerance):
+            problems.append(
+                f"{counter} {baseline[counter] / 1024:.1f} -> {summary[counter] / 1024:.1f} KiB"
+            )
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    for name in sorted(set(baseline["objects"]) | set(summary["objects"])):
+        before, after = baseline["objects"].get(name, 0), summary["objects"].get(name, 0)
+        if before != after:
+            print(f"changed {name}: {before} -> {after}")
+    return bool(problems)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--config", default=os.path.join(HERE, "config.py"))
+    parser.add_argument(
+        "--real", action="store_true", help="use the installed libqtile instead of fake_libqtile"
+    )
+    parser.add_argument("--top", type=int, default=10, help="number of allocating lines to show")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="compare the results to this baseline file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative increase of the p50 times and the memory before --compare fails",
+    )
+    args = parser.parse_args()
+
+    if not args.real:
+        import fake_libqtile
+
+        fake_libqtile.install()
+    # the prompt of config.py shows the user
+    os.environ.setdefault("USER", getpass.getuser())
+
+    statements = compile_config(args.config)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results = [run_once(args.config, statements) for _ in range(args.runs)]
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    traced = trace_once(args.config, statements, args.top)
+    summary = summarize(results, traced, (rss_before, rss_peak))
+    report(summary)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(summary, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(json.load(file), summary, args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+"""
+Key-to-window latency benchmark for the qtile configuration.
+
+Starts Xvfb (or Xephyr inside the current X session with --nested) and
+qtile with config.py on it, then replays the key bindings with
+simulate_keypress. A probe loaded into qtile timestamps every key event
+and the hooks following it (new, mapped and focused windows, group and
+layout changes). For every binding it reports
+
+•   first: the time from the key event to the first hook
+•   settled: the time to the last hook, once none followed for --quiet
+    seconds, e.g. when the window of a spawned command is mapped and focused
+
+as percentiles over --runs presses. Before every press, windows opened by
+the previous one are closed again, shown scratchpads are hidden and the
+first group is shown on the first screen.
+
+Only the bindings acting on the windows, layouts and groups of the
+nested qtile are pressed, see COMMANDS and FUNCTIONS: the volume,
+brightness and media keys, menus and scratchpads run commands that act
+on the real machine. qtile is started with QTILE_NO_AUTOSTART set, so
+config.py does not start the autostart applications and scratchpads.
+
+    python bench_keys.py --runs 10
+    python bench_keys.py --match 'Terminal|scratchpad' --nested
+    python bench_keys.py --save baseline.json
+    python bench_keys.py --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import ast
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# the commands of the bindings that are pressed, every command of a
+# binding has to be one of them
+COMMANDS = {
+    "down",
+    "up",
+    "next",
+    "previous",
+    "normalize",
+    "next_layout",
+    "kill",
+    "togroup",
+    "toscreen",
+    "toggle_floating",
+    "toggle_fullscreen",
+}
+# the functions of lazy.function bindings that are pressed, by qualified name
+FUNCTIONS = {
+    # group_switch
+    "_switch",
+    # layout_dispatch
+    "_dispatch",
+    # a terminal or Emacs frame from the spare pool, on the nested display
+    "Spares.take",
+}
+HOOKS = [
+    "client_new",
+    "client_managed",
+    "client_focus",
+    "focus_change",
+    "setgroup",
+    "layout_change",
+    "current_screen_change",
+    "float_change",
+]
+
+# the probe, running inside qtile
+
+_events: list[tuple[str, float, int]] = []
+_marked: set[int] = set()
+
+
+def probe(qtile) -> str:
+    """Timestamp the key events and HOOKS of qtile, called through the eval command."""
+    from libqtile import hook
+
+    if getattr(qtile, "_bench_probe", False):
+        return "installed"
+    qtile._bench_probe = True
+    process_key_event = qtile.process_key_event
+
+    def key_event(keysym, mask):
+        _events.append(("key", time.monotonic(), 0))
+        return process_key_event(keysym, mask)
+
+    qtile.process_key_event = key_event
+    for name in HOOKS:
+
+        def record(*args, name=name):
+            window = args[0] if args and hasattr(args[0], "wid") else None
+            _events.append((name, time.monotonic(), window.wid if window else 0))
+
+        getattr(hook.subscribe, name)(record)
+    return "installed"
+
+
+def drain() -> list[tuple[str, float, int]]:
+    events = list(_events)
+    _events.clear()
+    return events
+
+
+def _command(command) -> tuple[str, str]:
+    """The name of command and the qualified name of the function it calls, if any."""
+    function = command.args[0] if command.name == "function" and command.args else None
+    return command.name, getattr(function, "__qualname__", "")
+
+
+def bindings(qtile) -> list[tuple[list[str], str, str, list[tuple[str, str]]]]:
+    """(modifiers, key, description, commands) of the key bindings of qtile, see _command."""
+    return [
+        (list(key.modifiers), key.key, key.desc, [_command(command) for command in key.commands])
+        for key in qtile.config.keys
+        if hasattr(key, "commands")
+    ]
+
+
+def reset(qtile) -> str:
+    """Close the windows opened since the last reset and show the first group."""
+    for window in list(qtile.windows_map.values()):
+        group = getattr(window, "group", None)
+        if window.wid in _marked or group is None:
+            continue
+        # spares and scratchpads stay, in hidden groups
+        if group.screen is not None:
+            window.kill()
+    for group in qtile.groups:
+        for dropdown in getattr(group, "dropdowns", {}).values():
+            dropdown.hide()
+    qtile.focus_screen(0)
+    qtile.groups[0].cmd_toscreen()
+    _marked.update(qtile.windows_map)
+    return "reset"
+
+
+# the harness
+
+
+class Qtile:
+    """A qtile process on its own X server, driven over IPC."""
+
+    def __init__(self, nested: bool, display: int, size: str):
+        from libqtile.command.client import InteractiveCommandClient
+        from libqtile.command.interface import IPCCommandInterface
+        from libqtile.ipc import Client
+
+        self.directory = tempfile.mkdtemp(prefix="qtile-bench-")
+        self.display = f":{display}"
+        if nested:
+            server = ["Xephyr", "-screen", size, "-ac", "-br", "-noreset"]
+        else:
+            server = ["Xvfb", "-screen", "0", f"{size}x24", "-nolisten", "tcp"]
+        self.processes = [subprocess.Popen([*server, self.display], stderr=subprocess.DEVNULL)]
+        self._wait(lambda: os.path.exists(f"/tmp/.X11-unix/X{display}"), "X server")
+
+        socket = os.path.join(self.directory, "socket")
+        environment = dict(os.environ, DISPLAY=self.display, QTILE_NO_AUTOSTART="1")
+        environment.pop("WAYLAND_DISPLAY", None)
+        self.processes.append(
+            subprocess.Popen(
+                [
+                    "qtile", "start", "-b", "x11", "-l", "WARNING",
+                    "-c", os.path.join(HERE, "config.py"), "-s", socket,
+                ],
+                env=environment,
+                stdout=subprocess.DEVNULL,
+                stderr=open(os.path.join(self.directory, "qtile.log"), "w"),
+            )
+        )
+        self._wait(lambda: os.path.exists(socket), "qtile")
+        self.client = InteractiveCommandClient(IPCCommandInterface(Client(socket)))
+        self._wait(self._responds, "qtile IPC")
+
+    def _wait(self, ready, name: str, timeout: float = 20):
+        deadline = time.monotonic() + timeout
+        while not ready():
+            if time.monotonic() > deadline or any(p.poll() is not None for p in self.processes):
+                self.close()
+                sys.exit(f"{name} did not start")
+            time.sleep(0.05)
+
+    def _responds(self) -> bool:
+        try:
+            return self.client.status() == "OK"
+        except Exception:
+            return False
+
+    def call(self, code: str):
+        """Run code of the probe inside qtile and return its result."""
+        success, result = self.client.eval(f"__import__('bench_keys').{code}")
+        if not success:
+            raise RuntimeError(result)
+        return ast.literal_eval(result) if result and result[0] in "[({" else result
+
+    def settle(self, quiet: float, timeout: float) -> list[tuple[str, float, int]]:
+        """Collect events until none arrived for quiet seconds."""
+        events = []
+        last = start = time.monotonic()
+        while time.monotonic() - last < quiet and time.monotonic() - start < timeout:
+            time.sleep(0.02)
+            new = self.call("drain()")
+            if new:
+                events.extend(new)
+                last = time.monotonic()
+        return events
+
+    def close(self):
+        for process in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def press(
+    qtile: Qtile, modifiers: list[str], key: str, between: float, quiet: float, timeout: float
+) -> dict:
+    qtile.call("reset(self)")
+    # e.g. until the spare pool was refilled
+    qtile.settle(between, 60)
+    qtile.client.simulate_keypress(modifiers, key)
+    events = qtile.settle(quiet, timeout)
+    keys = [timestamp for name, timestamp, _ in events if name == "key"]
+    hooks = [(name, timestamp) for name, timestamp, _ in events if name != "key"]
+    if not keys or not hooks:
+        return {"first": None, "settled": None, "hooks": []}
+    return {
+        "first": hooks[0][1] - keys[0],
+        "settled": hooks[-1][1] - keys[0],
+        "hooks": [name for name, _ in hooks],
+    }
+
+
+def pressable(commands: list[tuple[str, str]]) -> bool:
+    """Whether a binding only acts on the nested qtile, see COMMANDS and FUNCTIONS."""
+    return bool(commands) and all(
+        name in COMMANDS or (name == "function" and function in FUNCTIONS)
+        for name, function in commands
+    )
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(results: list[dict]) -> dict:
+    first = [result["first"] for result in results if result["first"] is not None]
+    settled = [result["settled"] for result in results if result["settled"] is not None]
+    summary = {"runs": len(results), "no_effect": len(results) - len(settled)}
+    for name, values in (("first", first), ("settled", settled)):
+        if values:
+            summary[name] = {
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": max(values),
+            }
+    hooks = [result["hooks"] for result in results if result["hooks"]]
+    summary["hooks"] = hooks[-1] if hooks else []
+    return summary
+
+
+def report(summaries: dict[str, dict]):
+    print(
+        f"{'binding':<40}{'runs':>5}{'none':>5}"
+        f"{'first p50':>11}{'settled p50':>13}{'p95':>9}{'max':>9}  (ms)"
+    )
+    for name, summary in summaries.items():
+        row = f"{name[:39]:<40}{summary['runs']:>5}{summary['no_effect']:>5}"
+        if "settled" in summary:
+            row += (
+                f"{summary['first']['p50'] * 1000:>11.2f}"
+                f"{summary['settled']['p50'] * 1000:>13.2f}"
+                f"{summary['settled']['p95'] * 1000:>9.2f}"
+                f"{summary['settled']['max'] * 1000:>9.2f}"
+            )
+        print(row)
+
+
+def compare(baseline: dict, summaries: dict[str, dict], tolerance: float) -> bool:
+    """Print regressions against baseline and return whether there were any."""
+    regressed = False
+    for name, summary in summaries.items():
+        before = baseline.get(name)
+        if before is None or "settled" not in before:
+            continue
+        if "settled" not in summary:
+            regressed = True
+            print(f"REGRESSION {name}: no longer has an effect")
+            continue
+        for statistic in ("p50", "p95"):
+            old, new = before["settled"][statistic], summary["settled"][statistic]
+            if new > old * (1 + tolerance):
+                regressed = True
+                print(f"REGRESSION {name}: settled {statistic} {old * 1000:.2f} -> {new * 1000:.2f} ms")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--match", help="only press bindings whose description or keys match")
+    parser.add_argument("--nested", action="store_true", help="use Xephyr instead of Xvfb")
+    parser.add_argument("--display", type=int, default=99)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--startup", type=float, default=5, help="seconds of quiet after startup")
+    parser.add_argument(
+        "--between", type=float, default=3, help="seconds of quiet after a reset, before a press"
+    )
+    parser.add_argument("--quiet", type=float, default=0.3, help="seconds without hooks ending a press")
+    parser.add_argument("--timeout", type=float, default=10, help="maximum seconds per press")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="compare the results to this baseline file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative increase of the settled p50 and p95 before --compare fails",
+    )
+    args = parser.parse_args()
+
+    qtile = Qtile(args.nested, args.display, args.size)
+    try:
+        qtile.call("probe(self)")
+        # wait for the spares
+        qtile.settle(args.startup, 120)
+        summaries = {}
+        for modifiers, key, description, commands in qtile.call("bindings(self)"):
+            binding = "-".join([*modifiers, key])
+            name = f"{binding} {description}".strip()
+            if not pressable(commands) or (args.match and not re.search(args.match, name)):
+                continue
+            results = [
+                press(qtile, modifiers, key, args.between, args.quiet, args.timeout) for _ in range(args.runs)
+            ]
+            summaries[name] = summarize(results)
+        qtile.call("reset(self)")
+    finally:
+        qtile.close()
+
+    report(summaries)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(summaries, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(json.load(file), summaries, args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
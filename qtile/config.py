@@ -1,14 +1,28 @@
 import os
 import re
 import socket
-import subprocess
-import asyncio
 from libqtile import qtile
 from libqtile.config import Click, Drag, Group, KeyChord, Key, Match, Screen, ScratchPad, DropDown
 from libqtile.lazy import lazy
 from libqtile import layout, bar, widget, hook
 from typing import List  # noqa: F401from typing import List  # noqa: F401
 
+import group_switch
+import hotplug
+import launcher
+import layout_dispatch
+import match_index
+import mirror
+import partial_reload
+import powerline
+import profiling
+import sampler
+import scheduler
+import scratchpad_autostart
+import spare_pool
+import supervisor
+import windowname
+
 mod = "mod4"               # Sets mod key to SUPER/WINDOWS
 my_term = "alacritty"      # My terminal of choice
 my_browser = "firefox"     # My browser of choice
@@ -70,6 +84,12 @@ groups = [
 
 keys = []
 
+reloader = partial_reload.Reloader(__file__, after=["index_window_rules"])
+
+@hook.subscribe.startup
+def register_reloader():
+    reloader.register_commands(qtile)
+
 keys.extend([
     ### The essentials
     Key([mod], "Tab",
@@ -84,6 +104,10 @@ keys.extend([
         lazy.restart(),
         desc='Restart Qtile'
         ),
+    Key([mod], "F5",
+        lazy.function(lambda qtile: reloader.reload(qtile)),
+        desc='Apply changed keys, groups, layouts and rules'
+        ),
     Key([mod, "shift"], "Escape",
         lazy.shutdown(),
         desc='Shutdown Qtile'
@@ -101,16 +125,13 @@ for monitor, group_keys in enumerate([left_keys, right_keys]):
             # move to group
                Key(
                   [mod], key,
-                  lazy.to_screen(monitor),
-                  lazy.group[key].toscreen(),
+                  group_switch.switch(monitor, key),
                   desc="Move to group",
                ),
             # move to group with current window
                Key(
                   [mod, "shift"], key,
-                  lazy.window.togroup(key),
-                  lazy.to_screen(monitor),
-                  lazy.group[key].toscreen(),
+                  group_switch.switch(monitor, key, move_window=True),
                   desc="Move to group with current window",
                ),
             # move only current window
@@ -133,33 +154,25 @@ keys.extend(
         Key(
             [mod, "shift"],
             vim_down,
-            lazy.layout.shuffle_down(),
-            lazy.layout.section_down(),
+            layout_dispatch.chain("shuffle_down", "section_down"),
             desc="Move windows down in current stack",
         ),
         Key(
             [mod, "shift"],
             vim_up,
-            lazy.layout.shuffle_up(),
-            lazy.layout.section_up(),
+            layout_dispatch.chain("shuffle_up", "section_up"),
             desc="Move windows up in current stack",
         ),
         Key(
             [mod],
             vim_left,
-            lazy.layout.grow_right(),
-            lazy.layout.grow(),
-            lazy.layout.increase_ratio(),
-            lazy.layout.delete(),
+            layout_dispatch.chain("grow_right", "grow", "increase_ratio", "delete"),
             desc="Resize left",
         ),
         Key(
             [mod],
             vim_right,
-            lazy.layout.grow_left(),
-            lazy.layout.shrink(),
-            lazy.layout.decrease_ratio(),
-            lazy.layout.add(),
+            layout_dispatch.chain("grow_left", "shrink", "decrease_ratio", "add"),
             desc="Resize right",
         ),
         Key(
@@ -173,8 +186,7 @@ keys.extend(
         Key(
             [mod, "shift"],
             "Tab",
-            lazy.layout.rotate(),
-            lazy.layout.flip(),
+            layout_dispatch.chain("rotate", "flip"),
             desc="Switch which side main pane occupies (XmonadTall)",
         ),
         Key(
@@ -192,6 +204,27 @@ keys.extend(
     ]
 )
 
+layout_dispatch.report(keys, layouts)
+
+emacs_take = (
+    "emacsclient -e '(let ((frame (seq-find (lambda (frame) "
+    "(equal (frame-parameter frame (quote name)) \"{tag}\")) (frame-list)))) "
+    "(select-frame-set-input-focus frame) "
+    "(set-frame-parameter frame (quote name) nil) "
+    "{command})'"
+)
+
+spares = spare_pool.Spares(
+    [
+        spare_pool.Pool("term", f"{my_term} --class {{tag}},Alacritty", size=2),
+        spare_pool.Pool("emacs", "emacsclient -c -F '((name . \"{tag}\"))'", on_take=emacs_take),
+    ]
+)
+
+@hook.subscribe.startup_complete
+def start_spares():
+    spares.start(qtile)
+
 keys.extend(
     [
         Key([], "Print",
@@ -201,16 +234,24 @@ keys.extend(
             lazy.spawn("pavucontrol"),
             desc="PulseAudio-Control"),
         Key([mod], "Return",
-            lazy.spawn(my_term),
+            lazy.function(spares.take, "term", my_term),
             desc="Terminal"),
         Key([mod], "a",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(org-agenda-list)'"),
+            lazy.function(
+                spares.take, "emacs",
+                "emacsclient -c -a 'emacs' --eval '(org-agenda-list)'",
+                command="(org-agenda-list)",
+            ),
             desc="Launch Emacs"),
         Key([mod], "b",
             lazy.spawn(my_browser),
             desc="Internet Browser"),
         Key([mod], "f",
-            lazy.spawn("emacsclient -c -a 'emacs' --eval '(+default/dired nil)'"),
+            lazy.function(
+                spares.take, "emacs",
+                "emacsclient -c -a 'emacs' --eval '(+default/dired nil)'",
+                command="(+default/dired nil)",
+            ),
             desc="File-Manager"),
         Key(["control", "shift"], "Escape",
             lazy.spawn("plasma-systemmonitor"),
@@ -302,17 +343,31 @@ scratchpads.append(
     }
 )
 
+autostart_priorities = {
+    # GTD files first
+    "i": 0,
+    "g": 0,
+    "t": 0,
+    "a": 1,
+    "c": 1,
+    "Return": 2,
+    "v": 2,
+    # the browser last
+    "b": 3,
+}
+
 @hook.subscribe.startup_complete
 async def autostart_scratchpads():
-    await asyncio.sleep(2)
-
-    for scratchpad in scratchpads:
-        # skip nixos rebuild for obvious reasons
-        # and mail, as it will require the unlocking of my password manager
-        if scratchpad["key"] in ["m", "r"]:
-            continue
-
-        qtile.cmd_simulate_keypress(["mod1", "mod4"], scratchpad["key"])
+    if os.environ.get("QTILE_NO_AUTOSTART"):
+        return
+    await scratchpad_autostart.autostart(
+        qtile,
+        [
+            (autostart_priorities[scratchpad["key"]], get_name(scratchpad["key"], scratchpad["cmd"]))
+            for scratchpad in scratchpads
+            if scratchpad["key"] in autostart_priorities
+        ],
+    )
 
 def get_name(key: str, cmd: str) -> str:
     return f"{cmd}+{key} scratchpad"
@@ -367,6 +422,12 @@ def get_dropdown_toggle_key(
 
 keys.extend([get_dropdown_toggle_key(**kwargs) for kwargs in scratchpads])
 
+launcher.LAUNCHER.prepare(keys, [scratchpad["cmd"] for scratchpad in scratchpads])
+
+@hook.subscribe.startup
+def install_launcher():
+    launcher.LAUNCHER.install(qtile)
+
 colors = {
     "background":          ["#242730", "#242730"], # panel background
     "active_background":   ["#3d3f4b", "#434758"], # background for current screen tab
@@ -395,26 +456,146 @@ class alternating_colors():
         self.count += 1
         return self.color_options[self.count % len(self.color_options)]
 
-def init_widgets(show_systray=True):
-    widgets = [
-        widget.Sep(
+powerline_separator = dict(
+    text='',
+    font = "UbuntuMono Nerd Font",
+    padding = -4,
+    fontsize = 37,
+)
+
+powerline_sections = [
+    # network
+    [
+        (sampler.Net, dict(
+            interface = "default",
+            format = '{interface} {down} ↓↑ {up}',
+            padding = 5
+        )),
+    ],
+    # updates
+    # [
+    #     (widget.TextBox, dict(
+    #         text = " ⟳",
+    #         padding = 2,
+    #         fontsize = 14
+    #     )),
+    #     (widget.CheckUpdates, dict(
+    #         update_interval = 1800,
+    #         distro = "Arch_checkupdates",
+    #         display_format = "Updates: {updates} ",
+    #         colour_have_updates = colors["active_foreground"],
+    #         colour_no_updates = colors["active_foreground"],
+    #         mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn(my_term + ' -e yay -Syu')},
+    #         padding = 5,
+    #     )),
+    # ],
+    # cpu
+    [
+        (sampler.CPU, dict(
+            format = 'CPU: {load_percent:4.1f}%',
+            padding = 5
+        )),
+        (widget.TextBox, dict(
+            text='|',
+            font = "UbuntuMono Nerd Font",
+            padding = -4,
+            fontsize = 30,
+        )),
+        (sampler.ThermalSensor, dict(
+            tag_sensor = "Package id 0",
+            threshold = 90,
+            padding = 5
+        )),
+    ],
+    # GPU
+    # [
+    #     (widget.NvidiaSensors, dict(
+    #         format = 'GPU: {temp}°C',
+    #         padding = 5
+    #     )),
+    # ],
+    # memory
+    [
+        (widget.TextBox, dict(
+            text = " ",
+            padding = 5,
+            fontsize = 13
+        )),
+        (sampler.Memory, dict(
+            format = '{MemUsed: 3.0f}{mm} /{MemTotal: 3.0f}{mm}',
+            mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn(my_term + ' -e htop')},
+            padding = 7
+        )),
+    ],
+    # volume
+    [
+        (widget.TextBox, dict(
+            text = " Vol:",
+            padding = 0
+        )),
+        (scheduler.Volume, dict(
+            padding = 5
+        )),
+    ],
+    # current layout
+    [
+        (widget.CurrentLayoutIcon, dict(
+            custom_icon_paths = [os.path.expanduser("~/.config/qtile/icons")],
+            foreground = colors["background"],
+            padding = 0,
+            scale = 0.7
+        )),
+        (widget.CurrentLayout, dict(
+            padding = 5
+        )),
+    ],
+    # current date / time
+    [
+        (scheduler.Clock, dict(
+            format = "%A, %B %d - %H:%M "
+        )),
+    ],
+]
+
+def powerline_specs(sections):
+    specs = []
+    col_gen = alternating_colors()
+    bg_color = colors["background"]
+    for section in sections:
+        old_bg_color, bg_color = bg_color, col_gen.get()
+        specs.append((powerline.Separator, dict(
+            background = old_bg_color,
+            foreground = bg_color,
+            **powerline_separator,
+        )))
+        for widget_class, settings in section:
+            specs.append((widget_class, {
+                "foreground": colors["active_foreground"],
+                "background": bg_color,
+                **settings,
+            }))
+    return specs
+
+def widget_specs(show_systray=True):
+    specs = [
+        (widget.Sep, dict(
             linewidth = 0,
             padding = 6,
             foreground = colors["active_foreground"],
             background = colors["background"]
-        ),
-        widget.Image(
+        )),
+        (widget.Image, dict(
             filename = "~/.config/qtile/icons/python-white.png",
             scale = "False",
             mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn(my_term)}
-        ),
-        widget.Sep(
+        )),
+        (widget.Sep, dict(
             linewidth = 0,
             padding = 6,
             foreground = colors["active_foreground"],
             background = colors["background"]
-        ),
-        widget.GroupBox(
+        )),
+        (widget.GroupBox, dict(
             font = "Ubuntu, Bold",
             fontsize = 9,
             margin_y = 3,
@@ -434,14 +615,14 @@ def init_widgets(show_systray=True):
             foreground = colors["active_foreground"],
             background = colors["background"],
             visible_groups = left_keys,
-        ),
-        widget.Sep(
+        )),
+        (widget.Sep, dict(
             linewidth = 1,
             padding = 5,
             foreground = colors["inactive_foreground"],
             background = colors["background"]
-        ),
-        widget.GroupBox(
+        )),
+        (widget.GroupBox, dict(
             font = "Ubuntu, Bold",
             fontsize = 9,
             margin_y = 3,
@@ -461,263 +642,67 @@ def init_widgets(show_systray=True):
             foreground = colors["active_foreground"],
             background = colors["background"],
             visible_groups = right_keys,
-        ),
-        widget.Prompt(
+        )),
+        (widget.Prompt, dict(
             prompt = prompt,
             font = "UbuntuMono Nerd Font",
             padding = 10,
             foreground = colors["active_accent"],
             background = colors["active_background"]
-        ),
-        widget.Sep(
+        )),
+        (widget.Sep, dict(
             linewidth = 0,
             padding = 20,
             foreground = colors["active_foreground"],
             background = colors["background"]
-        ),
-        widget.WindowName(
+        )),
+        (windowname.WindowName, dict(
             foreground = colors["window_foreground"],
             background = colors["background"],
             padding = 0
-        ),
-        widget.Systray(
+        )),
+        (widget.Systray, dict(
             background = colors["background"],
             padding = 5
-        ) if show_systray else None,
-        widget.Sep(
+        )) if show_systray else None,
+        (widget.Sep, dict(
             linewidth = 0,
             padding = 6,
             foreground = colors["background"],
             background = colors["background"]
-        ) if show_systray else None,
+        )) if show_systray else None,
     ]
 
-    # powerline: network
-    col_gen = alternating_colors()
-    old_bg_color = colors["background"]
-    bg_color = col_gen.get()
-    widgets.extend([
-        widget.TextBox(
-            text='',
-            font = "UbuntuMono Nerd Font",
-            background = old_bg_color,
-            foreground = bg_color,
-            padding = -4,
-            fontsize = 37,
-        ),
-        widget.Net(
-            interface = "enp3s0",
-            format = '{down} ↓↑ {up}',
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            padding = 5
-        ),
-    ])
-
-    # powerline: updates
-    # old_bg_color = bg_color
-    # bg_color = col_gen.get()
-    # widgets.extend([
-    #     widget.TextBox(
-    #         text='',
-    #         font = "UbuntuMono Nerd Font",
-    #         background = old_bg_color,
-    #         foreground = bg_color,
-    #         padding = 0,
-    #         fontsize = 37,
-    #     ),
-    #     widget.TextBox(
-    #         text = " ⟳",
-    #         padding = 2,
-    #         foreground = colors["active_foreground"],
-    #         background = bg_color,
-    #         fontsize = 14
-    #     ),
-    #     widget.CheckUpdates(
-    #         update_interval = 1800,
-    #         distro = "Arch_checkupdates",
-    #         display_format = "Updates: {updates} ",
-    #         foreground = colors["active_foreground"],
-    #         colour_have_updates = colors["active_foreground"],
-    #         colour_no_updates = colors["active_foreground"],
-    #         mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn(my_term + ' -e yay -Syu')},
-    #         padding = 5,
-    #         background = bg_color
-    #     ),
-    # ])
-
-    # powerline: cpu
-    old_bg_color, bg_color = bg_color, col_gen.get()
-    widgets.extend([
-        widget.TextBox(
-            text='',
-            font = "UbuntuMono Nerd Font",
-            background = old_bg_color,
-            foreground = bg_color,
-            padding = -4,
-            fontsize = 37,
-        ),
-        widget.CPU(
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            format = 'CPU: {load_percent:4.1f}%',
-            padding = 5
-        ),
-        widget.TextBox(
-            text='|',
-            font = "UbuntuMono Nerd Font",
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            padding = -4,
-            fontsize = 30,
-        ),
-        widget.ThermalSensor(
-            tag_sensor = "Package id 0",
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            threshold = 90,
-            padding = 5
-        ),
-    ])
-
-    # powerline: GPU
-    # old_bg_color = bg_color
-    # bg_color = col_gen.get()
-    # widgets.extend([
-    #     widget.TextBox(
-    #         text='',
-    #         font = "UbuntuMono Nerd Font",
-    #         background = old_bg_color,
-    #         foreground = bg_color,
-    #         padding = -4,
-    #         fontsize = 37,
-    #     ),
-    #     widget.NvidiaSensors(
-    #         foreground = colors["active_foreground"],
-    #         background = bg_color,
-    #         format = 'GPU: {temp}°C',
-    #         padding = 5
-    #     ),
-    # ])
+    specs.extend(powerline_specs(powerline_sections))
 
+    return list(filter(None, specs))
 
-    # powerline: memory
-    old_bg_color, bg_color = bg_color, col_gen.get()
-    widgets.extend([
-        widget.TextBox(
-            text='',
-            font = "UbuntuMono Nerd Font",
-            background = old_bg_color,
-            foreground = bg_color,
-            padding = -4,
-            fontsize = 37,
-        ),
-        widget.TextBox(
-            text = " ",
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            padding = 5,
-            fontsize = 13
-        ),
-        widget.Memory(
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            format = '{MemUsed: 3.0f}{mm} /{MemTotal: 3.0f}{mm}',
-            mouse_callbacks = {'Button1': lambda: qtile.cmd_spawn(my_term + ' -e htop')},
-            padding = 7
-        ),
-    ])
-
-    # powerline: volume
-    old_bg_color = bg_color
-    bg_color = col_gen.get()
-    widgets.extend([
-        widget.TextBox(
-            text='',
-            font = "UbuntuMono Nerd Font",
-            background = old_bg_color,
-            foreground = bg_color,
-            padding = -4,
-            fontsize = 37,
-        ),
-        widget.TextBox(
-            text = " Vol:",
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            padding = 0
-        ),
-        widget.Volume(
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            padding = 5
-        ),
-    ])
-
-    # powerline: current layout
-    old_bg_color = bg_color
-    bg_color = col_gen.get()
-    widgets.extend([
-        widget.TextBox(
-            text='',
-            font = "UbuntuMono Nerd Font",
-            background = old_bg_color,
-            foreground = bg_color,
-            padding = -4,
-            fontsize = 37,
-        ),
-        widget.CurrentLayoutIcon(
-            custom_icon_paths = [os.path.expanduser("~/.config/qtile/icons")],
-            foreground = colors["background"],
-            background = bg_color,
-            padding = 0,
-            scale = 0.7
-        ),
-        widget.CurrentLayout(
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            padding = 5
-        ),
-    ])
-
-    # powerline: current date / time
-    old_bg_color = bg_color
-    bg_color = col_gen.get()
-    widgets.extend([
-        widget.TextBox(
-            text='',
-            font = "UbuntuMono Nerd Font",
-            background = old_bg_color,
-            foreground = bg_color,
-            padding = -4,
-            fontsize = 37,
-        ),
-        widget.Clock(
-            foreground = colors["active_foreground"],
-            background = bg_color,
-            format = "%A, %B %d - %H:%M "
-        ),
-    ])
+mirrored_widgets = mirror.Mirrored(
+    per_screen=(
+        widget.GroupBox,
+        widget.Prompt,
+        widget.WindowName,
+        widget.Systray,
+        widget.CurrentLayout,
+        widget.CurrentLayoutIcon,
+    )
+)
 
+def init_bar(show_systray):
+    widgets = mirrored_widgets.build(widget_specs(show_systray=show_systray))
+    return bar.Bar(widgets=widgets, opacity=0.8, size=20)
 
-    return list(filter(None, widgets))
+def init_screens():
+    return [Screen(top=init_bar(show_systray=False)), Screen(top=init_bar(show_systray=True))]
 
-def init_widgets_screen1():
-    widgets_screen1 = init_widgets(show_systray=False)
-    return widgets_screen1
+screen_hotplug = hotplug.Screens(init_bar)
 
-def init_widgets_screen2():
-    widgets_screen2 = init_widgets(show_systray=True)
-    return widgets_screen2
-
-def init_screens():
-    return [Screen(top=bar.Bar(widgets=init_widgets_screen1(), opacity=0.8, size=20)),
-        Screen(top=bar.Bar(widgets=init_widgets_screen2(), opacity=0.8, size=20))]
+@hook.subscribe.startup
+def follow_outputs():
+    screen_hotplug.start(qtile)
 
 if __name__ in {"config", "__main__"}:
     screens = init_screens()
-    # widgets = init_widgets()
-    widgets_screen1 = init_widgets_screen1()
-    widgets_screen2 = init_widgets_screen2()
 
 mouse = [
     Drag([mod], "Button1", lazy.window.set_position_floating(),
@@ -732,7 +717,7 @@ follow_mouse_focus = False
 bring_front_click = False
 cursor_warp = True
 
-floating_layout = layout.Floating(
+floating_layout = match_index.Floating(
     float_rules=[
         # Run the utility of `xprop` to see the wm class and name of an X client.
         # default_float_rules include: utility, notification, toolbar, splash, dialog,
@@ -747,37 +732,77 @@ floating_layout = layout.Floating(
 )
 auto_fullscreen = True
 focus_on_window_activation = "smart"
-reconfigure_screens = True
+# done by screen_hotplug
+reconfigure_screens = False
 
 # If things like steam games want to auto-minimize themselves when losing
 # focus, should we respect this or not?
 auto_minimize = False
 
+
+@hook.subscribe.startup
+def index_window_rules():
+    match_index.register_commands(
+        qtile, {"groups": match_index.install(qtile), "floating": floating_layout.index}
+    )
+
+@hook.subscribe.startup
+def start_profiler():
+    profiling.PROFILER.register_commands(qtile)
+    if os.environ.get("QTILE_PROFILE"):
+        profiling.PROFILER.enable(qtile)
+
+autostart_supervisor = supervisor.Supervisor()
+
+
 @hook.subscribe.startup_once
-def autostart():
-    applications = []
+async def autostart():
+    autostart_supervisor.register_commands(qtile)
+    if os.environ.get("QTILE_NO_AUTOSTART"):
+        return
+    services = []
     if qtile.core.name == "x11":
-        applications.extend(
+        services.extend(
             [
-                [
-                    "feh",
-                    "--bg-fill",
-                    f"{HOME}/Pictures/Wallpaper/ultrawide.jpg",
-                    "--bg-fill",
-                    f"{HOME}/Pictures/Wallpaper/normal.png",
-                ],
-                ["element-desktop"],
-                ["discord"],
+                supervisor.Service(
+                    "wallpaper",
+                    [
+                        "feh",
+                        "--bg-fill",
+                        f"{HOME}/Pictures/Wallpaper/ultrawide.jpg",
+                        "--bg-fill",
+                        f"{HOME}/Pictures/Wallpaper/normal.png",
+                    ],
+                    ready=supervisor.exited(),
+                ),
+                supervisor.Service("element", ["element-desktop"], stage=1, nice=10, idle_io=True),
+                supervisor.Service("discord", ["discord"], stage=1, nice=10, idle_io=True),
             ]
         )
 
     elif qtile.core.name == "wayland":
-        subprocess.run([HOME + "/.config/qtile/autostart_wayland.sh"])
-
-    if applications:
-        for application in applications:
-            subprocess.Popen(application)
+        services.extend(
+            [
+                # gnome authentication agent
+                supervisor.Service(
+                    "polkit",
+                    ["/usr/lib/polkit-gnome/polkit-gnome-authentication-agent-1"],
+                    restart=True,
+                ),
+                # clipboard
+                supervisor.Service("clipboard", ["wl-clipboard"], restart=True),
+                # enable numlock by default
+                supervisor.Service("numlock", ["numlockx", "on"], ready=supervisor.exited()),
+                # connect to vpn on startup
+                supervisor.Service("vpn", ["mullvad", "connect"], stage=1, ready=supervisor.exited()),
+                # kde-connect for connection with android phones
+                # supervisor.Service("kdeconnect", ["kdeconnect-indicator"], stage=1, restart=True),
+                # supervisor.Service("thunderbird", ["thunderbird"], stage=2, nice=10, idle_io=True),
+                # supervisor.Service("signal", ["signal-desktop"], stage=2, nice=10, idle_io=True),
+            ]
+        )
 
+    await autostart_supervisor.start(services)
 
 # XXX: Gasp! We're lying here. In fact, nobody really uses or cares about this
 # string besides java UI toolkits; you can see several discussions on the
@@ -0,0 +1,551 @@
+"""
+A stand-in for the part of libqtile that config.py uses while it is evaluated.
+
+qtile itself needs cairo, pango and xcffib even to import its widgets,
+which a plain Linux machine often lacks. install() puts modules named
+libqtile, libqtile.config, libqtile.lazy, libqtile.layout, libqtile.bar,
+libqtile.widget, libqtile.hook and the few others config.py and its
+helper modules import into sys.modules, so the configuration can be
+evaluated without qtile and without a display:
+
+    fake_libqtile.install()
+    import config
+    print(len(config.keys))
+
+The classes take the arguments of their qtile 0.22 counterparts and keep
+them the same way (Configurable objects in _user_config, lazy calls with
+their selectors, name and arguments), but nothing is ever drawn, grabbed
+or run. Widgets config.py uses that are not defined here are created as
+plain text boxes on first use.
+"""
+
+import copy
+import logging
+import sys
+import types
+from typing import Any, Callable, Optional
+
+
+# the hooks of qtile 0.22
+HOOKS = [
+    "startup_once",
+    "startup",
+    "startup_complete",
+    "shutdown",
+    "restart",
+    "setgroup",
+    "addgroup",
+    "delgroup",
+    "changegroup",
+    "focus_change",
+    "float_change",
+    "group_window_add",
+    "client_new",
+    "client_managed",
+    "client_killed",
+    "client_focus",
+    "client_mouse_enter",
+    "client_name_updated",
+    "client_urgent_hint_changed",
+    "layout_change",
+    "net_wm_icon_change",
+    "selection_notify",
+    "selection_change",
+    "screen_change",
+    "screens_reconfigured",
+    "current_screen_change",
+    "enter_chord",
+    "leave_chord",
+    "resume",
+]
+
+# the commands of the layouts, which layout_dispatch looks for
+BASE_COMMANDS = ("info", "next", "previous", "up", "down")
+MONAD_COMMANDS = (
+    "flip", "grow", "grow_main", "left", "maximize", "normalize", "reset", "right",
+    "set_ratio", "shrink", "shrink_main", "shuffle_down", "shuffle_up", "swap",
+    "swap_left", "swap_main", "swap_right",
+)
+RATIOTILE_COMMANDS = ("decrease_ratio", "increase_ratio", "shuffle_down", "shuffle_up")
+
+
+def _module(name: str, **attributes) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+class Configurable:
+    global_defaults: dict = {}
+
+    def __init__(self, **config):
+        self._variable_defaults: dict = {}
+        self._user_config = config
+
+    def add_defaults(self, defaults):
+        self._variable_defaults.update((name, copy.copy(value)) for name, value, *_ in defaults)
+
+    def __getattr__(self, name):
+        if name == "_variable_defaults":
+            raise AttributeError(name)
+        for source in (self._user_config, self.global_defaults, self._variable_defaults):
+            if name in source:
+                setattr(self, name, source[name])
+                return source[name]
+        raise AttributeError(f"{type(self).__name__} has no attribute: {name}")
+
+
+# libqtile.lazy
+
+
+class LazyCall:
+    def __init__(self, selectors: list, name: str, args: tuple, kwargs: dict):
+        self._selectors = selectors
+        self._name = name
+        self._args = args
+        self._kwargs = kwargs
+        self._layouts: set = set()
+        self._when_floating = True
+
+    @property
+    def selectors(self) -> list:
+        return self._selectors
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def args(self) -> tuple:
+        return self._args
+
+    @property
+    def kwargs(self) -> dict:
+        return self._kwargs
+
+    def when(self, layout=None, when_floating=True, **kwargs) -> "LazyCall":
+        if layout is not None:
+            self._layouts = set(layout if isinstance(layout, (list, tuple)) else [layout])
+        self._when_floating = when_floating
+        return self
+
+
+class LazyCommandInterface:
+    def __init__(self, selectors: tuple = (), name: Optional[str] = None):
+        self._selectors = list(selectors)
+        self._name = name
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if self._name is None:
+            return LazyCommandInterface(self._selectors, name)
+        return LazyCommandInterface([*self._selectors, (self._name, None)], name)
+
+    def __getitem__(self, item):
+        return LazyCommandInterface([*self._selectors, (self._name, item)])
+
+    def __call__(self, *args, **kwargs) -> LazyCall:
+        return LazyCall(self._selectors, self._name, args, kwargs)
+
+
+# libqtile.config
+
+
+class Key:
+    def __init__(self, modifiers: list[str], key: str, *commands: LazyCall, desc: str = "", swallow=True):
+        self.modifiers = modifiers
+        self.key = key
+        self.commands = commands
+        self.desc = desc
+        self.swallow = swallow
+
+
+class KeyChord:
+    def __init__(
+        self,
+        modifiers: list[str],
+        key: str,
+        submappings: list,
+        mode: Any = False,
+        name: str = "",
+        desc: str = "",
+        swallow=True,
+    ):
+        self.modifiers = modifiers
+        self.key = key
+        self.submappings = submappings
+        self.mode = name if mode is True else mode
+        self.name = name
+        self.desc = desc
+        self.swallow = swallow
+
+
+class Mouse:
+    def __init__(self, modifiers: list[str], button: str, *commands: LazyCall):
+        self.modifiers = modifiers
+        self.button = button
+        self.commands = commands
+
+
+class Drag(Mouse):
+    def __init__(self, modifiers, button, *commands, start: Optional[LazyCall] = None, warp_pointer=False):
+        super().__init__(modifiers, button, *commands)
+        self.start = start
+        self.warp_pointer = warp_pointer
+
+
+class Click(Mouse):
+    pass
+
+
+class Match:
+    def __init__(
+        self,
+        title=None,
+        wm_class=None,
+        role=None,
+        wm_type=None,
+        wm_instance_class=None,
+        net_wm_pid=None,
+        func: Optional[Callable] = None,
+        wid=None,
+    ):
+        self._rules = {
+            name: value
+            for name, value in (
+                ("title", title),
+                ("wm_class", wm_class),
+                ("wm_instance_class", wm_instance_class),
+                ("wid", wid),
+                ("net_wm_pid", None if net_wm_pid is None else int(net_wm_pid)),
+                ("func", func),
+                ("role", role),
+                ("wm_type", wm_type),
+            )
+            if value is not None
+        }
+
+    def __repr__(self) -> str:
+        return "<Match %s>" % self._rules
+
+
+class Rule:
+    def __init__(self, match, group=None, float=False, intrusive=False, break_on_match=True):
+        self.matchlist = match if isinstance(match, list) else [match]
+        self.group = group
+        self.float = float
+        self.intrusive = intrusive
+        self.break_on_match = break_on_match
+
+
+class Group:
+    def __init__(
+        self,
+        name: str,
+        matches=None,
+        exclusive=False,
+        spawn=None,
+        layout=None,
+        layouts=None,
+        persist=True,
+        init=True,
+        layout_opts=None,
+        screen_affinity=None,
+        position=sys.maxsize,
+        label=None,
+    ):
+        self.name = name
+        self.label = label
+        self.exclusive = exclusive
+        self.spawn = spawn
+        self.layout = layout
+        self.layouts = layouts or []
+        self.persist = persist
+        self.init = init
+        self.matches = matches or []
+        self.layout_opts = layout_opts or {}
+        self.screen_affinity = screen_affinity
+        self.position = position
+
+
+class ScratchPad(Group):
+    def __init__(self, name: str, dropdowns=None, position=sys.maxsize, label="", single=False):
+        Group.__init__(self, name, layout="floating", init=False, position=position, label=label)
+        self.dropdowns = dropdowns if dropdowns is not None else []
+        self.single = single
+
+
+class DropDown(Configurable):
+    defaults = [
+        ("x", 0.1, ""),
+        ("y", 0.0, ""),
+        ("width", 0.8, ""),
+        ("height", 0.35, ""),
+        ("opacity", 0.9, ""),
+        ("on_focus_lost_hide", True, ""),
+        ("warp_pointer", True, ""),
+        ("match", None, ""),
+    ]
+
+    def __init__(self, name: str, cmd: str, **config):
+        Configurable.__init__(self, **config)
+        self.name = name
+        self.command = cmd
+        self.add_defaults(DropDown.defaults)
+
+
+class Screen:
+    def __init__(
+        self, top=None, bottom=None, left=None, right=None, x=None, y=None, width=None, height=None, **config
+    ):
+        self.top, self.bottom, self.left, self.right = top, bottom, left, right
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.group = None
+
+    @property
+    def gaps(self) -> list:
+        return [gap for gap in (self.top, self.bottom, self.left, self.right) if gap is not None]
+
+
+# libqtile.layout
+
+
+def _layout_class(name: str, commands: tuple, base: type = Configurable) -> type:
+    def __init__(self, **config):
+        Configurable.__init__(self, **config)
+        self.name = name.lower()
+
+    attributes = {"__init__": __init__, "__module__": "libqtile.layout"}
+    attributes.update((f"cmd_{command}", lambda self: None) for command in (*BASE_COMMANDS, *commands))
+    return type(name, (base,), attributes)
+
+
+MonadTall = _layout_class("MonadTall", MONAD_COMMANDS)
+MonadWide = _layout_class("MonadWide", (), MonadTall)
+MonadThreeCol = _layout_class("MonadThreeCol", (), MonadTall)
+RatioTile = _layout_class("RatioTile", RATIOTILE_COMMANDS)
+Max = _layout_class("Max", ())
+
+
+class Floating(Configurable):
+    default_float_rules = [
+        Match(wm_type="utility"),
+        Match(wm_type="notification"),
+        Match(wm_type="toolbar"),
+        Match(wm_type="splash"),
+        Match(wm_type="dialog"),
+        Match(wm_class="file_progress"),
+        Match(wm_class="confirm"),
+        Match(wm_class="dialog"),
+        Match(wm_class="download"),
+        Match(wm_class="error"),
+        Match(wm_class="notification"),
+        Match(wm_class="splash"),
+        Match(wm_class="toolbar"),
+        Match(func=lambda c: c.has_fixed_size()),
+        Match(func=lambda c: c.has_fixed_ratio()),
+    ]
+
+    def __init__(self, float_rules=None, no_reposition_rules=None, **config):
+        Configurable.__init__(self, **config)
+        self.name = "floating"
+        self.float_rules = self.default_float_rules if float_rules is None else float_rules
+        self.no_reposition_rules = no_reposition_rules or []
+
+
+# libqtile.bar and libqtile.widget
+
+CALCULATED = "CALCULATED"
+STRETCH = "STRETCH"
+STATIC = "STATIC"
+
+
+class Bar(Configurable):
+    def __init__(self, widgets: list, size: int, **config):
+        Configurable.__init__(self, **config)
+        self.widgets = widgets
+        self.size = size
+        self.screen = None
+
+
+class _Widget(Configurable):
+    defaults = [("background", None, "")]
+
+    def __init__(self, length=CALCULATED, **config):
+        Configurable.__init__(self, **config)
+        self.add_defaults(_Widget.defaults)
+        self.length_type = length if length in (CALCULATED, STRETCH) else STATIC
+        self.length = 0 if length in (CALCULATED, STRETCH) else length
+        self.name = config.get("name", type(self).__name__.lower())
+        self.bar = None
+        self.qtile = None
+        self.configured = False
+
+    def finalize(self):
+        pass
+
+
+class _TextBox(_Widget):
+    defaults = [
+        ("font", "sans", ""),
+        ("fontsize", None, ""),
+        ("padding", None, ""),
+        ("foreground", "ffffff", ""),
+        ("fmt", "{}", ""),
+    ]
+
+    def __init__(self, text=" ", width=CALCULATED, **config):
+        _Widget.__init__(self, length=width, **config)
+        self.add_defaults(_TextBox.defaults)
+        self.text = text
+        self.layout = None
+
+
+class InLoopPollText(_TextBox):
+    defaults = [("update_interval", 600, "")]
+
+    def __init__(self, default_text="N/A", **config):
+        _TextBox.__init__(self, default_text, **config)
+        self.add_defaults(InLoopPollText.defaults)
+
+
+class ThreadPoolText(InLoopPollText):
+    pass
+
+
+def _widget_class(name: str, base: type = _TextBox, defaults: tuple = ()) -> type:
+    def __init__(self, *args, **config):
+        base.__init__(self, *args, **config)
+        self.add_defaults(defaults)
+
+    attributes = {"__init__": __init__, "__module__": "libqtile.widget", "defaults": list(defaults)}
+    return type(name, (base,), attributes)
+
+
+WIDGETS = {
+    "Clock": _widget_class("Clock", InLoopPollText, (("format", "%H:%M", ""), ("update_interval", 1.0, ""))),
+    "Volume": _widget_class(
+        "Volume",
+        _TextBox,
+        (
+            ("channel", "Master", ""),
+            ("update_interval", 0.2, ""),
+            ("get_volume_command", None, ""),
+            ("theme_path", None, ""),
+        ),
+    ),
+    "WindowName": _widget_class("WindowName", _TextBox, (("format", "{state}{name}", ""),)),
+    "GroupBox": _widget_class("GroupBox", _Widget, (("visible_groups", None, ""),)),
+    "Systray": _widget_class("Systray", _Widget, (("icon_size", 20, ""),)),
+    "Sep": _widget_class("Sep", _Widget, (("linewidth", 1, ""),)),
+    "Image": _widget_class("Image", _Widget, (("filename", None, ""),)),
+    "Prompt": _widget_class("Prompt", _TextBox, (("prompt", "{prompt}: ", ""),)),
+    "TextBox": _widget_class("TextBox"),
+}
+
+
+def _widget(name: str) -> type:
+    if name.startswith("__"):
+        raise AttributeError(name)
+    if name not in WIDGETS:
+        WIDGETS[name] = _widget_class(name)
+    return WIDGETS[name]
+
+
+# libqtile.hook
+
+
+class _Subscribe:
+    hooks = set(HOOKS)
+
+    def __init__(self, subscriptions: dict):
+        self._subscriptions = subscriptions
+
+    def __getattr__(self, name: str):
+        if name not in self.hooks:
+            raise AttributeError(name)
+
+        def subscribe(function):
+            callbacks = self._subscriptions.setdefault(name, [])
+            if function not in callbacks:
+                callbacks.append(function)
+            return function
+
+        return subscribe
+
+
+class _Unsubscribe(_Subscribe):
+    def __getattr__(self, name: str):
+        if name not in self.hooks:
+            raise AttributeError(name)
+        return lambda function: self._subscriptions.get(name, []).remove(function)
+
+
+def _hook_module() -> types.ModuleType:
+    subscriptions: dict[str, list] = {}
+    module = _module("libqtile.hook", subscriptions=subscriptions)
+    module.subscribe = _Subscribe(subscriptions)
+    module.unsubscribe = _Unsubscribe(subscriptions)
+    # nothing runs the hooks, config.py is only evaluated
+    module.fire = lambda event, *args, **kwargs: None
+    module._fire_async_event = lambda coroutine: coroutine.close()
+    return module
+
+
+def install() -> dict[str, types.ModuleType]:
+    """Put the fake modules into sys.modules, replacing a libqtile imported before."""
+    for name in list(sys.modules):
+        if name == "libqtile" or name.startswith("libqtile.") or name == "cairocffi":
+            del sys.modules[name]
+
+    placeholder = type("Unavailable", (), {})
+    modules = {
+        "libqtile": _module("libqtile", qtile=None, __path__=[]),
+        "libqtile.config": _module(
+            "libqtile.config",
+            Key=Key,
+            KeyChord=KeyChord,
+            Drag=Drag,
+            Click=Click,
+            Match=Match,
+            Rule=Rule,
+            Group=Group,
+            ScratchPad=ScratchPad,
+            DropDown=DropDown,
+            Screen=Screen,
+        ),
+        "libqtile.lazy": _module("libqtile.lazy", LazyCall=LazyCall, lazy=LazyCommandInterface()),
+        "libqtile.layout": _module(
+            "libqtile.layout",
+            MonadTall=MonadTall,
+            MonadWide=MonadWide,
+            MonadThreeCol=MonadThreeCol,
+            RatioTile=RatioTile,
+            Max=Max,
+            Floating=Floating,
+        ),
+        "libqtile.bar": _module(
+            "libqtile.bar", Bar=Bar, CALCULATED=CALCULATED, STRETCH=STRETCH, STATIC=STATIC
+        ),
+        "libqtile.widget": _module("libqtile.widget", __path__=[], __getattr__=_widget),
+        "libqtile.widget.base": _module(
+            "libqtile.widget.base",
+            _Widget=_Widget,
+            _TextBox=_TextBox,
+            InLoopPollText=InLoopPollText,
+            ThreadPoolText=ThreadPoolText,
+        ),
+        "libqtile.hook": _hook_module(),
+        "libqtile.log_utils": _module("libqtile.log_utils", logger=logging.getLogger("libqtile")),
+        "libqtile.pangocffi": _module("libqtile.pangocffi", patch_cairo_context=lambda context: context),
+        "cairocffi": _module(
+            "cairocffi", ImageSurface=placeholder, Context=placeholder, FORMAT_ARGB32=0
+        ),
+    }
+    for name, module in modules.items():
+        package, _, attribute = name.rpartition(".")
+        if package:
+            setattr(modules[package], attribute, module)
+        sys.modules[name] = module
+    return modules
@@ -0,0 +1,91 @@
+"""
+Switch screen and group (optionally taking the current window along) in one pass.
+
+The group bindings used to run to_screen, toscreen and togroup one after
+the other. Each of them lays out the groups it touches, focuses a window
+and fires setgroup, focus_change and layout_change, which makes the bars
+redraw, so a single keypress laid out and redrew everything two or three
+times. switch() runs the same steps, but while they run
+
+•   layout_all of every group only records that the group needs a layout
+•   hooks are collected, and of setgroup, focus_change,
+    current_screen_change, client_focus and layout_change (per group)
+    only the last one is kept
+•   window events are masked
+
+Afterwards every group still on a screen is laid out once, the current
+group last so that it gets the focus, and the collected hooks are fired
+once each, so the bars redraw once.
+"""
+
+import contextlib
+from typing import Iterator
+
+from libqtile import hook
+from libqtile.lazy import lazy
+
+# hooks of which only the last one matters
+COALESCED = {"setgroup", "focus_change", "current_screen_change", "client_focus"}
+
+
+@contextlib.contextmanager
+def deferred(qtile) -> Iterator[None]:
+    """Run the layout passes and hooks of the block once each, when it is done."""
+    layouts: dict = {}
+    events: dict = {}
+    fire = hook.fire
+
+    def defer_fire(event, *args, **kwargs):
+        if event in COALESCED:
+            key = event
+        elif event == "layout_change":
+            key = (event, id(args[1]))
+        else:
+            key = (event, len(events))
+        # a repeated hook moves to the position of its last occurrence
+        events.pop(key, None)
+        events[key] = (event, args, kwargs)
+
+    def defer_layout(group):
+        def layout_all(warp=False):
+            layouts[group] = layouts.get(group, False) or warp
+
+        return layout_all
+
+    for group in qtile.groups:
+        group.layout_all = defer_layout(group)
+    hook.fire = defer_fire
+    try:
+        with qtile.core.masked():
+            yield
+    finally:
+        hook.fire = fire
+        for group in qtile.groups:
+            vars(group).pop("layout_all", None)
+        current = qtile.current_group
+        ordered = sorted(layouts.items(), key=lambda item: item[0] is current)
+        for group, warp in ordered:
+            if group.screen is not None:
+                group.layout_all(warp)
+        for event, args, kwargs in events.values():
+            hook.fire(event, *args, **kwargs)
+
+
+def _switch(qtile, screen: int, name: str, move_window: bool):
+    group = qtile.groups_map.get(name)
+    if group is None:
+        return
+    with deferred(qtile):
+        if move_window and qtile.current_window is not None:
+            qtile.current_window.togroup(name)
+        qtile.focus_screen(screen)
+        group.cmd_toscreen()
+
+
+def switch(screen: int, name: str, move_window: bool = False):
+    """
+    A lazy call focusing screen and showing the group name on it, like
+    lazy.to_screen(screen) and lazy.group[name].toscreen(), taking the
+    current window along if move_window is set.
+    """
+    return lazy.function(_switch, screen, name, move_window)
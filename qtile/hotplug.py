@@ -0,0 +1,139 @@
+"""
+Reconfigure the screens when outputs change, keeping the bars of the outputs that stay.
+
+qtile pairs the n-th output with the n-th Screen of the config and gives
+outputs beyond them a Screen without a bar. A Screen whose output went
+away has its bar window killed and its widgets finalized, and if an
+output comes back at that index, the dead widgets are configured again
+but never updated. Screens replaces reconfigure_screens:
+
+•   the outputs are matched with the Screens they had before, by
+    geometry, then by size (a moved output), then by position (a rotated
+    one), so every surviving output keeps its bar, its widgets with their
+    timers, and its group
+•   only new outputs get a new bar from make_bar, and the Screens of
+    removed outputs are dropped for good. Bars mirroring widgets of a
+    removed bar (see mirror.py) get a new bar as well
+•   the RandR events of one change (autorandr sends several) are
+    debounced into one reconfiguration, whose layout passes and hooks
+    are run once each (see group_switch.deferred)
+
+make_bar(systray) is told whether the new bar should have the systray,
+which is the case if no other bar has one.
+"""
+
+import asyncio
+from typing import Callable, Optional
+
+from libqtile import bar, hook, widget
+from libqtile.config import Screen
+from libqtile.log_utils import logger
+
+import group_switch
+
+
+class Screens:
+    def __init__(self, make_bar: Callable[[bool], bar.Bar], debounce: float = 0.3):
+        self.make_bar = make_bar
+        self.debounce = debounce
+        self.qtile = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def start(self, qtile):
+        """Follow the outputs from now on, call in the startup hook."""
+        self.qtile = qtile
+        hook.subscribe.screen_change(self._on_screen_change)
+        qtile.cmd_reconfigure_screens_incrementally = self.reconfigure
+        # outputs beyond the configured screens started without a bar
+        if any(screen.top is None for screen in qtile.screens):
+            self.reconfigure()
+
+    def _on_screen_change(self, event=None):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.debounce, self.reconfigure)
+
+    def _outputs(self) -> list[tuple[int, int, int, int]]:
+        """The geometry of the outputs, in the order and with the aliasing of qtile."""
+        largest: dict[tuple[int, int], tuple[int, int]] = {}
+        for x, y, width, height in self.qtile.core.get_screen_info():
+            known = largest.get((x, y), (0, 0))
+            largest[(x, y)] = (max(known[0], width), max(known[1], height))
+        return [(x, y, width, height) for (x, y), (width, height) in largest.items()]
+
+    def _match(self, outputs: list[tuple]) -> list[Optional[Screen]]:
+        """The current Screen of every output, None for new outputs."""
+        remaining = list(self.qtile.screens)
+        matched: list[Optional[Screen]] = [None] * len(outputs)
+        keys = [
+            lambda geometry: geometry,
+            lambda geometry: geometry[2:],
+            lambda geometry: geometry[:2],
+            lambda geometry: geometry[2:][::-1],
+        ]
+        for key in keys:
+            for index, output in enumerate(outputs):
+                if matched[index] is not None:
+                    continue
+                for screen in remaining:
+                    if key((screen.x, screen.y, screen.width, screen.height)) == key(output):
+                        matched[index] = screen
+                        remaining.remove(screen)
+                        break
+        return matched
+
+    def _has_systray(self, screens) -> bool:
+        return any(
+            isinstance(item, widget.Systray)
+            for screen in screens
+            if screen is not None
+            for gap in screen.gaps
+            if isinstance(gap, bar.Bar)
+            for item in gap.widgets
+        )
+
+    def _kill_bars(self, screen):
+        for gap in screen.gaps:
+            if isinstance(gap, bar.Bar) and gap.window is not None:
+                gap.kill_window()
+
+    def _orphaned(self, screen) -> bool:
+        """Whether the bar of screen mirrors a widget whose bar was killed."""
+        return isinstance(screen.top, bar.Bar) and any(
+            getattr(item, "reflects", None) is not None and item.reflects.bar.window is None
+            for item in screen.top.widgets
+        )
+
+    def reconfigure(self):
+        """Give every output its Screen, creating bars only for new outputs."""
+        self._timer = None
+        outputs = self._outputs()
+        matched = self._match(outputs)
+        groups = {screen: screen.group for screen in matched if screen is not None}
+        removed = [screen for screen in self.qtile.screens if screen not in matched]
+        # before the new bars are made, so that they do not mirror the widgets of these
+        for screen in removed:
+            self._kill_bars(screen)
+
+        screens = []
+        for screen in matched:
+            if screen is not None and self._orphaned(screen):
+                self._kill_bars(screen)
+                screen.top = None
+            if screen is None:
+                screen = Screen(top=self.make_bar(not self._has_systray(matched + screens)))
+            elif screen.top is None:
+                screen.top = self.make_bar(not self._has_systray(matched + screens))
+            screens.append(screen)
+        created = sum(screen is None for screen in matched)
+        logger.info("%d outputs, %d new, %d removed", len(outputs), created, len(removed))
+
+        self.qtile.config.screens[:] = screens
+        with group_switch.deferred(self.qtile):
+            self.qtile.cmd_reconfigure_screens()
+            # qtile hands out the groups by index, give the surviving screens theirs back
+            for screen, group in groups.items():
+                if screen.group is not group:
+                    screen.set_group(group)
+            if self.qtile.current_screen not in self.qtile.screens:
+                self.qtile.focus_screen(0, warp=False)
@@ -0,0 +1,186 @@
+"""
+Spawn commands with posix_spawn and cached argv and executable paths.
+
+qtile's spawn splits the command string, looks the executable up in PATH
+and forks itself twice on every call. Forking copies the page tables of
+the whole qtile process, which is the largest part of the time a launcher
+binding takes. The Launcher replaces the spawn command of qtile:
+
+•   command strings are split once, those of the key bindings and
+    scratchpads already when the config is loaded
+•   resolved executables are cached as long as PATH and the directories
+    in it stay the same, so a new system or user profile (which replaces
+    the directories behind the profile links) invalidates the cache
+•   children are started with posix_spawn, in a new session with stdio
+    on /dev/null, and reaped through a pidfd in the event loop
+•   the time every spawn took is recorded per binding, see the
+    launcher_stats command
+
+Shell commands and systems without pidfds use the spawn of qtile.
+"""
+
+import asyncio
+import os
+import shlex
+import shutil
+import subprocess
+import time
+from typing import Iterable, Optional, Union
+
+from libqtile.config import KeyChord
+from libqtile.log_utils import logger
+
+
+class Launcher:
+    def __init__(self):
+        # command string -> argv
+        self.argv: dict[str, list[str]] = {}
+        # executable name -> path, valid for self.signature
+        self.paths: dict[str, str] = {}
+        self.signature: Optional[tuple] = None
+        # command string -> name of the binding spawning it
+        self.labels: dict[str, str] = {}
+        # label -> spawn count, total and maximum seconds
+        self.stats: dict[str, dict[str, float]] = {}
+        self.spawn = None
+
+    def prepare(self, keys: list, commands: Iterable[str] = ()):
+        """Parse the spawn commands of keys (and their key chords) and further commands."""
+        for key in keys:
+            if isinstance(key, KeyChord):
+                self.prepare(key.submappings)
+                continue
+            binding = "-".join([*key.modifiers, key.key])
+            for command in key.commands:
+                if command.name == "spawn" and not command.selectors and command.args:
+                    self._parse(command.args[0])
+                    self.labels.setdefault(self._key(command.args[0]), key.desc or binding)
+        for command in commands:
+            self._parse(command)
+        self._validate()
+        for argv in self.argv.values():
+            self._resolve(argv[0])
+
+    def install(self, qtile):
+        """Replace the spawn command of qtile, call in the startup hook."""
+        if not hasattr(os, "posix_spawn") or not hasattr(os, "pidfd_open"):
+            logger.info("Launcher unavailable, using the spawn of qtile")
+            return
+        self.spawn = qtile.cmd_spawn
+        qtile.cmd_spawn = self.cmd_spawn
+        qtile.cmd_launcher_stats = self.cmd_stats
+
+    def _key(self, cmd: Union[str, list[str]]) -> str:
+        return cmd if isinstance(cmd, str) else subprocess.list2cmdline(cmd)
+
+    def _parse(self, cmd: Union[str, list[str]]) -> list[str]:
+        key = self._key(cmd)
+        if key not in self.argv:
+            self.argv[key] = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+        return self.argv[key]
+
+    def _validate(self):
+        """Drop the resolved paths if PATH or one of its directories changed."""
+        path = os.environ.get("PATH", os.defpath)
+        directories = []
+        for directory in path.split(os.pathsep):
+            try:
+                stat = os.stat(directory)
+                directories.append((stat.st_dev, stat.st_ino, stat.st_mtime_ns))
+            except OSError:
+                directories.append(None)
+        signature = (path, tuple(directories))
+        if signature != self.signature:
+            self.signature = signature
+            self.paths.clear()
+
+    def _resolve(self, name: str) -> Optional[str]:
+        if os.sep in name:
+            return name
+        if name not in self.paths:
+            path = shutil.which(name)
+            if path is None:
+                return None
+            self.paths[name] = path
+        return self.paths[name]
+
+    def cmd_spawn(self, cmd: Union[str, list[str]], shell: bool = False) -> int:
+        """Run cmd like the spawn command of qtile, returning the pid."""
+        if shell:
+            return self.spawn(cmd, shell)
+        start = time.perf_counter()
+        argv = self._parse(cmd)
+        if not argv:
+            return -1
+        self._validate()
+        for _ in range(2):
+            path = self._resolve(argv[0])
+            if path is None:
+                logger.error("couldn't find `%s`", argv[0])
+                return -1
+            try:
+                pid = self._posix_spawn(path, argv)
+                break
+            except FileNotFoundError:
+                # removed since it was resolved, look it up again
+                self.paths.pop(argv[0], None)
+        else:
+            return -1
+        self._record(self.labels.get(self._key(cmd), argv[0]), time.perf_counter() - start)
+        return pid
+
+    def _posix_spawn(self, path: str, argv: list[str]) -> int:
+        environment = dict(os.environ)
+        # like qtile, do not pass on a virtual environment qtile runs in
+        environment.pop("VIRTUAL_ENV", None)
+        pid = os.posix_spawn(
+            path,
+            argv,
+            environment,
+            file_actions=[
+                (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+                (os.POSIX_SPAWN_DUP2, 1, 2),
+            ],
+            setsid=True,
+        )
+        self._reap(pid)
+        return pid
+
+    def _reap(self, pid: int):
+        """Wait for the child in the event loop, so it does not stay a zombie."""
+        try:
+            pidfd = os.pidfd_open(pid)
+        except OSError:
+            # already gone
+            os.waitpid(pid, os.WNOHANG)
+            return
+        loop = asyncio.get_running_loop()
+
+        def reap():
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+            os.waitpid(pid, 0)
+
+        loop.add_reader(pidfd, reap)
+
+    def _record(self, label: str, seconds: float):
+        stats = self.stats.setdefault(label, dict(count=0, total=0.0, max=0.0))
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        logger.debug("Spawned %s in %.2fms", label, seconds * 1000)
+
+    def cmd_stats(self) -> dict:
+        """Return the spawn count, mean and maximum milliseconds per binding."""
+        return {
+            label: dict(
+                count=stats["count"],
+                mean=stats["total"] / stats["count"] * 1000,
+                max=stats["max"] * 1000,
+            )
+            for label, stats in self.stats.items()
+        }
+
+
+LAUNCHER = Launcher()
@@ -0,0 +1,63 @@
+"""
+Key bindings that run the one layout command the current layout understands.
+
+Bindings used with several layouts list the alternative commands of all
+of them, e.g. grow_right for Columns, grow for MonadTall and
+increase_ratio for RatioTile. qtile tries every command on every press
+and logs an error for each one the layout does not have. A chain binding
+resolves the commands a layout class implements once, caches them, and
+every press (including every key repeat) runs only those, in a single
+call.
+
+report() lists the bindings that do nothing in some of the layouts.
+"""
+
+from libqtile.lazy import lazy
+from libqtile.log_utils import logger
+
+# (layout class, chain of command names) -> the names the class implements
+_resolved: dict[tuple[type, tuple[str, ...]], tuple[str, ...]] = {}
+
+
+def resolve(layout_class: type, names: tuple[str, ...]) -> tuple[str, ...]:
+    key = (layout_class, names)
+    if key not in _resolved:
+        _resolved[key] = tuple(
+            name for name in names if callable(getattr(layout_class, "cmd_" + name, None))
+        )
+    return _resolved[key]
+
+
+def _dispatch(qtile, names: tuple[str, ...]):
+    current = qtile.current_layout
+    for name in resolve(type(current), names):
+        getattr(current, "cmd_" + name)()
+
+
+def chain(*names: str):
+    """A lazy call running those of the layout commands the current layout has."""
+    return lazy.function(_dispatch, names)
+
+
+def _layout_commands(key) -> list[tuple[str, ...]]:
+    """The layout commands of a binding, as chains of alternatives."""
+    chains = []
+    for command in key.commands:
+        if command.name == "function" and command.args and command.args[0] is _dispatch:
+            chains.append(command.args[1])
+        elif [selector for selector, _ in command.selectors] == ["layout"]:
+            chains.append((command.name,))
+    return chains
+
+
+def report(keys, layouts) -> list[tuple[str, str]]:
+    """Log and return (binding, layout name) of every binding that does nothing in a layout."""
+    unused = []
+    for key in keys:
+        for layout in layouts:
+            for names in _layout_commands(key):
+                if not resolve(type(layout), names):
+                    binding = "-".join([*key.modifiers, key.key])
+                    unused.append((binding, layout.name))
+                    logger.info("%s does nothing in %s: %s", binding, layout.name, ", ".join(names))
+    return unused
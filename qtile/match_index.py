@@ -0,0 +1,178 @@
+"""
+Match windows against many Match rules with hash lookups instead of one rule after the other.
+
+qtile compares a new window with every group rule and every float rule in
+turn, fetching the window properties again for every rule. A MatchIndex
+compiles the rules once:
+
+•   string and list values of wm_class, wm_instance_class and title are
+    put into hash indexes. A Match compares strings with "in", so a
+    string is indexed under all of its substrings, which keeps the
+    behaviour of qtile
+•   regular expressions, role and wm_type are checked one by one
+•   which rules the class, role and type of a window satisfy is
+    memoized for every combination of them, so only title, func, wid
+    and net_wm_pid rules are checked again for further windows
+
+This relies on the _rules of Match (qtile 0.22).
+"""
+
+import time
+from typing import Any, Optional
+
+from libqtile import layout
+from libqtile.config import Match
+
+# properties only depending on the class, role and type of a window
+STATIC = ("wm_class", "wm_instance_class", "role", "wm_type")
+INDEXED = ("wm_class", "wm_instance_class", "title")
+# longer strings are not indexed by their substrings
+MAX_INDEXED_LENGTH = 64
+
+
+def _index_keys(value) -> Optional[list[str]]:
+    """The values of a window property that a rule value accepts, None if unknown."""
+    if isinstance(value, (list, tuple)) and all(isinstance(item, str) for item in value):
+        return list(value)
+    if isinstance(value, str) and len(value) <= MAX_INDEXED_LENGTH:
+        return [
+            value[start:end] for start in range(len(value)) for end in range(start + 1, len(value) + 1)
+        ]
+    return None
+
+
+class MatchIndex:
+    def __init__(self, matches: list[Match]):
+        self.matches = list(matches)
+        # property -> value of the window -> ids of the rules accepting it
+        self.indexes: dict[str, dict[str, set[int]]] = {name: {} for name in INDEXED}
+        # id -> [(property, rule value)] checked without index
+        self.checks: dict[int, list[tuple[str, Any]]] = {}
+        # id -> the properties of the rule that are compared
+        self.static: dict[int, list[str]] = {}
+        self.dynamic: dict[int, list[str]] = {}
+        # (wm_class, role, wm_type) -> ids of the rules whose static properties match
+        self.memo: dict[tuple, frozenset[int]] = {}
+        self.stats = dict(lookups=0, memo_hits=0, checks=0, seconds=0.0)
+
+        for id, match in enumerate(self.matches):
+            self.static[id], self.dynamic[id] = [], []
+            for name, value in match._rules.items():
+                (self.static if name in STATIC else self.dynamic)[id].append(name)
+                keys = _index_keys(value) if name in INDEXED else None
+                if keys is None:
+                    self.checks.setdefault(id, []).append((name, value))
+                else:
+                    for key in keys:
+                        self.indexes[name].setdefault(key, set()).add(id)
+                if name == "func":
+                    # compare returns the result of func without looking further
+                    break
+
+    def _accepted(self, id: int, name: str, value, indexed: set[int]) -> bool:
+        if value is None:
+            return False
+        for check_name, rule_value in self.checks.get(id, ()):
+            if check_name == name:
+                self.stats["checks"] += 1
+                return bool(Match._get_property_predicate(name, value)(rule_value))
+        return id in indexed
+
+    def _lookup(self, name: str, values) -> set[int]:
+        ids: set[int] = set()
+        for value in values:
+            ids |= self.indexes[name].get(value, set())
+        return ids
+
+    def _static_ids(self, wm_class: Optional[tuple], role, wm_type) -> frozenset[int]:
+        key = (wm_class, role, wm_type)
+        if key in self.memo:
+            self.stats["memo_hits"] += 1
+            return self.memo[key]
+
+        values = {
+            "wm_class": wm_class or None,
+            "wm_instance_class": wm_class[0] if wm_class else None,
+            "role": role,
+            "wm_type": wm_type,
+        }
+        indexed = {
+            "wm_class": self._lookup("wm_class", wm_class or ()),
+            "wm_instance_class": self._lookup("wm_instance_class", wm_class[:1] if wm_class else ()),
+            "role": set(),
+            "wm_type": set(),
+        }
+        ids = frozenset(
+            id
+            for id, names in self.static.items()
+            if all(self._accepted(id, name, values[name], indexed[name]) for name in names)
+        )
+        self.memo[key] = ids
+        return ids
+
+    def matching(self, client) -> set[int]:
+        """Return the ids of the rules matching client."""
+        start = time.perf_counter()
+        self.stats["lookups"] += 1
+        try:
+            wm_class = client.get_wm_class()
+            ids = self._static_ids(
+                tuple(wm_class) if wm_class else None, client.get_wm_role(), client.get_wm_type()
+            )
+            matching = set()
+            for id in ids:
+                if not self.static[id] and not self.dynamic[id]:
+                    # a Match without rules never matches
+                    continue
+                if all(self._dynamic_accepted(id, name, client) for name in self.dynamic[id]):
+                    matching.add(id)
+            return matching
+        except Exception:
+            # e.g. the window is already gone, like Window.match of qtile
+            return set()
+        finally:
+            self.stats["seconds"] += time.perf_counter() - start
+
+    def _dynamic_accepted(self, id: int, name: str, client) -> bool:
+        if name == "func":
+            return bool(self.matches[id]._rules["func"](client))
+        if name == "title":
+            title = client.name
+            return self._accepted(id, name, title, self._lookup("title", [title]))
+        value = client.get_pid() if name == "net_wm_pid" else client.wid
+        return self._accepted(id, name, value, set())
+
+    def info(self) -> dict:
+        return dict(rules=len(self.matches), memoized=len(self.memo), **self.stats)
+
+
+class Floating(layout.Floating):
+    """A Floating layout deciding which windows float with a MatchIndex of its float_rules."""
+
+    def __init__(self, float_rules=None, no_reposition_rules=None, **config):
+        layout.Floating.__init__(self, float_rules, no_reposition_rules, **config)
+        self.index = MatchIndex(self.float_rules)
+
+    def match(self, win):
+        return bool(self.index.matching(win))
+
+
+def install(qtile) -> MatchIndex:
+    """Let the group rules of qtile share one MatchIndex, call in the startup hook."""
+    rules = qtile.dgroups.rules
+    index = MatchIndex([match for rule in rules for match in rule.matchlist])
+    first = 0
+    for rule in rules:
+        ids = set(range(first, first + len(rule.matchlist)))
+        first += len(rule.matchlist)
+        rule.matches = lambda client, ids=ids: not ids.isdisjoint(index.matching(client))
+    return index
+
+
+def register_commands(qtile, indexes: dict[str, MatchIndex]):
+    """Make the match statistics available as the match_stats command over qtile's IPC."""
+
+    def cmd_match_stats() -> dict:
+        return {name: index.info() for name, index in indexes.items()}
+
+    qtile.cmd_match_stats = cmd_match_stats
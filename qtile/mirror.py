@@ -0,0 +1,66 @@
+"""
+Give the bars of all screens the same widget instances instead of copies.
+
+Apart from the systray, the bars of both screens show the same widgets,
+but every bar had its own instances, so every widget was built for
+every bar and every statistic was polled, formatted and laid out once
+per screen. qtile places a widget that is already in one bar as a
+Mirror in every further bar: the mirror paints the surface the widget
+drew last and is only redrawn when the widget draws (with its bar, if
+the width changed). Mirrored.build takes the widgets of a new bar as
+(widget class, settings) pairs and only builds those that no other bar
+has an instance of yet, except for
+
+•   widgets of the per_screen types, which show something of their own
+    screen: the group boxes highlight the group of their screen, the
+    window name and layout widgets show its window and layout, and the
+    prompt and the systray cannot be mirrored
+•   widgets the other bars do not have, e.g. the separator next to the
+    systray
+
+Widgets are matched by class and settings (callables by name), and in
+order. Once the bar holding a widget is gone, e.g. when its output was
+unplugged, the next bar gets a new instance of it (hotplug.Screens
+replaces the bars that mirrored it).
+"""
+
+import collections
+
+
+def _signature(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), _signature(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_signature(item) for item in value)
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    return repr(value)
+
+
+def _alive(widget) -> bool:
+    """Whether widget was not configured yet or its bar still has a window."""
+    return not widget.configured or widget.bar.window is not None
+
+
+class Mirrored:
+    def __init__(self, per_screen: tuple[type, ...]):
+        self.per_screen = per_screen
+        # (class, settings, occurrence) -> the instance placed in the first bar
+        self._widgets: dict[tuple, object] = {}
+
+    def build(self, specs: list[tuple[type, dict]]) -> list:
+        """The widgets of a new bar, with the instances of other bars where possible."""
+        self._widgets = {key: widget for key, widget in self._widgets.items() if _alive(widget)}
+        occurrences: collections.Counter = collections.Counter()
+        widgets = []
+        for widget_class, settings in specs:
+            if issubclass(widget_class, self.per_screen):
+                widgets.append(widget_class(**settings))
+                continue
+            signature = (widget_class, _signature(settings))
+            key = (*signature, occurrences[signature])
+            occurrences[signature] += 1
+            if key not in self._widgets:
+                self._widgets[key] = widget_class(**settings)
+            widgets.append(self._widgets[key])
+        return widgets
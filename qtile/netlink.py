@@ -0,0 +1,197 @@
+"""
+The traffic counters of all network interfaces and the default route, from rtnetlink.
+
+/proc/net/dev is text that the kernel formats and the bar parses again
+on every update. RtNetlink asks the kernel over a NETLINK_ROUTE socket
+instead:
+
+•   stats() is one RTM_GETSTATS dump per call, which only carries the
+    64 bit counters (rtnl_link_stats64) of every interface, received
+    into a buffer that is reused and unpacked at fixed offsets
+•   names() maps the interface indices to names with an RTM_GETLINK
+    dump, without the statistics
+•   route() asks which interface the kernel would route an address of
+    the internet through, like ip route get, so policy routing (e.g. the
+    tunnel of a VPN) is taken into account
+•   changed() tells whether links, addresses, routes or rules changed
+    since the last call, from a second socket subscribed to their
+    multicast groups, so names and routes are only looked up again then
+"""
+
+import os
+import socket
+import struct
+from typing import Iterator, Optional
+
+NETLINK_ROUTE = 0
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWROUTE = 24
+RTM_GETROUTE = 26
+RTM_NEWSTATS = 92
+RTM_GETSTATS = 94
+
+IFLA_IFNAME = 3
+IFLA_EXT_MASK = 29
+RTEXT_FILTER_SKIP_STATS = 1 << 3
+IFLA_STATS_LINK_64 = 1
+RTA_DST = 1
+RTA_OIF = 4
+
+# RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV4_ROUTE, RTMGRP_IPV6_IFADDR,
+# RTMGRP_IPV6_ROUTE and the groups of the IPv4 and IPv6 rules
+GROUPS = 0x1 | 0x10 | 0x40 | 0x100 | 0x400 | 1 << 7 | 1 << 18
+
+# any addresses outside of the local networks
+PROBES = {
+    socket.AF_INET: socket.inet_pton(socket.AF_INET, "1.1.1.1"),
+    socket.AF_INET6: socket.inet_pton(socket.AF_INET6, "2606:4700:4700::1111"),
+}
+
+HEADER = struct.Struct("=IHHII")
+ATTRIBUTE = struct.Struct("=HH")
+# struct if_stats_msg: family, padding, ifindex, filter_mask
+STATS_MESSAGE = struct.Struct("=BBHiI")
+# struct ifinfomsg: family, padding, type, index, flags, change
+LINK_MESSAGE = struct.Struct("=BBHiII")
+# struct rtmsg: family, dst_len, src_len, tos, table, protocol, scope, type, flags
+ROUTE_MESSAGE = struct.Struct("=BBBBBBBBI")
+U32 = struct.Struct("=I")
+ERROR = struct.Struct("=i")
+# rx_bytes and tx_bytes, after rx_packets and tx_packets in rtnl_link_stats64
+BYTES = struct.Struct("=16xQQ")
+
+BUFFER_SIZE = 65536
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+class RtNetlink:
+    def __init__(self):
+        self._socket = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, NETLINK_ROUTE
+        )
+        self._socket.bind((0, 0))
+        self._events = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC | socket.SOCK_NONBLOCK, NETLINK_ROUTE
+        )
+        self._events.bind((0, GROUPS))
+        self._buffer = bytearray(BUFFER_SIZE)
+        self._sequence = 0
+        self._stats_request = STATS_MESSAGE.pack(socket.AF_UNSPEC, 0, 0, 0, 1 << (IFLA_STATS_LINK_64 - 1))
+        self._link_request = LINK_MESSAGE.pack(socket.AF_UNSPEC, 0, 0, 0, 0, 0) + struct.pack(
+            "=HHI", 8, IFLA_EXT_MASK, RTEXT_FILTER_SKIP_STATS
+        )
+
+    def close(self):
+        self._socket.close()
+        self._events.close()
+
+    def _send(self, type_: int, flags: int, payload: bytes) -> int:
+        self._sequence += 1
+        self._socket.send(
+            HEADER.pack(HEADER.size + len(payload), type_, flags, self._sequence, 0) + payload
+        )
+        return self._sequence
+
+    def _messages(self, sequence: int, dump: bool) -> Iterator[tuple[int, int, int]]:
+        """(type, offset, length) of every reply in the buffer, valid until the next one."""
+        buffer = self._buffer
+        while True:
+            size = self._socket.recv_into(buffer)
+            offset = 0
+            while offset + HEADER.size <= size:
+                length, type_, _, reply_sequence, _ = HEADER.unpack_from(buffer, offset)
+                if length < HEADER.size:
+                    return
+                if reply_sequence == sequence:
+                    if type_ == NLMSG_DONE:
+                        return
+                    if type_ == NLMSG_ERROR:
+                        (error,) = ERROR.unpack_from(buffer, offset + HEADER.size)
+                        if error:
+                            raise OSError(-error, os.strerror(-error))
+                        return
+                    yield type_, offset, length
+                    if not dump:
+                        return
+                offset += _align(length)
+
+    def _attributes(self, start: int, end: int) -> Iterator[tuple[int, int, int]]:
+        """(type, offset of the value, length of the value) of the attributes between start and end."""
+        while start + ATTRIBUTE.size <= end:
+            length, type_ = ATTRIBUTE.unpack_from(self._buffer, start)
+            if length < ATTRIBUTE.size:
+                return
+            yield type_, start + ATTRIBUTE.size, length - ATTRIBUTE.size
+            start += _align(length)
+
+    def stats(self) -> dict[int, tuple[int, int]]:
+        """Interface index -> (received bytes, sent bytes) of every interface."""
+        sequence = self._send(RTM_GETSTATS, NLM_F_REQUEST | NLM_F_DUMP, self._stats_request)
+        counters = {}
+        start = HEADER.size + STATS_MESSAGE.size
+        for type_, offset, length in self._messages(sequence, dump=True):
+            if type_ != RTM_NEWSTATS:
+                continue
+            index = STATS_MESSAGE.unpack_from(self._buffer, offset + HEADER.size)[3]
+            for attribute, value, _ in self._attributes(offset + start, offset + length):
+                if attribute == IFLA_STATS_LINK_64:
+                    counters[index] = BYTES.unpack_from(self._buffer, value)
+                    break
+        return counters
+
+    def names(self) -> dict[int, str]:
+        """Interface index -> name of every interface."""
+        sequence = self._send(RTM_GETLINK, NLM_F_REQUEST | NLM_F_DUMP, self._link_request)
+        names = {}
+        start = HEADER.size + LINK_MESSAGE.size
+        for type_, offset, length in self._messages(sequence, dump=True):
+            if type_ != RTM_NEWLINK:
+                continue
+            index = LINK_MESSAGE.unpack_from(self._buffer, offset + HEADER.size)[3]
+            for attribute, value, size in self._attributes(offset + start, offset + length):
+                if attribute == IFLA_IFNAME:
+                    names[index] = bytes(self._buffer[value : value + size]).rstrip(b"\0").decode()
+                    break
+        return names
+
+    def route(self, family: int = socket.AF_INET) -> Optional[int]:
+        """The index of the interface the internet is reached through, None without a route."""
+        address = PROBES[family]
+        payload = ROUTE_MESSAGE.pack(family, len(address) * 8, 0, 0, 0, 0, 0, 0, 0)
+        payload += ATTRIBUTE.pack(ATTRIBUTE.size + len(address), RTA_DST) + address
+        try:
+            sequence = self._send(RTM_GETROUTE, NLM_F_REQUEST, payload)
+            for type_, offset, length in self._messages(sequence, dump=False):
+                if type_ != RTM_NEWROUTE:
+                    continue
+                start = offset + HEADER.size + ROUTE_MESSAGE.size
+                for attribute, value, _ in self._attributes(start, offset + length):
+                    if attribute == RTA_OIF:
+                        return U32.unpack_from(self._buffer, value)[0]
+        except OSError:
+            # e.g. ENETUNREACH
+            pass
+        return None
+
+    def changed(self) -> bool:
+        """Whether links, addresses, routes or rules changed since the last call."""
+        changed = False
+        while True:
+            try:
+                self._events.recv_into(self._buffer)
+            except BlockingIOError:
+                return changed
+            except OSError:
+                # ENOBUFS, events were dropped
+                pass
+            changed = True
@@ -0,0 +1,293 @@
+"""
+Apply changes of config.py to the running qtile without restarting it.
+
+A restart or reload_config of qtile rebuilds every bar, widget and layout
+and runs the startup hooks again. Reloader.reload evaluates config.py as
+a separate module instead, with the hooks it subscribes discarded, and
+compares what it defines with the live configuration:
+
+•   keys: only added, removed and changed bindings are ungrabbed and
+    grabbed, unchanged ones keep their live Key
+•   groups: new groups are added, empty removed ones deleted, labels and
+    the rules assigning windows to groups are updated
+•   dropdowns: the DropDown configurations of the ScratchPad are replaced,
+    running scratchpads keep their window and use the new geometry the
+    next time they are shown
+•   layouts: groups get new layouts only if the layouts changed, with
+    their windows and current layout kept
+•   float rules of the floating layout
+
+Windows, scratchpads, bars and widgets are left alone. Objects a new
+binding refers to (e.g. the spare pool behind a lazy.function) are
+replaced with the live object of the same name, so bindings keep using
+the running instances. Changes to the modules config.py imports still
+need a restart.
+"""
+
+import contextlib
+import importlib.util
+import os
+import sys
+import types
+from typing import Iterable
+
+from libqtile import hook
+from libqtile.config import KeyChord, Rule, ScratchPad
+from libqtile.log_utils import logger
+
+
+def _value_signature(value):
+    if callable(value) and hasattr(value, "__qualname__"):
+        return value.__qualname__
+    return repr(value)
+
+
+def _key_signature(key) -> tuple:
+    if isinstance(key, KeyChord):
+        return (
+            "chord",
+            key.mode,
+            key.name,
+            tuple(_key_signature(submapping) for submapping in key.submappings),
+        )
+    return (
+        key.desc,
+        tuple(
+            (
+                repr(command.selectors),
+                command.name,
+                tuple(_value_signature(argument) for argument in command.args),
+                tuple(
+                    sorted((name, _value_signature(value)) for name, value in command.kwargs.items())
+                ),
+            )
+            for command in key.commands
+        ),
+    )
+
+
+def _binding(key) -> tuple:
+    return (frozenset(key.modifiers), key.key)
+
+
+def _configurable_signature(item) -> tuple:
+    return (type(item).__qualname__, repr(sorted(item._user_config.items(), key=repr)))
+
+
+class Reloader:
+    """
+    Reload path, the config file of qtile, into the running qtile.
+
+    after names functions of the running config that are called once the
+    changes were applied, e.g. to index the new window rules.
+    """
+
+    def __init__(self, path: str, after: Iterable[str] = ()):
+        self.path = path
+        self.after = list(after)
+
+    def register_commands(self, qtile):
+        qtile.cmd_reload_partial = lambda: self.reload(qtile)
+
+    def _evaluate(self) -> types.ModuleType:
+        spec = importlib.util.spec_from_file_location("config_partial_reload", self.path)
+        module = importlib.util.module_from_spec(spec)
+        subscriptions = {event: list(callbacks) for event, callbacks in hook.subscriptions.items()}
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            hook.subscriptions.clear()
+            hook.subscriptions.update(subscriptions)
+        return module
+
+    def reload(self, qtile) -> str:
+        """Apply the changes of the config file and return a summary of them."""
+        if qtile.chord_stack:
+            return "not reloaded inside a key chord"
+        try:
+            new = self._evaluate()
+        except Exception:
+            logger.exception("Partial reload of %s failed:", self.path)
+            return "configuration error, see the log"
+
+        # qtile imports the config file as a module named like the file
+        live = sys.modules.get(os.path.splitext(os.path.basename(self.path))[0])
+        self._replacements = self._live_objects(live, new)
+        changes = [
+            *self._reload_keys(qtile, new.keys),
+            *self._reload_groups(qtile, new.groups),
+            *self._reload_layouts(qtile, new.layouts),
+            *self._reload_float_rules(qtile, new.floating_layout),
+        ]
+        if live is not None:
+            for name in self.after:
+                getattr(live, name)()
+        summary = ", ".join(changes) or "nothing changed"
+        logger.info("Partial reload: %s", summary)
+        return summary
+
+    def _live_objects(self, live, new) -> dict[int, object]:
+        """id of an object of the new module -> the live object of the same name."""
+        if live is None:
+            return {}
+        replacements = {}
+        for name, value in vars(new).items():
+            current = vars(live).get(name)
+            if (
+                current is not None
+                and type(current) is type(value)
+                and type(value).__module__ != "builtins"
+                and not isinstance(value, (types.FunctionType, types.ModuleType, type))
+            ):
+                replacements[id(value)] = current
+        return replacements
+
+    def _rebind(self, value):
+        if id(value) in self._replacements:
+            return self._replacements[id(value)]
+        owner = getattr(value, "__self__", None)
+        if isinstance(value, types.MethodType) and id(owner) in self._replacements:
+            return getattr(self._replacements[id(owner)], value.__name__)
+        return value
+
+    def _rebind_key(self, key):
+        if isinstance(key, KeyChord):
+            for submapping in key.submappings:
+                self._rebind_key(submapping)
+            return key
+        for command in key.commands:
+            command._args = tuple(self._rebind(argument) for argument in command._args)
+            command._kwargs = {name: self._rebind(value) for name, value in command._kwargs.items()}
+        return key
+
+    def _ungrab(self, qtile, key):
+        # e.g. a key whose keysym does not exist was never grabbed
+        with contextlib.suppress(KeyError):
+            qtile.ungrab_key(key)
+
+    def _reload_keys(self, qtile, keys: list) -> list[str]:
+        current = {_binding(key): key for key in qtile.config.keys}
+        merged, grab = [], []
+        for key in keys:
+            old = current.pop(_binding(key), None)
+            if old is not None and _key_signature(old) == _key_signature(key):
+                merged.append(old)
+                continue
+            if old is not None:
+                self._ungrab(qtile, old)
+            grab.append(self._rebind_key(key))
+            merged.append(key)
+        for key in current.values():
+            self._ungrab(qtile, key)
+        for key in grab:
+            qtile.grab_key(key)
+        qtile.config.keys = merged
+        if not grab and not current:
+            return []
+        return [f"{len(grab)} keys grabbed, {len(current)} removed"]
+
+    def _reload_groups(self, qtile, groups: list) -> list[str]:
+        changes = []
+        dgroups = qtile.dgroups
+        for group in groups:
+            live = qtile.groups_map.get(group.name)
+            if live is None and isinstance(group, ScratchPad):
+                changes.append(f"scratchpad group {group.name} needs a restart")
+                continue
+            if live is None:
+                qtile.add_group(group.name, group.layout, group.layouts, group.label)
+                changes.append(f"group {group.name} added")
+            elif live.label != group.label:
+                live.label = group.label
+                hook.fire("changegroup")
+                changes.append(f"group {group.name} relabeled")
+            if isinstance(group, ScratchPad) and live is not None:
+                changes.extend(self._reload_dropdowns(live, group.dropdowns))
+            dgroups.groups_map[group.name] = group
+
+        names = {group.name for group in groups}
+        for group in list(qtile.config.groups):
+            live = qtile.groups_map.get(group.name)
+            if group.name in names or live is None:
+                continue
+            dgroups.groups_map.pop(group.name, None)
+            if live.windows or live.screen is not None:
+                changes.append(f"group {group.name} kept, it is in use")
+                continue
+            qtile.delete_group(group.name)
+            changes.append(f"group {group.name} removed")
+
+        # the rules of the groups come after the app rules, like when dgroups starts
+        app_rules = list(dgroups.rules_map.values())
+        old_rules = [(rule.group, rule.matchlist) for rule in dgroups.rules if rule not in app_rules]
+        group_rules = [Rule(group.matches, group=group.name) for group in groups]
+        dgroups.rules = [*app_rules, *group_rules]
+        if repr(old_rules) != repr([(rule.group, rule.matchlist) for rule in group_rules]):
+            changes.append("group rules updated")
+        qtile.config.groups = groups
+        return changes
+
+    def _reload_dropdowns(self, scratchpad, dropdowns: list) -> list[str]:
+        changed = []
+        configs = scratchpad._dropdownconfig
+        for dropdown in dropdowns:
+            old = configs.get(dropdown.name)
+            if old is not None and (old.command, _configurable_signature(old)) == (
+                dropdown.command,
+                _configurable_signature(dropdown),
+            ):
+                continue
+            configs[dropdown.name] = dropdown
+            changed.append(dropdown.name)
+            # a running scratchpad is shown with the new geometry from now on
+            toggler = scratchpad.dropdowns.get(dropdown.name)
+            if toggler is not None:
+                for name in ("x", "y", "width", "height", "opacity", "on_focus_lost_hide"):
+                    setattr(toggler, name, getattr(dropdown, name))
+        names = {dropdown.name for dropdown in dropdowns}
+        for name in [name for name in configs if name not in names]:
+            del configs[name]
+            changed.append(name)
+        return [f"{len(changed)} scratchpads updated"] if changed else []
+
+    def _reload_layouts(self, qtile, layouts: list) -> list[str]:
+        if [_configurable_signature(layout) for layout in layouts] == [
+            _configurable_signature(layout) for layout in qtile.config.layouts
+        ]:
+            return []
+        qtile.config.layouts = layouts
+        # groups with layouts of their own, like the ScratchPad, keep them
+        own = {
+            group.name
+            for group in qtile.config.groups
+            if group.layouts or isinstance(group, ScratchPad)
+        }
+        for group in qtile.groups:
+            if group.name in own:
+                continue
+            current = group.layout.name
+            for layout in group.layouts:
+                layout.finalize()
+            group.layouts = [layout.clone(group) for layout in layouts]
+            for window in group.windows:
+                if window in group.tiled_windows:
+                    for layout in group.layouts:
+                        layout.add(window)
+            names = [layout.name for layout in group.layouts]
+            group.current_layout = names.index(current) if current in names else 0
+            if group.current_window is not None:
+                group.layout.focus(group.current_window)
+            group.layout_all()
+        return ["layouts replaced"]
+
+    def _reload_float_rules(self, qtile, floating_layout) -> list[str]:
+        live = qtile.config.floating_layout
+        if repr(live.float_rules) == repr(floating_layout.float_rules) and repr(
+            live.no_reposition_rules
+        ) == repr(floating_layout.no_reposition_rules):
+            return []
+        live.float_rules = floating_layout.float_rules
+        live.no_reposition_rules = floating_layout.no_reposition_rules
+        if hasattr(floating_layout, "index"):
+            live.index = floating_layout.index
+        return ["float rules updated"]
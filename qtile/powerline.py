@@ -0,0 +1,91 @@
+"""
+A powerline separator widget that renders every separator only once.
+
+A TextBox lays out and draws its glyph with pango on every redraw of the
+bar. Separators never change their text, and the alternating section
+colors only give a few different combinations, so Separator rasterizes
+each combination of glyph, font, colors and size once into an image
+surface. The surfaces are kept in a small LRU cache shared by the bars
+of all screens, and a redraw only paints the cached surface.
+"""
+
+from collections import OrderedDict
+
+import cairocffi
+from libqtile import pangocffi
+from libqtile.widget import base
+
+# key -> (surface, width), the least recently used separators first
+_surfaces: OrderedDict = OrderedDict()
+CACHE_SIZE = 16
+
+
+def _hashable(colour):
+    return tuple(colour) if isinstance(colour, list) else colour
+
+
+class Separator(base._TextBox):
+    """
+    A TextBox for the separator glyphs between powerline sections.
+
+    It takes the same settings as a TextBox, but draws from the shared
+    surface cache. Only horizontal bars are cached, vertical bars are
+    drawn like a TextBox.
+    """
+
+    def _key(self) -> tuple:
+        return (
+            self.text,
+            self.font,
+            self.fontsize,
+            _hashable(self.fontshadow),
+            _hashable(self.foreground),
+            _hashable(self.background or self.bar.background),
+            self.actual_padding,
+            self.bar.height,
+        )
+
+    def _render(self) -> tuple[cairocffi.ImageSurface, int]:
+        width = max(int(self.layout.width + self.actual_padding * 2), 1)
+        height = self.bar.height
+        surface = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, width, height)
+        # draw the way a TextBox does, but into the surface
+        drawer_ctx = self.drawer.ctx
+        self.drawer.ctx = pangocffi.patch_cairo_context(cairocffi.Context(surface))
+        try:
+            self.drawer.set_source_rgb(self.background or self.bar.background)
+            self.drawer.ctx.paint()
+            self.layout.draw(self.actual_padding or 0, int(height / 2.0 - self.layout.height / 2.0) + 1)
+        finally:
+            self.drawer.ctx = drawer_ctx
+        return surface, width
+
+    def _cached(self) -> tuple[cairocffi.ImageSurface, int]:
+        key = self._key()
+        if key in _surfaces:
+            _surfaces.move_to_end(key)
+        else:
+            _surfaces[key] = self._render()
+            if len(_surfaces) > CACHE_SIZE:
+                _surfaces.popitem(last=False)
+        return _surfaces[key]
+
+    def calculate_length(self):
+        if not self.text or not self.bar.horizontal:
+            return base._TextBox.calculate_length(self)
+        return self._cached()[1]
+
+    def draw(self):
+        if not self.bar.horizontal:
+            base._TextBox.draw(self)
+            return
+        if not self.can_draw():
+            return
+
+        surface, _ = self._cached()
+        self.drawer.clear(self.background or self.bar.background)
+        self.drawer.ctx.set_source_surface(surface)
+        self.drawer.ctx.paint()
+        self.drawer.draw(
+            offsetx=self.offsetx, offsety=self.offsety, width=self.width, height=self.height
+        )
@@ -0,0 +1,257 @@
+"""
+Time hooks, lazy commands and widget updates, to find what makes qtile stutter.
+
+While enabled, the Profiler wraps
+
+•   the key events, and every lazy command run by a key or mouse binding
+•   every hook callback, by replacing hook.fire. Coroutine callbacks
+    (e.g. autostart_scratchpads) are timed per step they run on the event
+    loop, not including the time they wait
+•   poll, update, draw and scheduled_update of every widget
+
+with monotonic timers. Every label keeps a count, the total and maximum
+time, a histogram with power of two buckets and the most recent
+durations for percentiles. Wrapped calls running inside each other are
+recorded as stacks, which profile_dump writes in the folded format of
+flamegraph.pl and speedscope.
+
+Nothing is wrapped while the profiler is disabled, so it costs nothing
+then. It is enabled on startup if QTILE_PROFILE is set, or with the
+profile_enable command.
+"""
+
+import asyncio
+import bisect
+import collections
+import functools
+import os
+import time
+import types
+from typing import Callable, Optional
+
+from libqtile import hook
+from libqtile.log_utils import logger
+
+WIDGET_METHODS = ("poll", "update", "draw", "scheduled_update")
+# upper bounds of the histogram buckets, in microseconds
+BUCKETS = [2**exponent for exponent in range(25)]
+RECENT = 512
+
+
+class Stat:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        self.recent: collections.deque[float] = collections.deque(maxlen=RECENT)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.histogram[bisect.bisect_left(BUCKETS, seconds * 1e6)] += 1
+        self.recent.append(seconds)
+
+    def info(self) -> dict:
+        recent = sorted(self.recent)
+
+        def percentile(fraction: float) -> float:
+            return recent[min(int(fraction * len(recent)), len(recent) - 1)] * 1000
+
+        return dict(
+            count=self.count,
+            total_ms=self.total * 1000,
+            mean_ms=self.total / self.count * 1000,
+            p50_ms=percentile(0.5),
+            p95_ms=percentile(0.95),
+            p99_ms=percentile(0.99),
+            max_ms=self.max * 1000,
+            # bucket upper bound in µs -> count, the last bucket is unbounded
+            histogram={
+                (str(BUCKETS[index]) if index < len(BUCKETS) else "inf"): count
+                for index, count in enumerate(self.histogram)
+                if count
+            },
+        )
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.stats: dict[str, Stat] = {}
+        # ";"-joined stack of labels -> microseconds spent in the last label itself
+        self.folded: collections.Counter = collections.Counter()
+        # [label, seconds spent in wrapped calls below it] of the running calls
+        self._stack: list[list] = []
+        self._restore: list[Callable[[], None]] = []
+
+    def register_commands(self, qtile):
+        """Make the profile_* commands available over qtile's IPC."""
+        qtile.cmd_profile_enable = lambda: self.enable(qtile)
+        qtile.cmd_profile_disable = self.disable
+        qtile.cmd_profile_reset = self.reset
+        qtile.cmd_profile_stats = self.info
+        qtile.cmd_profile_dump = self.dump
+
+    def timed(self, label: str, function: Callable) -> Callable:
+        """Wrap function to record the time of every call under label."""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            frame = [label, 0.0]
+            self._stack.append(frame)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._record(frame, time.perf_counter() - start)
+
+        return wrapper
+
+    def _record(self, frame: list, seconds: float):
+        stack = self._stack
+        path = ";".join(label for label, _ in stack)
+        stack.pop()
+        if stack:
+            stack[-1][1] += seconds
+        stat = self.stats.get(frame[0])
+        if stat is None:
+            stat = self.stats[frame[0]] = Stat()
+        stat.add(seconds)
+        self.folded[path] += max(seconds - frame[1], 0) * 1e6
+
+    def _timed_steps(self, label: str, coroutine):
+        """Run coroutine, timing every step it runs on the event loop."""
+
+        @types.coroutine
+        def steps():
+            value, error = None, None
+            while True:
+                frame = [label, 0.0]
+                self._stack.append(frame)
+                start = time.perf_counter()
+                try:
+                    if error is None:
+                        yielded = coroutine.send(value)
+                    else:
+                        yielded = coroutine.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    self._record(frame, time.perf_counter() - start)
+                try:
+                    value, error = (yield yielded), None
+                except BaseException as exception:
+                    value, error = None, exception
+
+        return steps()
+
+    def enable(self, qtile):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._wrap_keys(qtile)
+        self._wrap_commands(qtile)
+        self._wrap_hooks()
+        self._wrap_widgets(qtile)
+        logger.info("Profiling enabled")
+
+    def disable(self):
+        for restore in reversed(self._restore):
+            restore()
+        self._restore.clear()
+        self._stack.clear()
+        self.enabled = False
+
+    def reset(self):
+        self.stats.clear()
+        self.folded.clear()
+
+    def _wrap_keys(self, qtile):
+        process_key_event = qtile.process_key_event
+
+        def key_event(keysym: int, mask: int):
+            key = qtile.keys_map.get((keysym, mask))
+            label = "key:" + "-".join([*key.modifiers, key.key]) if key else "key:unbound"
+            return self.timed(label, process_key_event)(keysym, mask)
+
+        qtile.process_key_event = key_event
+        self._restore.append(lambda: delattr(qtile, "process_key_event"))
+
+    def _wrap_commands(self, qtile):
+        # the IPC server keeps the original call, so only bindings are timed
+        server = qtile.server
+        call = server.call
+
+        def command(data):
+            selectors, name, args, _ = data
+            if name == "function" and args:
+                name = getattr(args[0], "__qualname__", "function")
+            path = ".".join([*(selector for selector, _ in selectors), name])
+            return self.timed("command:" + path, call)(data)
+
+        server.call = command
+        self._restore.append(lambda: delattr(server, "call"))
+
+    def _wrap_hooks(self):
+        fire = hook.fire
+
+        def timed_fire(event, *args, **kwargs):
+            if event not in hook.subscribe.hooks:
+                return fire(event, *args, **kwargs)
+            for callback in hook.subscriptions.get(event, []):
+                label = f"hook:{event}:{getattr(callback, '__qualname__', callback)}"
+                try:
+                    if asyncio.iscoroutinefunction(callback):
+                        hook._fire_async_event(
+                            self._timed_steps(label, callback(*args, **kwargs))
+                        )
+                    elif asyncio.iscoroutine(callback):
+                        hook._fire_async_event(self._timed_steps(label, callback))
+                    else:
+                        self.timed(label, callback)(*args, **kwargs)
+                except Exception:
+                    logger.exception("Error in hook %s", event)
+
+        hook.fire = timed_fire
+        self._restore.append(lambda: setattr(hook, "fire", fire))
+
+    def _wrap_widgets(self, qtile):
+        for name, widget in qtile.widgets_map.items():
+            for method in WIDGET_METHODS:
+                function = getattr(widget, method, None)
+                if function is None:
+                    continue
+                if method in vars(widget):
+                    # e.g. the draw of a mirrored widget, which also draws its mirrors
+                    self._restore.append(functools.partial(setattr, widget, method, function))
+                else:
+                    self._restore.append(functools.partial(delattr, widget, method))
+                setattr(widget, method, self.timed(f"widget:{name}.{method}", function))
+            # the job of a scheduler.Scheduled widget holds on to its scheduled_update
+            job = getattr(widget, "_job", None)
+            if job is not None:
+                callback = job.callback
+                job.callback = widget.scheduled_update
+                self._restore.append(functools.partial(setattr, job, "callback", callback))
+
+    def info(self) -> dict:
+        """Return the statistics of every label, the most expensive first."""
+        ordered = sorted(self.stats.items(), key=lambda item: -item[1].total)
+        return {label: stat.info() for label, stat in ordered}
+
+    def dump(self, path: Optional[str] = None) -> str:
+        """Write the recorded stacks in the folded format and return the path of the file."""
+        if path is None:
+            directory = os.path.join(os.path.expanduser("~"), ".cache", "qtile")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        with open(path, "w") as file:
+            for stack, microseconds in sorted(self.folded.items()):
+                if round(microseconds):
+                    file.write(f"{stack} {round(microseconds)}\n")
+        return path
+
+
+PROFILER = Profiler()
@@ -0,0 +1,430 @@
+"""
+One sampler of the system statistics shown in the bar, shared by all widgets.
+
+qtile's CPU, Memory, Net and ThermalSensor widgets each poll psutil on
+their own timer, so with a bar on every screen every statistic is read
+and parsed once per widget and interval. The Sampler reads /proc/stat,
+/proc/meminfo and the hwmon temperatures, keeping the files open and
+re-reading them with pread, and the traffic of every network interface
+and the interface of the default route from rtnetlink (see netlink.py).
+The widgets below are updated by the Scheduler and read the statistics
+once per wakeup for all of them. They accept the same format strings as
+the qtile widgets they replace.
+
+The traffic counters of the last HISTORY samples of every interface are
+kept in ring buffers, so the speed of an interface is known as soon as
+it becomes the default route, and an interface that was recreated or
+whose counters were reset starts over instead of showing a jump.
+"""
+
+import abc
+import glob
+import os
+import socket
+import time
+from array import array
+from math import log
+from typing import Optional
+
+from libqtile.log_utils import logger
+from libqtile.widget import base
+
+import netlink
+from scheduler import SCHEDULER, Scheduled
+
+# number of samples kept of every network interface
+HISTORY = 16
+
+
+class Sample:
+    """The statistics read at one moment."""
+
+    def __init__(self, time: float):
+        self.time = time
+        # total and idle CPU time since boot, in clock ticks
+        self.cpu_times = (0, 0)
+        # field of /proc/meminfo -> bytes
+        self.memory: dict[str, int] = {}
+        # interface -> (received bytes, sent bytes)
+        self.net: dict[str, tuple[int, int]] = {}
+        # interface -> index, 0 if unknown
+        self.links: dict[str, int] = {}
+        # the interface of the default route
+        self.default_interface: Optional[str] = None
+        # sensor label -> °C
+        self.temperatures: dict[str, float] = {}
+
+
+class _Ring:
+    """The last samples of the traffic counters of one interface."""
+
+    __slots__ = ("index", "times", "received", "sent", "count", "last")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.times = array("d", [0.0]) * HISTORY
+        self.received = array("Q", [0]) * HISTORY
+        self.sent = array("Q", [0]) * HISTORY
+        self.count = 0
+        # position of the newest sample
+        self.last = 0
+
+    def add(self, index: int, when: float, received: int, sent: int):
+        if index != self.index or (
+            self.count and (received < self.received[self.last] or sent < self.sent[self.last])
+        ):
+            # another interface of the same name, or its counters were reset
+            self.index = index
+            self.count = 0
+        self.last = (self.last + 1) % HISTORY
+        self.times[self.last] = when
+        self.received[self.last] = received
+        self.sent[self.last] = sent
+        self.count = min(self.count + 1, HISTORY)
+
+    def rates(self, span: int) -> tuple[float, float]:
+        """Bytes per second received and sent over the last span samples."""
+        span = min(span, self.count - 1)
+        if span < 1:
+            return 0.0, 0.0
+        first = (self.last - span) % HISTORY
+        elapsed = self.times[self.last] - self.times[first]
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (
+            (self.received[self.last] - self.received[first]) / elapsed,
+            (self.sent[self.last] - self.sent[first]) / elapsed,
+        )
+
+
+class NetHistory:
+    """The ring buffers of all network interfaces."""
+
+    def __init__(self):
+        self._rings: dict[str, _Ring] = {}
+
+    def add(self, sample: Sample):
+        for name, (received, sent) in sample.net.items():
+            index = sample.links.get(name, 0)
+            ring = self._rings.get(name)
+            if ring is None:
+                ring = self._rings[name] = _Ring(index)
+            ring.add(index, sample.time, received, sent)
+        if len(self._rings) > len(sample.net):
+            for name in [name for name in self._rings if name not in sample.net]:
+                del self._rings[name]
+
+    def rates(self, name: str, span: int) -> tuple[float, float]:
+        ring = self._rings.get(name)
+        return (0.0, 0.0) if ring is None else ring.rates(span)
+
+    def total(self, span: int) -> tuple[float, float]:
+        down = up = 0.0
+        for ring in self._rings.values():
+            received, sent = ring.rates(span)
+            down += received
+            up += sent
+        return down, up
+
+
+class Sampler:
+    """Reads the system statistics from files and sockets that are kept open."""
+
+    def __init__(self):
+        self._files: dict[str, int] = {}
+        # temperature label -> file descriptor of its tempN_input
+        self._sensors: Optional[dict[str, int]] = None
+        # None until opened, False if rtnetlink is not available
+        self._netlink = None
+        # interface index -> name
+        self._names: dict[int, str] = {}
+        self._route: Optional[int] = None
+        self.history = NetHistory()
+
+    def _pread(self, path: str) -> bytes:
+        if path not in self._files:
+            self._files[path] = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        return os.pread(self._files[path], 65536, 0)
+
+    def read(self) -> Sample:
+        sample = Sample(time.monotonic())
+        sample.cpu_times = self._read_cpu()
+        sample.memory = self._read_memory()
+        self._read_net(sample)
+        self.history.add(sample)
+        sample.temperatures = self._read_temperatures()
+        return sample
+
+    def _read_cpu(self) -> tuple[int, int]:
+        # cpu user nice system idle iowait irq softirq steal guest guest_nice,
+        # guest time is already part of user and nice
+        times = [int(value) for value in self._pread("/proc/stat").split(b"\n", 1)[0].split()[1:9]]
+        return sum(times), times[3] + times[4]
+
+    def _read_memory(self) -> dict[str, int]:
+        memory = {}
+        for line in self._pread("/proc/meminfo").splitlines():
+            name, _, value = line.partition(b":")
+            # all fields with a unit are in kB
+            memory[name.decode()] = int(value.split()[0]) * 1024
+        return memory
+
+    def _open_netlink(self):
+        try:
+            return netlink.RtNetlink()
+        except OSError:
+            logger.exception("rtnetlink is not available, reading /proc/net/dev instead")
+            return False
+
+    def _read_net(self, sample: Sample):
+        if self._netlink is None:
+            self._netlink = self._open_netlink()
+        if not self._netlink:
+            sample.net = self._read_proc_net()
+            return
+        counters = self._netlink.stats()
+        if self._netlink.changed() or not counters.keys() <= self._names.keys():
+            self._names = self._netlink.names()
+            self._route = self._netlink.route(socket.AF_INET) or self._netlink.route(socket.AF_INET6)
+        names = self._names
+        sample.net = {names[index]: value for index, value in counters.items() if index in names}
+        sample.links = {names[index]: index for index in counters if index in names}
+        sample.default_interface = names.get(self._route)
+
+    def _read_proc_net(self) -> dict[str, tuple[int, int]]:
+        net = {}
+        # the first two lines are headers
+        for line in self._pread("/proc/net/dev").splitlines()[2:]:
+            interface, _, counters = line.partition(b":")
+            counters = counters.split()
+            net[interface.strip().decode()] = (int(counters[0]), int(counters[8]))
+        return net
+
+    def _find_sensors(self) -> dict[str, int]:
+        """Open the hwmon temperature inputs, labeled the way psutil labels them."""
+        sensors = {}
+        unlabeled = 0
+        for path in sorted(glob.glob("/sys/class/hwmon/hwmon*/temp*_input")):
+            directory, filename = os.path.split(path)
+            try:
+                with open(os.path.join(directory, "name")) as file:
+                    module = file.read().strip()
+            except OSError:
+                module = "UNKNOWN"
+            try:
+                with open(os.path.join(directory, filename.replace("_input", "_label"))) as file:
+                    label = file.read().strip()
+            except OSError:
+                label = f"{module}-{unlabeled}"
+                unlabeled += 1
+            if label in sensors:
+                continue
+            try:
+                sensors[label] = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+            except OSError:
+                pass
+        return sensors
+
+    def _read_temperatures(self) -> dict[str, float]:
+        if self._sensors is None:
+            self._sensors = self._find_sensors()
+        temperatures = {}
+        failed = False
+        for label, fd in self._sensors.items():
+            try:
+                temperatures[label] = int(os.pread(fd, 32, 0)) / 1000
+            except (OSError, ValueError):
+                failed = True
+        if failed:
+            # e.g. the device disappeared, look for sensors again next tick
+            for fd in self._sensors.values():
+                os.close(fd)
+            self._sensors = None
+        return temperatures
+
+
+# shared by the widgets on all screens
+SAMPLER = Sampler()
+
+
+class _SampledText(Scheduled, base._TextBox):
+    """A text box showing statistics read by SAMPLER, updated every update_interval."""
+
+    defaults = [("update_interval", 1.0, "Update interval in seconds")]
+
+    def __init__(self, **config):
+        base._TextBox.__init__(self, "", **config)
+        self.add_defaults(_SampledText.defaults)
+        self.schedule_interval = self.update_interval
+
+    def scheduled_update(self):
+        sample = SCHEDULER.memo("sampler", SAMPLER.read)
+        SCHEDULER.update(self, self.format_sample(sample))
+
+    @abc.abstractmethod
+    def format_sample(self, sample: Sample) -> str:
+        """The text shown for sample."""
+
+
+class CPU(_SampledText):
+    """Displays the CPU load, like widget.CPU without the frequencies."""
+
+    defaults = [("format", "CPU {load_percent}%", "CPU display format")]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(CPU.defaults)
+        self.previous = (0, 0)
+
+    def format_sample(self, sample: Sample) -> str:
+        (total, idle), (old_total, old_idle) = sample.cpu_times, self.previous
+        self.previous = sample.cpu_times
+        load = 100 * (1 - (idle - old_idle) / (total - old_total)) if total > old_total else 0.0
+        return self.format.format(load_percent=round(load, 1))
+
+
+class Memory(_SampledText):
+    """Displays memory and swap usage, with the fields of widget.Memory."""
+
+    defaults = [
+        ("format", "{MemUsed: .0f}{mm}/{MemTotal: .0f}{mm}", "Formatting for field names."),
+        ("measure_mem", "M", "Measurement for Memory (G, M, K, B)"),
+        ("measure_swap", "M", "Measurement for Swap (G, M, K, B)"),
+    ]
+
+    measures = {"G": 1024 * 1024 * 1024, "M": 1024 * 1024, "K": 1024, "B": 1}
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(Memory.defaults)
+        self.calc_mem = self.measures[self.measure_mem]
+        self.calc_swap = self.measures[self.measure_swap]
+
+    def format_sample(self, sample: Sample) -> str:
+        info = sample.memory
+        total, free, buffers = info["MemTotal"], info["MemFree"], info["Buffers"]
+        # the same definition of used memory as psutil
+        cached = info["Cached"] + info.get("SReclaimable", 0)
+        used = total - free - cached - buffers
+        if used < 0:
+            used = total - free
+        available = info.get("MemAvailable", free)
+        swap_total, swap_free = info["SwapTotal"], info["SwapFree"]
+        swap_used = swap_total - swap_free
+        return self.format.format(
+            MemUsed=used / self.calc_mem,
+            MemTotal=total / self.calc_mem,
+            MemFree=free / self.calc_mem,
+            MemPercent=round((total - available) / total * 100, 1),
+            Buffers=buffers / self.calc_mem,
+            Active=info["Active"] / self.calc_mem,
+            Inactive=info["Inactive"] / self.calc_mem,
+            Shmem=info["Shmem"] / self.calc_mem,
+            SwapTotal=swap_total / self.calc_swap,
+            SwapFree=swap_free / self.calc_swap,
+            SwapUsed=swap_used / self.calc_swap,
+            SwapPercent=round(swap_used / swap_total * 100, 1) if swap_total else 0.0,
+            mm=self.measure_mem,
+            ms=self.measure_swap,
+        )
+
+
+class Net(_SampledText):
+    """Displays the down and up speed of interfaces, like widget.Net."""
+
+    defaults = [
+        (
+            "format",
+            "{interface}: {down} ↓↑ {up}",
+            "Display format of down/upload/total speed of given interfaces",
+        ),
+        (
+            "interface",
+            None,
+            "List of interfaces or single NIC as string to monitor, "
+            "None to display all NICs combined, "
+            '"default" for the interface of the default route',
+        ),
+        (
+            "average",
+            1,
+            f"Number of samples the speed is averaged over, at most {HISTORY - 1}",
+        ),
+        ("use_bits", False, "Use bits instead of bytes per second?"),
+        ("prefix", None, "Use a specific prefix for the unit of the speed."),
+    ]
+
+    allowed_prefixes = ["", "k", "M", "G", "T", "P", "E", "Z", "Y"]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(Net.defaults)
+        base_unit, self.byte_multiplier = ("b", 8) if self.use_bits else ("B", 1)
+        self.units = [prefix + base_unit for prefix in self.allowed_prefixes]
+        if self.interface is None:
+            self.interface = ["all"]
+        elif isinstance(self.interface, str):
+            self.interface = [self.interface]
+        # the interface and speeds each text was formatted for
+        self._shown: list[Optional[tuple[str, float, float]]] = [None] * len(self.interface)
+        self._texts = [""] * len(self.interface)
+
+    def convert_b(self, num_bytes: float) -> tuple[float, str]:
+        num_bytes *= self.byte_multiplier
+        if self.prefix is not None:
+            power = self.allowed_prefixes.index(self.prefix)
+        elif num_bytes > 0:
+            power = min(int(log(num_bytes) / log(1000)), len(self.units) - 1)
+        else:
+            power = 0
+        return num_bytes / 1000**power, self.units[power]
+
+    def format_sample(self, sample: Sample) -> str:
+        history = SAMPLER.history
+        for position, interface in enumerate(self.interface):
+            if interface == "default":
+                interface = sample.default_interface or "-"
+            if interface == "all":
+                down, up = history.total(self.average)
+            else:
+                down, up = history.rates(interface, self.average)
+            shown = (interface, down, up)
+            if shown == self._shown[position]:
+                # e.g. an idle interface, the text is still right
+                continue
+            self._shown[position] = shown
+            rates = {}
+            for name, value in (("down", down), ("up", up), ("total", down + up)):
+                value, unit = self.convert_b(value)
+                width = 7 - len(unit)
+                rates[name] = f"{value:{width}.2f}"[:width] + unit
+            self._texts[position] = self.format.format(interface=interface, **rates)
+        return " ".join(self._texts)
+
+
+class ThermalSensor(_SampledText):
+    """Displays a temperature of the hwmon sensors, like widget.ThermalSensor."""
+
+    defaults = [
+        ("format", "{temp:.1f}{unit}", "Display string format, with temp, tag and unit"),
+        ("metric", True, "True to use metric/C, False to use imperial/F"),
+        ("tag_sensor", None, 'Tag of the temperature sensor. For example: "temp1" or "Core 0"'),
+        ("threshold", 70, "Above this temperature the foreground_alert colour is used"),
+        ("foreground_alert", "ff0000", "Foreground colour alert"),
+    ]
+
+    def __init__(self, **config):
+        _SampledText.__init__(self, **config)
+        self.add_defaults(ThermalSensor.defaults)
+        self.foreground_normal = self.foreground
+        self.unit = "°C" if self.metric else "°F"
+
+    def format_sample(self, sample: Sample) -> str:
+        tag = self.tag_sensor or next(iter(sample.temperatures), None)
+        if tag not in sample.temperatures:
+            return "N/A"
+        temp = sample.temperatures[tag]
+        if not self.metric:
+            temp = temp * 9 / 5 + 32
+        self.layout.colour = self.foreground_alert if temp > self.threshold else self.foreground_normal
+        return self.format.format(temp=temp, tag=tag, unit=self.unit)
@@ -0,0 +1,266 @@
+"""
+One timer for the periodic updates of all bar widgets.
+
+Every widget of qtile polls on its own timer, so the bars wake qtile up
+at unrelated moments and every update draws on its own. The Scheduler
+runs the updates of all widgets from a single timer instead:
+
+•   updates are aligned to multiples of their interval on the wall
+    clock, so widgets with the same interval are updated in the same
+    wakeup, and a clock showing minutes is updated once a minute, right
+    when the minute changes
+•   the draws of one wakeup are batched: a bar whose widgets changed
+    their width is drawn once, otherwise only the changed widgets are
+•   memo() shares results between the widgets of one wakeup, e.g. the
+    same statistic shown on every screen
+•   widgets on a bar that is hidden or covered by a fullscreen window
+    are updated rarely and refreshed as soon as they are visible again,
+    and widgets on a screen that has not had focus for a while are
+    updated less often. A mirrored widget counts as being on all the
+    bars showing it
+"""
+
+import abc
+import asyncio
+import math
+import time
+from typing import Any, Callable, Optional
+
+from libqtile import hook, widget
+from libqtile.log_utils import logger
+
+VISIBLE = "visible"
+IDLE = "idle"
+COVERED = "covered"
+# from the most to the least visible
+VISIBILITIES = [VISIBLE, IDLE, COVERED]
+
+
+class Job:
+    def __init__(self, widget, interval: float, callback: Callable[[], None], backoff: bool):
+        self.widget = widget
+        self.interval = interval
+        self.callback = callback
+        # whether to update less often on idle screens
+        self.backoff = backoff
+        self.due = 0.0
+        # updates were skipped while the widget was covered
+        self.stale = False
+
+
+class Scheduler:
+    """
+    Runs the updates of widgets aligned to their intervals.
+
+    •   idle_after: seconds after which a screen without focus is idle
+    •   idle_factor: how many times less often widgets on idle screens
+        are updated
+    •   covered_factor: how many times less often widgets on hidden or
+        covered bars are checked, in case nothing tells the Scheduler
+        that they are visible again
+    """
+
+    def __init__(self, idle_after: float = 30, idle_factor: int = 4, covered_factor: int = 10):
+        self.idle_after = idle_after
+        self.idle_factor = idle_factor
+        self.covered_factor = covered_factor
+        self.jobs: list[Job] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._subscribed = False
+        self._memo: dict[Any, Any] = {}
+        # screen index -> when it last had focus, screens that never had
+        # focus count from the start
+        self._started = time.time()
+        self._focused: dict[int, float] = {}
+        # bar -> (widgets to draw, whether the bar has to be drawn)
+        self._draws: dict[Any, tuple[set, bool]] = {}
+
+    def add(self, widget, interval: float, callback: Callable[[], None], backoff: bool = True) -> Job:
+        """Call callback every interval seconds to update widget."""
+        if not self._subscribed:
+            self._subscribed = True
+            for subscribe in (
+                hook.subscribe.current_screen_change,
+                hook.subscribe.float_change,
+                hook.subscribe.focus_change,
+                hook.subscribe.setgroup,
+            ):
+                subscribe(self.wake)
+        job = Job(widget, interval, callback, backoff)
+        self.jobs.append(job)
+        self._schedule()
+        return job
+
+    def remove(self, job: Job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+        if not self.jobs:
+            self._schedule()
+
+    def memo(self, key, function: Callable[[], Any]) -> Any:
+        """Return function(), called at most once per wakeup for every key."""
+        if key not in self._memo:
+            self._memo[key] = function()
+        return self._memo[key]
+
+    def update(self, widget, text: Optional[str]):
+        """Change the text of a TextBox, which is drawn at the end of the wakeup."""
+        text = "" if text is None else text
+        if widget.text == text:
+            return
+        width = widget.layout.width
+        widget.text = text
+        self.request_draw(widget, widget.layout.width != width)
+
+    def request_draw(self, widget, resized: bool):
+        widgets, bar_resized = self._draws.get(widget.bar, (set(), False))
+        widgets.add(widget)
+        self._draws[widget.bar] = (widgets, bar_resized or resized)
+
+    def wake(self, *args):
+        """Refresh widgets that were covered and are visible now."""
+        now = time.time()
+        for job in self.jobs:
+            if job.stale and self._visibility(job.widget, now) != COVERED:
+                job.due = now
+        self._schedule()
+
+    def _visibility(self, widget, now: float) -> str:
+        current = widget.qtile.current_screen
+        self._focused[current.index] = now
+        # a widget mirrored on other bars (see mirror.py) is as visible as its most visible bar
+        bars = [widget.bar]
+        bars.extend(mirror.bar for mirror in getattr(widget, "_mirrors", ()) if mirror.configured)
+        return min((self._bar_visibility(bar, now) for bar in bars), key=VISIBILITIES.index)
+
+    def _bar_visibility(self, bar, now: float) -> str:
+        screen = bar.screen
+        if not bar.is_show() or screen.group is None:
+            return COVERED
+        window = screen.group.current_window
+        if window is not None and window.fullscreen:
+            return COVERED
+        if now - self._focused.get(screen.index, self._started) > self.idle_after:
+            return IDLE
+        return VISIBLE
+
+    def _tick(self):
+        self._timer = None
+        now = time.time()
+        self._memo.clear()
+        for job in list(self.jobs):
+            if job.due > now:
+                # the timer fired early, _schedule re-arms it for the rest,
+                # so that e.g. a clock never shows the minute that just ended
+                continue
+            visibility = self._visibility(job.widget, now)
+            interval = job.interval
+            if visibility == COVERED:
+                job.stale = True
+                interval *= self.covered_factor
+            else:
+                job.stale = False
+                if visibility == IDLE and job.backoff:
+                    interval *= self.idle_factor
+                try:
+                    job.callback()
+                except Exception:
+                    logger.exception("Update of %s failed", job.widget.name)
+            # the next multiple of the interval, so that updates line up
+            job.due = (math.floor(now / interval) + 1) * interval
+
+        self._memo.clear()
+        draws, self._draws = self._draws, {}
+        for bar, (widgets, resized) in draws.items():
+            if resized:
+                bar.draw()
+            else:
+                for changed in widgets:
+                    changed.draw()
+        self._schedule()
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.jobs:
+            return
+        delay = max(min(job.due for job in self.jobs) - time.time(), 0)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._tick)
+
+
+# shared by the widgets on all screens
+SCHEDULER = Scheduler()
+
+
+class Scheduled(abc.ABC):
+    """
+    Mixin for widgets updated by SCHEDULER instead of their own timer.
+
+    Subclasses implement scheduled_update and set schedule_interval.
+    """
+
+    schedule_interval = 1.0
+    schedule_backoff = True
+    # set by timer_setup, which is not called if configuring the bar failed
+    _job: Optional[Job] = None
+
+    def timer_setup(self):
+        self._job = SCHEDULER.add(
+            self, self.schedule_interval, self.scheduled_update, self.schedule_backoff
+        )
+
+    @abc.abstractmethod
+    def scheduled_update(self):
+        """Update the widget, called by SCHEDULER every schedule_interval."""
+
+    def finalize(self):
+        if self._job is not None:
+            SCHEDULER.remove(self._job)
+            self._job = None
+        super().finalize()
+
+
+# strftime directives that change more often than once a minute
+_SECOND_DIRECTIVES = ("%S", "%T", "%X", "%c", "%r", "%s", "%f")
+
+
+class Clock(Scheduled, widget.Clock):
+    """
+    A Clock updated only as often as its format changes.
+
+    A format with seconds is updated every second, any other format on
+    every full minute. The time stays accurate on idle screens.
+    """
+
+    schedule_backoff = False
+
+    def __init__(self, **config):
+        widget.Clock.__init__(self, **config)
+        seconds = any(directive in self.format for directive in _SECOND_DIRECTIVES)
+        self.schedule_interval = 1.0 if seconds else 60.0
+
+    def scheduled_update(self):
+        SCHEDULER.update(self, self.poll())
+
+
+class Volume(Scheduled, widget.Volume):
+    """A Volume that is polled by SCHEDULER, once per wakeup for all screens."""
+
+    def __init__(self, **config):
+        widget.Volume.__init__(self, **config)
+        self.schedule_interval = self.update_interval
+
+    def timer_setup(self):
+        Scheduled.timer_setup(self)
+        if self.theme_path:
+            self.setup_images()
+
+    def scheduled_update(self):
+        command = self.get_volume_command or self.create_amixer_command("sget", self.channel)
+        volume = SCHEDULER.memo(("volume", str(command)), self.get_volume)
+        if volume != self.volume:
+            width = self.layout.width
+            self.volume = volume
+            self._update_drawer()
+            SCHEDULER.request_draw(self, bool(self.theme_path) or self.layout.width != width)
@@ -0,0 +1,75 @@
+"""
+Start scratchpad windows in the background once qtile is up.
+
+The DropDowns are spawned directly through their ScratchPad group and
+registered to be hidden as soon as their window is mapped, so they never
+show up on screen. Launches are staged by priority and limited in number,
+and every launch waits for its window instead of a fixed delay.
+
+ScratchPad has no public way of spawning a DropDown without showing it, so
+this relies on its _spawn and _to_hide internals (qtile 0.22).
+"""
+
+import asyncio
+import itertools
+from typing import Iterable
+
+from libqtile import hook
+from libqtile.log_utils import logger
+
+
+async def autostart(
+    qtile,
+    dropdowns: Iterable[tuple[int, str]],
+    group: str = "scratchpad",
+    concurrency: int = 2,
+    timeout: float = 30,
+):
+    """
+    Spawn the named DropDowns of the ScratchPad group hidden.
+
+    •   dropdowns: (priority, name) pairs, lower priorities are started first
+        and a priority is only started once all windows of the previous one
+        were mapped (or timed out)
+    •   concurrency: the maximum number of windows being started at once
+    •   timeout: seconds to wait for the window of a DropDown
+    """
+    loop = asyncio.get_running_loop()
+    scratchpad = qtile.groups_map[group]
+    semaphore = asyncio.Semaphore(concurrency)
+    # name -> future resolved once the window of the DropDown is managed
+    pending: dict[str, asyncio.Future] = {}
+
+    def check_pending():
+        for name, future in pending.items():
+            if name in scratchpad.dropdowns and not future.done():
+                future.set_result(None)
+
+    def on_client_new(client):
+        # the ScratchPad associates the window in its own client_new hook,
+        # which may run after this one
+        loop.call_soon(check_pending)
+
+    async def launch(name: str):
+        async with semaphore:
+            # already running, e.g. restored after a restart
+            if name in scratchpad.dropdowns or name in scratchpad._spawned:
+                return
+
+            pending[name] = loop.create_future()
+            scratchpad._to_hide.append(name)
+            scratchpad._spawn(scratchpad._dropdownconfig[name])
+            try:
+                await asyncio.wait_for(pending[name], timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Scratchpad %s did not map a window in %ss", name, timeout)
+            finally:
+                del pending[name]
+
+    hook.subscribe.client_new(on_client_new)
+    try:
+        ordered = sorted(dropdowns, key=lambda dropdown: dropdown[0])
+        for _, stage in itertools.groupby(ordered, key=lambda dropdown: dropdown[0]):
+            await asyncio.gather(*(launch(name) for _, name in stage))
+    finally:
+        hook.unsubscribe.client_new(on_client_new)
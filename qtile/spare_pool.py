@@ -0,0 +1,273 @@
+"""
+Keep started but hidden instances of commands, and hand one out when a binding fires.
+
+Starting a terminal or an Emacs frame on demand means waiting for the
+process to start and to create its window. A Pool keeps size windows of
+its command ready in a hidden group and take() moves one of them to the
+current group instead, so it appears right away. The pool is refilled
+in the background afterwards.
+
+The windows of a pool are recognized by a tag, which the command puts
+into its window class or title, e.g. alacritty --class {tag},Alacritty.
+
+Spares are evicted when a pool was not used for idle_timeout seconds, when
+the processes of a pool use more than max_rss of memory, and when less
+than min_available of memory is available. Refills are spawned one
+after another, refill_delay seconds after a spare was taken, so they do
+not compete with the window that was just shown. They are not niced,
+because a process cannot get its priority back after it was handed out.
+"""
+
+import asyncio
+import itertools
+import os
+import shlex
+import subprocess
+import time
+from typing import Optional
+
+from libqtile import hook
+from libqtile.log_utils import logger
+
+
+def _rss(pid: int) -> int:
+    """Resident memory of a process in bytes, 0 if it is gone."""
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _available() -> int:
+    with open("/proc/meminfo") as file:
+        for line in file:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class Spare:
+    def __init__(self, window, pid: Optional[int]):
+        self.window = window
+        # the spawned process, None if the window belongs to another one,
+        # e.g. an emacsclient frame of the Emacs daemon
+        self.pid = pid
+        self.since = time.monotonic()
+
+
+class Pool:
+    """
+    size hidden windows of command, which is formatted with the tag of the
+    window. on_take is formatted with the tag and the arguments of take()
+    and run when a window is handed out, e.g. to rename an Emacs frame.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: str,
+        size: int = 1,
+        on_take: Optional[str] = None,
+        max_rss: float = 512 * 1024 * 1024,
+    ):
+        self.name = name
+        self.command = command
+        self.size = size
+        self.on_take = on_take
+        self.max_rss = max_rss
+        self.ready: list[Spare] = []
+        # tag -> (pid, when it was spawned)
+        self.pending: dict[str, tuple[int, float]] = {}
+        self.last_used = time.monotonic()
+        # evicted for being idle, refilled by the next take
+        self.cold = False
+        self.taken = 0
+        self.misses = 0
+
+
+class Spares:
+    """
+    The pools, their hidden group and the hooks adopting their windows.
+
+    •   refill_delay: seconds after a take before the pool is refilled
+    •   spawn_timeout: seconds to wait for the window of a spawned spare
+    •   idle_timeout: seconds without a take before a pool is evicted
+    •   min_available: bytes of available memory below which all spares
+        are evicted and none are started
+    """
+
+    def __init__(
+        self,
+        pools: list[Pool],
+        group: str = "spare",
+        refill_delay: float = 2,
+        spawn_timeout: float = 30,
+        idle_timeout: float = 1800,
+        min_available: float = 1024 * 1024 * 1024,
+        check_interval: float = 60,
+    ):
+        self.pools = {pool.name: pool for pool in pools}
+        self.group = group
+        self.refill_delay = refill_delay
+        self.spawn_timeout = spawn_timeout
+        self.idle_timeout = idle_timeout
+        self.min_available = min_available
+        self.check_interval = check_interval
+        self.qtile = None
+        self._tags = itertools.count()
+        self._refilling: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def tag(self, pool: Pool) -> str:
+        return f"qtile-spare-{pool.name}-{os.getpid()}-{next(self._tags)}"
+
+    def start(self, qtile):
+        """Create the hidden group and fill the pools, call once qtile runs."""
+        self.qtile = qtile
+        if self.group not in qtile.groups_map:
+            qtile.add_group(self.group)
+        hook.subscribe.client_new(self._on_client_new)
+        hook.subscribe.client_killed(self._on_client_killed)
+        qtile.cmd_spares_status = self.cmd_status
+
+        # spares that survived a restart are still in the hidden group
+        for window in list(qtile.groups_map[self.group].windows):
+            pool = self._pool_of(window)
+            if pool is not None and len(pool.ready) < pool.size:
+                pool.ready.append(Spare(window, None))
+            else:
+                window.kill()
+
+        for pool in self.pools.values():
+            self._refill(pool, delay=0)
+        asyncio.get_running_loop().call_later(self.check_interval, self._check)
+
+    def take(self, qtile, name: str, fallback: Optional[str] = None, **arguments):
+        """Show a window of the pool in the current group, or spawn fallback if it is empty."""
+        pool = self.pools[name]
+        pool.last_used = time.monotonic()
+        pool.cold = False
+        if not pool.ready:
+            pool.misses += 1
+            qtile.cmd_spawn(fallback or pool.command.format(tag=self.tag(pool)))
+            self._refill(pool)
+            return
+
+        spare = pool.ready.pop(0)
+        pool.taken += 1
+        spare.window.togroup(qtile.current_group.name)
+        qtile.current_group.focus(spare.window)
+        if pool.on_take:
+            qtile.cmd_spawn(pool.on_take.format(tag=self._tag_of(spare.window), **arguments))
+        self._refill(pool)
+
+    def cmd_status(self) -> dict:
+        """Return the state of every pool."""
+        return {
+            pool.name: dict(
+                ready=len(pool.ready),
+                pending=len(pool.pending),
+                size=pool.size,
+                cold=pool.cold,
+                taken=pool.taken,
+                misses=pool.misses,
+                rss=self._pool_rss(pool),
+            )
+            for pool in self.pools.values()
+        }
+
+    def _pool_rss(self, pool: Pool) -> int:
+        return sum(_rss(spare.pid) for spare in pool.ready if spare.pid)
+
+    def _tag_of(self, window) -> Optional[str]:
+        for value in [*(window.get_wm_class() or []), window.name or ""]:
+            if value.startswith("qtile-spare-"):
+                return value
+        return None
+
+    def _pool_of(self, window) -> Optional[Pool]:
+        tag = self._tag_of(window)
+        if tag is None:
+            return None
+        return self.pools.get(tag.split("-")[2])
+
+    def _on_client_new(self, window):
+        tag = self._tag_of(window)
+        pool = self._pool_of(window) if tag else None
+        if pool is None or tag not in pool.pending:
+            return
+        pid, _ = pool.pending.pop(tag)
+        # the window of a spawned process, or of a daemon the process talked to
+        pool.ready.append(Spare(window, pid if window.get_pid() == pid else None))
+        window.togroup(self.group)
+
+    def _on_client_killed(self, window):
+        for pool in self.pools.values():
+            pool.ready = [spare for spare in pool.ready if spare.window is not window]
+
+    def _refill(self, pool: Pool, delay: Optional[float] = None):
+        if pool.name in self._refilling or pool.cold:
+            return
+        self._refilling.add(pool.name)
+        task = asyncio.ensure_future(
+            self._fill(pool, self.refill_delay if delay is None else delay)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fill(self, pool: Pool, delay: float):
+        try:
+            await asyncio.sleep(delay)
+            while len(pool.ready) + len(pool.pending) < pool.size and not pool.cold:
+                if _available() < self.min_available:
+                    logger.info("Not starting spares of %s, memory is low", pool.name)
+                    return
+                tag = self.tag(pool)
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *shlex.split(pool.command.format(tag=tag)),
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        start_new_session=True,
+                    )
+                except OSError as error:
+                    logger.warning("Could not start a spare of %s: %s", pool.name, error)
+                    return
+                pool.pending[tag] = (process.pid, time.monotonic())
+                # one spare at a time, so refills stay in the background
+                deadline = time.monotonic() + self.spawn_timeout
+                while tag in pool.pending and time.monotonic() < deadline:
+                    # a client like emacsclient -n may exit before its window shows up
+                    if process.returncode:
+                        break
+                    await asyncio.sleep(0.1)
+                if pool.pending.pop(tag, None) is not None:
+                    logger.warning("No window for the spare %s of %s", tag, pool.name)
+                    return
+        finally:
+            self._refilling.discard(pool.name)
+
+    def _evict(self, pool: Pool, count: int):
+        for spare in pool.ready[len(pool.ready) - count :]:
+            spare.window.kill()
+        del pool.ready[len(pool.ready) - count :]
+
+    def _check(self):
+        now = time.monotonic()
+        low_memory = _available() < self.min_available
+        for pool in self.pools.values():
+            if low_memory or now - pool.last_used > self.idle_timeout:
+                if pool.ready:
+                    logger.info("Evicting the spares of %s", pool.name)
+                pool.cold = not low_memory
+                self._evict(pool, len(pool.ready))
+                continue
+            # the newest spares go first, until the pool fits its memory limit
+            while pool.ready and self._pool_rss(pool) > pool.max_rss:
+                self._evict(pool, 1)
+        asyncio.get_running_loop().call_later(self.check_interval, self._check)
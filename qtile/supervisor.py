@@ -0,0 +1,255 @@
+"""
+Start and supervise the autostart applications from qtile's event loop.
+
+Services are started in stages: a stage only starts once every service of
+the previous stage is ready (or did not become ready in time). Daemons can
+be restarted with exponential backoff when they exit, and heavy
+applications can be started with lower CPU and IO priority. Nothing
+blocks qtile while this happens.
+
+The state of all services is available over qtile's IPC, e.g.
+
+    qtile cmd-obj -o cmd -f supervisor_status
+    qtile cmd-obj -o cmd -f supervisor_restart -a clipboard
+"""
+
+import asyncio
+import itertools
+import os
+import shutil
+import subprocess
+import time
+from typing import Awaitable, Callable, Optional
+
+from libqtile import hook
+from libqtile.log_utils import logger
+
+# a readiness check waits until the started service is ready
+Readiness = Callable[["Service", asyncio.subprocess.Process], Awaitable[None]]
+
+
+def started() -> Readiness:
+    """Ready as soon as the process was started."""
+
+    async def check(service, process):
+        pass
+
+    return check
+
+
+def exited() -> Readiness:
+    """Ready once the process exited successfully, for one-shot commands."""
+
+    async def check(service, process):
+        if await process.wait() != 0:
+            raise RuntimeError(f"exited with status {process.returncode}")
+
+    return check
+
+
+def path_exists(path: str, interval: float = 0.1) -> Readiness:
+    """Ready once path exists, e.g. the socket of a daemon."""
+
+    async def check(service, process):
+        while not os.path.exists(os.path.expanduser(path)):
+            await asyncio.sleep(interval)
+
+    return check
+
+
+def window(wm_class: str) -> Readiness:
+    """Ready once a window with the given WM_CLASS was mapped."""
+
+    async def check(service, process):
+        mapped = asyncio.get_running_loop().create_future()
+
+        def on_client_new(client):
+            if wm_class in (client.get_wm_class() or []) and not mapped.done():
+                mapped.set_result(None)
+
+        hook.subscribe.client_new(on_client_new)
+        try:
+            await mapped
+        finally:
+            hook.unsubscribe.client_new(on_client_new)
+
+    return check
+
+
+class Service:
+    """
+    An application started by the Supervisor.
+
+    •   stage: services are started in ascending stages
+    •   ready: how to tell that the service is ready, see started, exited,
+        path_exists and window
+    •   restart: start the service again whenever it exits
+    •   nice: CPU niceness of the process
+    •   idle_io: only give the process disk time no one else needs
+    """
+
+    def __init__(
+        self,
+        name: str,
+        argv: list[str],
+        stage: int = 0,
+        ready: Optional[Readiness] = None,
+        restart: bool = False,
+        nice: int = 0,
+        idle_io: bool = False,
+    ):
+        self.name = name
+        self.argv = argv
+        self.stage = stage
+        self.ready = ready or started()
+        self.restart = restart
+        self.nice = nice
+        self.idle_io = idle_io
+
+        self.state = "waiting"
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+        self.started_at: Optional[float] = None
+        self.ready_after: Optional[float] = None
+        self.returncode: Optional[int] = None
+
+    def info(self) -> dict:
+        return dict(
+            name=self.name,
+            state=self.state,
+            pid=self.process.pid if self.process else None,
+            stage=self.stage,
+            restarts=self.restarts,
+            ready_after=self.ready_after,
+            uptime=time.monotonic() - self.started_at if self.state == "running" else None,
+            returncode=self.returncode,
+        )
+
+
+class Supervisor:
+    """
+    Starts services in stages and keeps the restartable ones alive.
+
+    •   stage_timeout: seconds to wait for the services of a stage to
+        become ready before starting the next stage anyway
+    •   max_backoff: upper limit in seconds for the delay between restarts,
+        which doubles after every exit shortly after a start
+    """
+
+    def __init__(self, stage_timeout: float = 10, max_backoff: float = 60):
+        self.stage_timeout = stage_timeout
+        self.max_backoff = max_backoff
+        self.services: dict[str, Service] = {}
+        self._stopping = False
+        self._tasks: set[asyncio.Task] = set()
+
+    def register_commands(self, qtile):
+        """Make the status and restart commands available over qtile's IPC."""
+        qtile.cmd_supervisor_status = self.cmd_status
+        qtile.cmd_supervisor_restart = self.cmd_restart
+        hook.subscribe.shutdown(self.stop)
+
+    def cmd_status(self) -> list[dict]:
+        """Return the state of every supervised service."""
+        return [service.info() for service in self.services.values()]
+
+    def cmd_restart(self, name: str):
+        """Terminate the named service, which restarts it if it is restartable."""
+        service = self.services[name]
+        if service.process and service.returncode is None:
+            service.process.terminate()
+        elif not service.restart:
+            self._spawn_task(self._run(service))
+
+    def stop(self):
+        """Stop restarting services, e.g. because qtile shuts down."""
+        self._stopping = True
+
+    async def start(self, services: list[Service]):
+        """Start the services stage by stage, return once the last stage is ready."""
+        for service in services:
+            self.services[service.name] = service
+
+        ordered = sorted(services, key=lambda service: service.stage)
+        for _, stage in itertools.groupby(ordered, key=lambda service: service.stage):
+            stage = list(stage)
+            ready = [asyncio.get_running_loop().create_future() for _ in stage]
+            for service, future in zip(stage, ready):
+                self._spawn_task(self._run(service, future))
+            done, pending = await asyncio.wait(ready, timeout=self.stage_timeout)
+            for service, future in zip(stage, ready):
+                if future in pending:
+                    logger.warning("%s is not ready after %ss", service.name, self.stage_timeout)
+
+    def _spawn_task(self, coroutine):
+        # keep a reference, asyncio only keeps weak ones to running tasks
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _launch(self, service: Service) -> asyncio.subprocess.Process:
+        argv = service.argv
+        if service.idle_io and shutil.which("ionice"):
+            argv = ["ionice", "-c", "3", *argv]
+        nice = service.nice
+        return await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            preexec_fn=(lambda: os.nice(nice)) if nice else None,
+        )
+
+    async def _run(self, service: Service, ready: Optional[asyncio.Future] = None):
+        # doubled before the first restart, which therefore waits a second
+        backoff = 0.5
+        while True:
+            service.state = "starting"
+            service.returncode = None
+            service.started_at = time.monotonic()
+            try:
+                service.process = await self._launch(service)
+            except OSError as error:
+                logger.error("Could not start %s: %s", service.name, error)
+                service.state = "failed"
+                if ready is not None and not ready.done():
+                    ready.set_result(False)
+                return
+
+            readiness = asyncio.ensure_future(self._check_ready(service, ready))
+            service.returncode = await service.process.wait()
+            # give a check waiting for the exit a chance to see it, a service
+            # that exits without being ready will never become ready
+            await asyncio.sleep(0)
+            readiness.cancel()
+            if ready is not None and not ready.done():
+                ready.set_result(False)
+            ready = None
+            uptime = time.monotonic() - service.started_at
+            service.state = "exited" if service.returncode == 0 else "failed"
+
+            if not service.restart or self._stopping:
+                return
+            # only back off for services that keep crashing right after a start
+            backoff = 0.5 if uptime > self.max_backoff else min(backoff * 2, self.max_backoff)
+            logger.warning(
+                "%s exited with %s, restarting in %ss", service.name, service.returncode, backoff
+            )
+            service.state = "restarting"
+            await asyncio.sleep(backoff)
+            service.restarts += 1
+
+    async def _check_ready(self, service: Service, ready: Optional[asyncio.Future]):
+        try:
+            await service.ready(service, service.process)
+        except Exception as error:
+            logger.warning("%s did not become ready: %s", service.name, error)
+            success = False
+        else:
+            success = True
+            service.ready_after = time.monotonic() - service.started_at
+            if service.returncode is None:
+                service.state = "running"
+        if ready is not None and not ready.done():
+            ready.set_result(success)
@@ -0,0 +1,128 @@
+"""Tests of the probe and the evaluation of bench_keys.py, without X or qtile."""
+
+import os
+import runpy
+import types
+
+import pytest
+
+import bench_keys
+import fake_libqtile
+
+
+@pytest.fixture(autouse=True)
+def libqtile():
+    fake_libqtile.install()
+    bench_keys._events.clear()
+    yield
+    bench_keys._events.clear()
+
+
+def test_probe_records_keys_and_hooks():
+    from libqtile import hook
+
+    pressed = []
+    qtile = types.SimpleNamespace(process_key_event=lambda *args: pressed.append(args))
+    assert bench_keys.probe(qtile) == "installed"
+    # installing again does not record every event twice
+    assert bench_keys.probe(qtile) == "installed"
+
+    qtile.process_key_event(36, 64)
+    for callback in hook.subscriptions["client_new"]:
+        callback(types.SimpleNamespace(wid=42))
+    for callback in hook.subscriptions["setgroup"]:
+        callback()
+
+    assert pressed == [(36, 64)]
+    events = bench_keys.drain()
+    assert [(name, wid) for name, _, wid in events] == [
+        ("key", 0),
+        ("client_new", 42),
+        ("setgroup", 0),
+    ]
+    assert [timestamp for _, timestamp, _ in events] == sorted(
+        timestamp for _, timestamp, _ in events
+    )
+    assert bench_keys.drain() == []
+
+
+def test_only_bindings_acting_on_the_nested_qtile_are_pressed(monkeypatch):
+    monkeypatch.setenv("USER", "bench")
+    config = runpy.run_path(os.path.join(bench_keys.HERE, "config.py"))
+    qtile = types.SimpleNamespace(config=types.SimpleNamespace(keys=config["keys"]))
+    pressed = {
+        "-".join([*modifiers, key])
+        for modifiers, key, _, commands in bench_keys.bindings(qtile)
+        if bench_keys.pressable(commands)
+    }
+
+    for binding in ("mod4-Tab", "mod4-x", "mod4-j", "mod4-h", "mod4-p", "mod4-Return"):
+        assert binding in pressed
+    for binding in (
+        "mod4-shift-Escape",
+        "mod4-shift-control-r",
+        "mod4-F5",
+        "mod4-Escape",
+        "Print",
+        "XF86AudioMute",
+        "XF86AudioRaiseVolume",
+        "XF86MonBrightnessUp",
+        "XF86AudioPlay",
+        "mod4-mod1-r",
+    ):
+        assert binding not in pressed
+
+
+def test_pressable():
+    assert bench_keys.pressable([("next_layout", "")])
+    assert bench_keys.pressable([("function", "_switch"), ("togroup", "")])
+    assert not bench_keys.pressable([])
+    assert not bench_keys.pressable([("spawn", "")])
+    assert not bench_keys.pressable([("function", "<lambda>")])
+    assert not bench_keys.pressable([("next_layout", ""), ("spawn", "")])
+
+
+def test_summarize():
+    results = [
+        {"first": 0.001, "settled": 0.010, "hooks": ["client_new", "client_focus"]},
+        {"first": 0.002, "settled": 0.030, "hooks": ["client_new"]},
+        {"first": None, "settled": None, "hooks": []},
+        {"first": 0.003, "settled": 0.020, "hooks": ["client_new"]},
+    ]
+    summary = bench_keys.summarize(results)
+    assert summary["runs"] == 4
+    assert summary["no_effect"] == 1
+    assert summary["first"] == {"p50": 0.002, "p95": 0.003, "max": 0.003}
+    assert summary["settled"] == {"p50": 0.020, "p95": 0.030, "max": 0.030}
+    assert summary["hooks"] == ["client_new"]
+
+    nothing = bench_keys.summarize([{"first": None, "settled": None, "hooks": []}])
+    assert nothing == {"runs": 1, "no_effect": 1, "hooks": []}
+
+
+def summary(p50: float, p95: float) -> dict:
+    return {"runs": 5, "no_effect": 0, "settled": {"p50": p50, "p95": p95, "max": p95}}
+
+
+def test_compare(capsys):
+    baseline = {
+        "fast": summary(0.010, 0.020),
+        "slow": summary(0.010, 0.020),
+        "gone": summary(0.010, 0.020),
+        "idle": {"runs": 5, "no_effect": 5, "hooks": []},
+    }
+    within = {
+        "fast": summary(0.012, 0.024),
+        "idle": {"runs": 5, "no_effect": 5, "hooks": []},
+        "new": summary(1.0, 1.0),
+    }
+    assert not bench_keys.compare(baseline, within, tolerance=0.25)
+
+    worse = {
+        "slow": summary(0.010, 0.030),
+        "gone": {"runs": 5, "no_effect": 5, "hooks": []},
+    }
+    assert bench_keys.compare(baseline, worse, tolerance=0.25)
+    output = capsys.readouterr().out
+    assert "REGRESSION slow: settled p95 20.00 -> 30.00 ms" in output
+    assert "REGRESSION gone: no longer has an effect" in output
@@ -0,0 +1,110 @@
+"""
+A WindowName that keeps up with windows changing their title many times a second.
+
+qtile's WindowName draws on every title change, and because the width of
+its text changes with the title, every change draws the whole bar. While
+a terminal runs a build or a browser loads a page that is many bar
+redraws per second.
+
+This WindowName applies the first title change right away and coalesces
+the title changes following within the debounce interval into one. A
+change of focus or of the floating state is shown right away, so
+switching windows never shows the title of the previous one. It only shows
+as many characters as fit into the bar, never redraws if those did not
+change, and only draws itself: its width is the space left by the other
+widgets, whatever the title, so the bar never needs to be drawn for it.
+The pango layout of the widget is reused for every title.
+"""
+
+import asyncio
+
+from libqtile import bar, hook, widget
+from libqtile.widget import base
+
+
+class WindowName(widget.WindowName):
+    defaults = [
+        ("debounce", 0.1, "Seconds in which title changes are coalesced into one redraw"),
+    ]
+
+    def __init__(self, width=bar.STRETCH, **config):
+        widget.WindowName.__init__(self, width=width, **config)
+        self.add_defaults(WindowName.defaults)
+        self._title = ""
+        # the length the visible text was cut for
+        self._cut_for = None
+        self._char_width = None
+        self._timer = None
+        self._last_update = None
+
+    def _configure(self, qtile, bar):
+        base._TextBox._configure(self, qtile, bar)
+        hook.subscribe.client_name_updated(self._title_changed)
+        hook.subscribe.focus_change(self.hook_response)
+        hook.subscribe.float_change(self.hook_response)
+        hook.subscribe.current_screen_change(self.hook_response_current_screen)
+
+    def remove_hooks(self):
+        hook.unsubscribe.client_name_updated(self._title_changed)
+        hook.unsubscribe.focus_change(self.hook_response)
+        hook.unsubscribe.float_change(self.hook_response)
+        hook.unsubscribe.current_screen_change(self.hook_response_current_screen)
+        self._cancel()
+
+    def _title_changed(self, *args):
+        if self._timer is not None:
+            # a redraw is already coming up
+            return
+        now = asyncio.get_running_loop().time()
+        if self._last_update is None or now - self._last_update >= self.debounce:
+            self.hook_response()
+        else:
+            self._timer = self.timeout_add(
+                self._last_update + self.debounce - now, self.hook_response
+            )
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def hook_response(self, *args):
+        # shows the current window, so a pending title change is included
+        self._cancel()
+        self._last_update = asyncio.get_running_loop().time()
+        widget.WindowName.hook_response(self)
+
+    def update(self, text):
+        self._title = text or ""
+        self._show()
+
+    def _visible(self) -> str:
+        """The part of the title that fits into the widget."""
+        if not self.length or not self.fontsize:
+            return self._title
+        if self._char_width is None:
+            # measured once, half the width of a digit leaves room for narrow
+            # characters, an upper bound of the visible characters is enough
+            self.layout.text = "0" * 10
+            self._char_width = max(self.layout.width / 10, 1) / 2
+            self.layout.text = self.formatted_text
+        self._cut_for = self.length
+        visible = self._title[: int(self.length / self._char_width) + 1]
+        # the title is escaped markup, do not cut it inside of an entity
+        ampersand = visible.rfind("&")
+        if ampersand > visible.rfind(";"):
+            visible = visible[:ampersand]
+        return visible
+
+    def _show(self):
+        visible = self._visible()
+        if visible == self.text:
+            return
+        self.text = visible
+        self.draw()
+
+    def draw(self):
+        if self._cut_for != self.length:
+            # the bar changed the width of the widget, cut the title again
+            self.text = self._visible()
+        widget.WindowName.draw(self)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+"""
+Startup latency benchmark for river/init.
+
+Runs main() of the init script against FakeRiver and stand-ins for
+riverctl, rivertile and alacritty that only log their invocation, so it
+works on any Linux machine without a compositor. For every backend of
+river_utils, both for a fresh session (full) and for running init again
+without changes (reapply), it reports the wall time of main(), the time
+until the last command reached river, the number of commands and the
+programs started, and the latency distribution of every helper.
+
+    python bench_init.py --runs 10
+    python bench_init.py --save baseline.json
+    python bench_init.py --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import functools
+import importlib.machinery
+import importlib.util
+import json
+import os
+import shutil
+import signal
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+import fake_river
+import river_utils
+import rivertile_utils
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HELPERS = [
+    "map",
+    "map_pointer",
+    "declare_mode",
+    "set_repeat",
+    "color",
+    "add_filter",
+    "set_default_layout",
+    "set_current_layout",
+]
+
+# bash, because $EPOCHREALTIME lets the stand-ins timestamp without running date
+STAND_IN = """#!{bash}
+printf '%s %s\\n' "$EPOCHREALTIME" "${{0##*/}}" >> "$RIVER_BENCH_LOG"
+"""
+STAND_INS = ["riverctl", "rivertile", "alacritty"]
+
+
+def load_init():
+    """Import the init script, which has no .py suffix, as a module."""
+    loader = importlib.machinery.SourceFileLoader(
+        "river_init", os.path.join(HERE, "init")
+    )
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+@contextmanager
+def timed(latencies: dict[str, list[float]]) -> Iterator[None]:
+    """Record the duration of every call of the helpers, batch flushes and rivertile.start."""
+    originals = []
+
+    def wrap(owner, name: str, label: str):
+        function = getattr(owner, name)
+        originals.append((owner, name, function))
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                latencies.setdefault(label, []).append(time.perf_counter() - start)
+
+        setattr(owner, name, wrapper)
+
+    for name in HELPERS:
+        wrap(river_utils, name, name)
+    wrap(river_utils.Batch, "flush", "Batch.flush")
+    wrap(rivertile_utils, "start", "rivertile.start")
+    try:
+        yield
+    finally:
+        for owner, name, function in reversed(originals):
+            setattr(owner, name, function)
+
+
+@contextmanager
+def environment(**variables: str) -> Iterator[None]:
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def silenced() -> Iterator[None]:
+    """Send stdout and stderr to /dev/null, including those of forked children."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    null = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(null, 1)
+    os.dup2(null, 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (*saved, null):
+            os.close(fd)
+
+
+@contextmanager
+def layout_generators() -> Iterator[None]:
+    """
+    Stop the layout generators forked by rivertile_utils.start on exit.
+
+    They must be gone before FakeRiver and the temporary directory are:
+    a generator that loses its connection would otherwise outlive the
+    run, and one that cannot connect must not execute the rivertile
+    stand-in, which writes into the directory while it is removed.
+    """
+    start = rivertile_utils.start
+    pids = []
+
+    @functools.wraps(start)
+    def wrapper(*args, **kwargs):
+        pid = start(*args, fallback=False, **kwargs)
+        pids.append(pid)
+        return pid
+
+    rivertile_utils.start = wrapper
+    try:
+        yield
+    finally:
+        rivertile_utils.start = start
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+
+
+def run_once(init, backend: str, reapply: bool) -> dict:
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        fake_river.FakeRiver() as river,
+        layout_generators(),
+    ):
+        bin_directory = os.path.join(directory, "bin")
+        os.mkdir(bin_directory)
+        for name in STAND_INS:
+            path = os.path.join(bin_directory, name)
+            with open(path, "w") as file:
+                file.write(STAND_IN.format(bash=shutil.which("bash")))
+            os.chmod(path, 0o755)
+        log = os.path.join(directory, "log")
+
+        with environment(
+            PATH=f"{bin_directory}:{os.environ['PATH']}",
+            RIVER_BENCH_LOG=log,
+            WAYLAND_DISPLAY=river.path,
+            XDG_RUNTIME_DIR=directory,
+        ):
+            river_utils.set_backend(backend)
+            if reapply:
+                # apply the configuration once, so that the measured run only re-applies
+                with silenced():
+                    init.main()
+                river.commands.clear()
+                os.remove(log)
+
+            latencies: dict[str, list[float]] = {}
+            start_wall, start = time.time(), time.perf_counter()
+            with timed(latencies), silenced():
+                init.main()
+            wall = time.perf_counter() - start
+            river_utils.set_backend(None)
+
+        programs: Counter = Counter()
+        received = [timestamp - start for timestamp, _ in river.commands]
+        with open(log) as file:
+            for line in file:
+                timestamp, program = line.split()
+                programs[program] += 1
+                if program == "riverctl":
+                    received.append(float(timestamp) - start_wall)
+
+    return {
+        "wall": wall,
+        "configured": max(received, default=0.0),
+        "commands": len(received),
+        "programs": dict(programs),
+        "latencies": latencies,
+    }
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(results: list[dict]) -> dict:
+    latencies: dict[str, list[float]] = {}
+    for result in results:
+        for label, values in result["latencies"].items():
+            latencies.setdefault(label, []).extend(values)
+    return {
+        "wall": statistics.median(result["wall"] for result in results),
+        "configured": statistics.median(result["configured"] for result in results),
+        "commands": results[-1]["commands"],
+        "processes": sum(results[-1]["programs"].values()),
+        "programs": results[-1]["programs"],
+        "latencies": latencies,
+    }
+
+
+def report(name: str, summary: dict):
+    print(f"== {name}")
+    print(f"   main() wall time      {summary['wall'] * 1000:9.2f} ms (median)")
+    print(f"   last command received {summary['configured'] * 1000:9.2f} ms (median)")
+    print(f"   commands received     {summary['commands']:9d}")
+    programs = ", ".join(
+        f"{program} {count}" for program, count in sorted(summary["programs"].items())
+    )
+    print(f"   programs started      {summary['processes']:9d} ({programs})")
+    print(
+        f"   {'helper':<20}{'calls':>7}{'p50 µs':>11}{'p95 µs':>11}"
+        f"{'max µs':>11}{'total ms':>11}"
+    )
+    for label, values in sorted(
+        summary["latencies"].items(), key=lambda item: -sum(item[1])
+    ):
+        print(
+            f"   {label:<20}{len(values):>7}"
+            f"{percentile(values, 0.5) * 1e6:>11.1f}"
+            f"{percentile(values, 0.95) * 1e6:>11.1f}"
+            f"{max(values) * 1e6:>11.1f}"
+            f"{sum(values) * 1000:>11.2f}"
+        )
+
+
+def compare(baseline: dict, summaries: dict[str, dict], tolerance: float) -> bool:
+    """Print regressions against baseline and return whether there were any."""
+    regressed = False
+    for name, summary in summaries.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        problems = []
+        if summary["wall"] > before["wall"] * (1 + tolerance):
+            problems.append(
+                f"wall time {before['wall'] * 1000:.2f} -> {summary['wall'] * 1000:.2f} ms"
+            )
+        for counter in ("commands", "processes"):
+            if summary[counter] > before[counter]:
+                problems.append(f"{counter} {before[counter]} -> {summary[counter]}")
+        if problems:
+            regressed = True
+            print(f"REGRESSION {name}: {'; '.join(problems)}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=list(river_utils.BACKENDS))
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="compare the results to this baseline file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative increase of the wall time before --compare fails",
+    )
+    args = parser.parse_args()
+
+    init = load_init()
+    summaries = {}
+    for backend in args.backends:
+        for reapply in (False, True):
+            name = f"{backend}/{'reapply' if reapply else 'full'}"
+            results = [run_once(init, backend, reapply) for _ in range(args.runs)]
+            summaries[name] = summarize(results)
+            report(name, summaries[name])
+
+    stored = {
+        name: {key: summary[key] for key in ("wall", "commands", "processes")}
+        for name, summary in summaries.items()
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(stored, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(json.load(file), stored, args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+A stand-in for river that listens on a local Wayland socket.
+
+It implements just enough of the compositor side of the protocols used by
+river_utils to answer its requests, and records every message it receives,
+so that the configuration can be exercised on a machine without river:
+
+    with FakeRiver() as river:
+        river_utils.RiverControl(river.path).run([["spawn", "alacritty"]])
+    print(river.commands)
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+import river_utils
+import rivertile_utils
+import wayland
+
+
+class FakeRiver:
+    """
+    A fake compositor serving every client in its own thread.
+
+    •   fail: called with the arguments of every command, returns an error
+        message to let the command fail or None to let it succeed
+    •   messages: every received message as (interface, opcode, payload)
+    •   commands: every command run via zriver_control_v1 as (timestamp, args)
+    •   outputs: number of wl_output globals to announce
+
+    Layouts registered by layout generators can be driven with
+    demand_layout and send_layout_command.
+    """
+
+    def __init__(
+        self,
+        fail: Callable[[list[str]], Optional[str]] = lambda args: None,
+        outputs: int = 1,
+    ):
+        self.fail = fail
+        self.globals = ["wl_seat", "zriver_control_v1", "river_layout_manager_v3"]
+        self.globals += ["wl_output"] * outputs
+        self.messages: list[tuple[str, int, bytes]] = []
+        self.commands: list[tuple[float, list[str]]] = []
+        self.connections = 0
+        # (session, layout id) of every river_layout_v3 object, in creation order
+        self.layouts: list[tuple["_Session", int]] = []
+        # serial -> (layout name, views) of every committed layout
+        self.committed: dict[int, tuple[str, list[tuple[int, int, int, int]]]] = {}
+        self._serial = 0
+        self._clients: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, "wayland-fake")
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    @property
+    def environ(self) -> dict[str, str]:
+        return {"WAYLAND_DISPLAY": self.path}
+
+    def start(self):
+        self._server.bind(self.path)
+        self._server.listen()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def stop(self):
+        """Stop listening and disconnect all clients, like river exiting."""
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                try:
+                    client.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._directory.cleanup()
+
+    def __enter__(self) -> "FakeRiver":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def demand_layout(
+        self, view_count: int, width: int, height: int, output: int = 0
+    ) -> tuple[str, list[tuple[int, int, int, int]]]:
+        """Ask the layout of the given output for a layout and wait for its commit."""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.layouts) > output, timeout=5)
+            session, layout = self.layouts[output]
+            self._serial += 1
+            serial = self._serial
+        session.send(
+            layout,
+            rivertile_utils.LAYOUT_DEMAND,
+            "uuuuu",
+            view_count,
+            width,
+            height,
+            1,
+            serial,
+        )
+        session.flush()
+        with self._changed:
+            if not self._changed.wait_for(lambda: serial in self.committed, timeout=5):
+                raise TimeoutError(f"Layout {serial} was not committed")
+            return self.committed[serial]
+
+    def send_layout_command(self, command: str, output: int = 0):
+        """Send a command to the layout of the given output like send-layout-cmd."""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.layouts) > output, timeout=5)
+            session, layout = self.layouts[output]
+        session.send(layout, rivertile_utils.LAYOUT_USER_COMMAND, "s", command)
+        session.flush()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+                self._clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client: socket.socket):
+        session = _Session(self, client)
+        buffer = bytearray()
+        with client:
+            while True:
+                try:
+                    data = client.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                buffer += data
+                for object_id, opcode, payload in wayland.split_messages(buffer):
+                    session.handle(object_id, opcode, payload)
+                try:
+                    session.flush()
+                except OSError:
+                    # the client is gone already
+                    return
+
+    def record(self, interface: str, opcode: int, payload: bytes):
+        with self._lock:
+            self.messages.append((interface, opcode, payload))
+
+    def record_command(self, args: list[str]):
+        with self._lock:
+            self.commands.append((time.perf_counter(), args))
+
+
+class _Session:
+    """The compositor side state of a single client connection."""
+
+    def __init__(self, river: FakeRiver, client: socket.socket):
+        self.river = river
+        self.client = client
+        self.objects = {wayland.DISPLAY_ID: "wl_display"}
+        self.arguments: dict[int, list[str]] = {}
+        self.views: dict[int, list[tuple[int, int, int, int]]] = {}
+        self._output = bytearray()
+        # events are also sent from the thread driving the layouts
+        self._lock = threading.Lock()
+
+    def send(self, object_id: int, opcode: int, signature: str = "", *args):
+        with self._lock:
+            self._output += wayland.message(
+                object_id, opcode, wayland.pack(signature, *args)
+            )
+
+    def flush(self):
+        with self._lock:
+            if self._output:
+                self.client.sendall(self._output)
+                self._output.clear()
+
+    def delete(self, object_id: int):
+        self.objects.pop(object_id, None)
+        self.send(wayland.DISPLAY_ID, wayland.DISPLAY_DELETE_ID, "u", object_id)
+
+    def handle(self, object_id: int, opcode: int, payload: bytes):
+        interface = self.objects.get(object_id, "unknown")
+        self.river.record(interface, opcode, payload)
+        handler = getattr(self, f"on_{interface}", None)
+        if handler is not None:
+            handler(object_id, opcode, payload)
+
+    def on_wl_display(self, object_id: int, opcode: int, payload: bytes):
+        (new_id,) = wayland.unpack("u", payload)
+        if opcode == wayland.DISPLAY_SYNC:
+            self.send(new_id, wayland.CALLBACK_DONE, "u", 0)
+            self.delete(new_id)
+        elif opcode == wayland.DISPLAY_GET_REGISTRY:
+            self.objects[new_id] = "wl_registry"
+            for name, interface in enumerate(self.river.globals, 1):
+                self.send(new_id, wayland.REGISTRY_GLOBAL, "usu", name, interface, 1)
+
+    def on_wl_registry(self, object_id: int, opcode: int, payload: bytes):
+        if opcode == wayland.REGISTRY_BIND:
+            _, interface, _, new_id = wayland.unpack("usuu", payload)
+            self.objects[new_id] = interface
+
+    def on_zriver_control_v1(self, object_id: int, opcode: int, payload: bytes):
+        arguments = self.arguments.setdefault(object_id, [])
+        if opcode == river_utils.CONTROL_ADD_ARGUMENT:
+            arguments.append(wayland.unpack("s", payload)[0])
+        elif opcode == river_utils.CONTROL_RUN_COMMAND:
+            _, callback = wayland.unpack("uu", payload)
+            args = self.arguments.pop(object_id)
+            self.river.record_command(args)
+            error = self.river.fail(args)
+            if error is None:
+                self.send(callback, river_utils.COMMAND_SUCCESS, "s", "")
+            else:
+                self.send(callback, river_utils.COMMAND_FAILURE, "s", error)
+            self.delete(callback)
+
+    def on_river_layout_manager_v3(self, object_id: int, opcode: int, payload: bytes):
+        if opcode == rivertile_utils.MANAGER_GET_LAYOUT:
+            new_id, _, _ = wayland.unpack("uus", payload)
+            self.objects[new_id] = "river_layout_v3"
+            with self.river._changed:
+                self.river.layouts.append((self, new_id))
+                self.river._changed.notify_all()
+
+    def on_river_layout_v3(self, object_id: int, opcode: int, payload: bytes):
+        if opcode == rivertile_utils.LAYOUT_PUSH_VIEW_DIMENSIONS:
+            *view, serial = wayland.unpack("iiuuu", payload)
+            self.views.setdefault(serial, []).append(tuple(view))
+        elif opcode == rivertile_utils.LAYOUT_COMMIT:
+            name, serial = wayland.unpack("su", payload)
+            with self.river._changed:
+                self.river.committed[serial] = (name, self.views.pop(serial, []))
+                self.river._changed.notify_all()
@@ -0,0 +1,154 @@
+"""
+Snapshots of the configuration applied to river, and the difference between two of them.
+
+A state maps the identity of every setting (e.g. the mode, modifiers and
+key of a mapping) to the command that established it. Commands that do
+not establish a setting, like spawn, have no identity and are not part of
+a state.
+"""
+
+import json
+import os
+from typing import Optional
+
+import wayland
+
+State = dict[tuple, list[str]]
+
+# commands that set a single global value, the last one wins
+SETTINGS = {
+    "attach-mode",
+    "background-color",
+    "border-color-focused",
+    "border-color-unfocused",
+    "border-color-urgent",
+    "border-width",
+    "default-layout",
+    "focus-follows-cursor",
+    "hide-cursor",
+    "set-cursor-warp",
+    "set-repeat",
+    "xcursor-theme",
+}
+
+
+def _split_map(args: list[str]) -> tuple[list[str], list[str]]:
+    """Split the arguments of a map command into its flags and the rest."""
+    index = 1
+    while index < len(args) and args[index].startswith("-"):
+        # -layout takes the index of the layout as its argument
+        index += 2 if args[index] == "-layout" else 1
+    return args[1:index], args[index:]
+
+
+def identity(args: list[str]) -> Optional[tuple]:
+    """Return the identity of the setting established by a command, if any."""
+    command = args[0]
+    if command == "map":
+        flags, (mode, modifiers, key, *_) = _split_map(args)
+        return (command, mode, modifiers, key, "-release" in flags)
+    if command == "map-pointer":
+        return (command, *args[1:4])
+    if command == "declare-mode":
+        return (command, args[1])
+    if command.endswith("-filter-add"):
+        return (command, *args[1:3])
+    if command in SETTINGS:
+        return (command,)
+    return None
+
+
+def removal(args: list[str]) -> Optional[list[str]]:
+    """Return the command undoing a command, if river has one."""
+    command = args[0]
+    if command == "map":
+        flags, (mode, modifiers, key, *_) = _split_map(args)
+        release = ["-release"] if "-release" in flags else []
+        return ["unmap", *release, mode, modifiers, key]
+    if command == "map-pointer":
+        return ["unmap-pointer", *args[1:4]]
+    if command.endswith("-filter-add"):
+        return [command.removesuffix("-add") + "-remove", *args[1:3]]
+    return None
+
+
+def from_commands(commands: list[list[str]]) -> State:
+    state = {}
+    for args in commands:
+        key = identity(args)
+        if key is not None:
+            state[key] = args
+    return state
+
+
+def diff(
+    old: State, new: State, commands: list[list[str]]
+) -> list[tuple[Optional[tuple], list[str]]]:
+    """
+    Return the commands turning old into the state established by commands.
+
+    new is that state, see from_commands. Every command is paired with the
+    identity of the setting it changes: settings missing from new are
+    removed (if river can remove them), changed settings are sent again and
+    commands without identity are always sent.
+    """
+    changes: list[tuple[Optional[tuple], list[str]]] = []
+    for key, args in old.items():
+        if key not in new:
+            undo = removal(args)
+            if undo is not None:
+                changes.append((key, undo))
+
+    for args in commands:
+        key = identity(args)
+        if key is None:
+            changes.append((None, args))
+        elif new[key] is args and old.get(key) != args:
+            changes.append((key, args))
+    return changes
+
+
+def compositor_id(environ: Optional[dict] = None) -> Optional[str]:
+    """
+    Identify the running compositor by its socket.
+
+    A new river session creates a new socket, so a snapshot taken in an
+    earlier session is never mistaken for the current state.
+    """
+    try:
+        stat = os.stat(wayland.socket_path(environ))
+    except (OSError, wayland.WaylandError):
+        return None
+    return f"{stat.st_dev}:{stat.st_ino}:{stat.st_ctime_ns}"
+
+
+def default_path(environ: Optional[dict] = None) -> Optional[str]:
+    environ = os.environ if environ is None else environ
+    runtime_dir = environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        return None
+    display = os.path.basename(environ.get("WAYLAND_DISPLAY", "wayland"))
+    return os.path.join(runtime_dir, f"river_utils-{display}.json")
+
+
+def load(path: str, compositor: Optional[str]) -> State:
+    """Load the snapshot at path, or an empty state if it belongs to another session."""
+    if compositor is None:
+        return {}
+    try:
+        with open(path) as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if snapshot.get("compositor") != compositor:
+        return {}
+    return from_commands(snapshot["commands"])
+
+
+def save(path: str, compositor: Optional[str], state: State):
+    if compositor is None:
+        return
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"compositor": compositor, "commands": list(state.values())}, file)
+    os.replace(temporary, path)
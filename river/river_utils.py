@@ -1,5 +1,327 @@
 import os
-from typing import Collection, Literal, Optional
+import shlex
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Collection, Iterator, Literal, Optional
+
+import river_state
+import wayland
+
+# commands that others depend on and that therefore have to be sent first,
+# e.g. a mode has to be declared before anything can be mapped in it
+_PRIORITY = {"declare-mode": 0}
+
+# zriver_control_v1 requests
+CONTROL_ADD_ARGUMENT = 1
+CONTROL_RUN_COMMAND = 2
+# zriver_command_callback_v1 events
+COMMAND_SUCCESS = 0
+COMMAND_FAILURE = 1
+
+# (command, error message) of every command river rejected
+Failures = list[tuple[list[str], str]]
+
+
+class Batch:
+    """
+    Collects riverctl commands and sends them in a single flush.
+
+    Commands are flushed in the order they were added, except that commands
+    other commands depend on (e.g. declare-mode) are moved to the front.
+    After the flush, failures contains one (command, message) pair for every
+    command river rejected.
+    """
+
+    def __init__(self):
+        self.commands: list[list[str]] = []
+        self.failures: Failures = []
+
+    def add(self, args: list[str]):
+        self.commands.append(args)
+
+    def flush(self) -> Failures:
+        commands = sorted(
+            self.commands, key=lambda args: _PRIORITY.get(args[0], len(_PRIORITY))
+        )
+        self.commands = []
+        failures = _execute(commands)
+        _report(failures)
+        self.failures.extend(failures)
+        return failures
+
+
+_batch: Optional[Batch] = None
+
+
+@contextmanager
+def batch() -> Iterator[Batch]:
+    """
+    Collect all commands issued inside the with-block and send them in one flush on exit.
+
+    Nested batches are merged into the outermost one.
+    """
+    global _batch
+    if _batch is not None:
+        yield _batch
+        return
+
+    _batch = Batch()
+    try:
+        yield _batch
+    finally:
+        current, _batch = _batch, None
+    current.flush()
+
+
+@contextmanager
+def apply(snapshot: Optional[str] = None) -> Iterator[Batch]:
+    """
+    Like batch, but only send what changed since the last apply in this river session.
+
+    The configuration applied last is kept in the snapshot file (by default
+    in XDG_RUNTIME_DIR). Mappings, pointer mappings and filters that are not
+    issued again are removed from river, settings that did not change are
+    not sent again. Commands that do not establish a setting, like spawn,
+    are always sent.
+    """
+    global _batch
+    if _batch is not None:
+        yield _batch
+        return
+
+    snapshot = snapshot or river_state.default_path()
+    compositor = river_state.compositor_id()
+    _batch = Batch()
+    try:
+        yield _batch
+    finally:
+        current, _batch = _batch, None
+
+    old = river_state.load(snapshot, compositor) if snapshot else {}
+    new = river_state.from_commands(current.commands)
+    changes = river_state.diff(old, new, current.commands)
+    current.commands = [args for _, args in changes]
+    failed = {id(args) for args, _ in current.flush()}
+
+    # remember what river actually accepted
+    state = dict(old)
+    for key, args in changes:
+        if key is None or id(args) in failed:
+            continue
+        if args is new.get(key):
+            state[key] = args
+        else:
+            del state[key]
+    if snapshot:
+        river_state.save(snapshot, compositor, state)
+
+
+def _riverctl_process(args: list[str]) -> Optional[str]:
+    """Run riverctl with args and return its error message if it failed."""
+    result = subprocess.run(
+        ["riverctl", *args], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        return result.stderr.decode().strip()
+    return None
+
+
+def _run_riverctl(commands: list[list[str]]) -> Failures:
+    """Run the given commands in order, one riverctl process each."""
+    failures = []
+    for args in commands:
+        message = _riverctl_process(args)
+        if message is not None:
+            failures.append((args, message))
+    return failures
+
+
+def _stages(commands: list[list[str]]) -> Iterator[list[list[list[str]]]]:
+    """
+    Split commands into stages of independent chains.
+
+    The chains of a stage may run concurrently, the commands of a chain have
+    to run in order and a stage has to be finished before the next starts:
+    •   modes are declared before anything else
+    •   commands changing the same setting (see river_state.identity) keep
+        their order
+    •   commands that do not change a setting, like spawn or output-layout,
+        may depend on everything before them, so they run on their own
+    """
+    modes = [args for args in commands if args[0] == "declare-mode"]
+    if modes:
+        yield [[args] for args in modes]
+
+    chains: dict[tuple, list[list[str]]] = {}
+    for args in commands:
+        if args[0] == "declare-mode":
+            continue
+        key = river_state.identity(args)
+        if key is None:
+            if chains:
+                yield list(chains.values())
+                chains = {}
+            yield [[args]]
+        else:
+            chains.setdefault(key, []).append(args)
+    if chains:
+        yield list(chains.values())
+
+
+def _run_riverctl_pool(commands: list[list[str]]) -> Failures:
+    """Run the given commands with riverctl processes on all cores, see _stages."""
+    messages: dict[int, Optional[str]] = {}
+
+    def run_chain(chain: list[list[str]]):
+        for args in chain:
+            messages[id(args)] = _riverctl_process(args)
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        for stage in _stages(commands):
+            # list() waits for the whole stage and raises errors of the chains
+            list(pool.map(run_chain, stage))
+
+    return [
+        (args, messages[id(args)])
+        for args in commands
+        if messages.get(id(args)) is not None
+    ]
+
+
+class RiverControl:
+    """
+    A persistent connection to river speaking the river-control-unstable-v1 protocol.
+
+    This is what riverctl does internally, but all commands share one
+    connection and are pipelined: every command is sent before waiting for
+    the first reply. River executes the requests of a connection in order.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.connection = wayland.Connection(path)
+        try:
+            self.control = self.connection.bind("zriver_control_v1", 1)
+            self.seat = self.connection.bind("wl_seat", 1)
+        except wayland.WaylandError:
+            self.connection.close()
+            raise
+
+    def run(self, commands: list[list[str]]) -> Failures:
+        """Run the given commands in order and return the failed ones."""
+        replies: dict[int, Optional[str]] = {}
+
+        def on_reply(index: int) -> wayland.Handler:
+            def handler(opcode: int, payload: bytes):
+                message = wayland.unpack("s", payload)[0]
+                replies[index] = message if opcode == COMMAND_FAILURE else None
+
+            return handler
+
+        for index, args in enumerate(commands):
+            for arg in args:
+                self.connection.send(self.control, CONTROL_ADD_ARGUMENT, "s", arg)
+            callback = self.connection.new_id(on_reply(index))
+            self.connection.send(
+                self.control, CONTROL_RUN_COMMAND, "uu", self.seat, callback
+            )
+
+        while len(replies) < len(commands):
+            self.connection.dispatch()
+
+        return [
+            (commands[index], message or "")
+            for index, message in sorted(replies.items())
+            if message is not None
+        ]
+
+    def close(self):
+        self.connection.close()
+
+
+_control: Optional[RiverControl] = None
+
+
+def _run_native(commands: list[list[str]]) -> Failures:
+    """
+    Run the given commands in order over the shared river-control connection.
+
+    Falls back to riverctl processes if river cannot be reached.
+    """
+    global _control
+    if _control is None:
+        try:
+            _control = RiverControl()
+        except (OSError, wayland.WaylandError):
+            return _run_riverctl_pool(commands)
+    try:
+        return _control.run(commands)
+    except (OSError, wayland.WaylandError) as error:
+        # the connection is unusable now, reconnect on the next call
+        _control.close()
+        _control = None
+        return [(args, str(error)) for args in commands]
+
+
+BACKENDS: dict[str, Callable[[list[list[str]]], Failures]] = {
+    "native": _run_native,
+    "riverctl": _run_riverctl,
+    "riverctl-pool": _run_riverctl_pool,
+}
+_backend: Optional[str] = os.environ.get("RIVER_UTILS_BACKEND")
+
+
+def set_backend(name: Optional[str]):
+    """
+    Choose how commands are sent to river.
+
+    •   native: over a persistent river-control connection
+    •   riverctl: by running one riverctl process per command
+    •   riverctl-pool: like riverctl, but with as many processes at once as
+        there are cores, keeping only the order that matters
+    •   None: native if river can be reached, riverctl-pool otherwise
+    """
+    global _backend
+    if name is not None and name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}, choose one of {list(BACKENDS)}")
+    _backend = name
+    # connect again on the next command, possibly to another compositor
+    disconnect()
+
+
+def disconnect():
+    """Close the river-control connection, the next command connects again."""
+    global _control
+    if _control is not None:
+        _control.close()
+        _control = None
+
+
+def _execute(commands: list[list[str]]) -> Failures:
+    """Run the given commands in order and return the failed ones."""
+    global _backend, _control
+    if _backend is None:
+        try:
+            _control = RiverControl()
+            _backend = "native"
+        except (OSError, wayland.WaylandError):
+            _backend = "riverctl-pool"
+    return BACKENDS[_backend](commands)
+
+
+def _report(failures: Failures):
+    for args, message in failures:
+        print(f"riverctl {shlex.join(args)} failed: {message}", file=sys.stderr)
+
+
+def _riverctl(*args: str):
+    """Send a command to river, or add it to the active batch."""
+    if _batch is not None:
+        _batch.add(list(args))
+        return
+
+    _report(_execute([list(args)]))
 
 
 def map(
@@ -22,14 +344,15 @@ def map(
     •   command: any command that may be run with riverctl
     """
     modifier_string = "+".join(modifiers)
-    riverctl_command = f"riverctl map {mode} {modifier_string} {key} {command}"
+    flags = []
     if release:
-        riverctl_command += " -release"
+        flags.append("-release")
     if repeat:
-        riverctl_command += " -repeat"
+        flags.append("-repeat")
+    args = ["map", *flags, mode, modifier_string, key, *shlex.split(command)]
 
-    print(riverctl_command)
-    os.system(riverctl_command)
+    print(f"riverctl {shlex.join(args)}")
+    _riverctl(*args)
 
 
 def map_pointer(
@@ -50,12 +373,12 @@ def map_pointer(
     """
     modifier_string = "+".join(modifiers)
 
-    os.system(f"riverctl map-pointer {mode} {modifier_string} {button} {action}")
+    _riverctl("map-pointer", mode, modifier_string, button, action)
 
 
 def declare_mode(name: str):
     """Create a new mode called name."""
-    os.system(f"riverctl declare-mode {name}")
+    _riverctl("declare-mode", name)
 
 
 def set_repeat(rate: int, delay: int):
@@ -63,7 +386,7 @@ def set_repeat(rate: int, delay: int):
     Set the keyboard repeat rate to rate key repeats per second and re‐
     peat delay to delay milliseconds.
     """
-    os.system(f"riverctl set-repeat {rate} {delay}")
+    _riverctl("set-repeat", str(rate), str(delay))
 
 
 def color(
@@ -76,7 +399,7 @@ def color(
 
     If relevant, can also add a suffix, e.g. to color the border of a focused window.
     """
-    riverctl_command = f"riverctl {object}-color"
+    riverctl_command = f"{object}-color"
     if suffix:
         if object == "border":
             riverctl_command += f"-{suffix}"
@@ -84,9 +407,8 @@ def color(
             raise ValueError(
                 f"There exists no suffix for the given object {object} to color!"
             )
-    riverctl_command += f" {color}"
 
-    os.system(riverctl_command)
+    _riverctl(riverctl_command, color)
 
 
 def add_filter(
@@ -101,14 +423,14 @@ def add_filter(
     - csd :: use client side decoration instead of the server side derocation
     - float :: do not tile the window
     """
-    os.system(f'riverctl {filter_type}-filter-add {identifier_type} "{identifier}"')
+    _riverctl(f"{filter_type}-filter-add", identifier_type, identifier)
 
 
 def set_default_layout(namespace: str):
     """Set the layout namespace to be used by all outputs by default."""
-    os.system(f"riverctl default-layout {namespace}")
+    _riverctl("default-layout", namespace)
 
 
 def set_current_layout(namespace: str):
     """Set the layout namespace of currently focused output, overriding the value set with default-layout if any."""
-    os.system(f"riverctl output-layout {namespace}")
+    _riverctl("output-layout", namespace)
@@ -1,5 +1,221 @@
+import functools
 import os
-from typing import Literal
+import sys
+from typing import Literal, Optional
+
+import river_utils
+import wayland
+
+# river_layout_manager_v3 requests
+MANAGER_GET_LAYOUT = 1
+# river_layout_v3 requests
+LAYOUT_DESTROY = 0
+LAYOUT_PUSH_VIEW_DIMENSIONS = 1
+LAYOUT_COMMIT = 2
+# river_layout_v3 events
+LAYOUT_NAMESPACE_IN_USE = 0
+LAYOUT_DEMAND = 1
+LAYOUT_USER_COMMAND = 2
+
+Geometry = tuple[tuple[int, int, int, int], ...]
+
+
+@functools.lru_cache(maxsize=1024)
+def compute_layout(
+    view_count: int,
+    width: int,
+    height: int,
+    view_padding: int,
+    outer_padding: int,
+    main_location: str,
+    main_count: int,
+    main_ratio: float,
+) -> Geometry:
+    """
+    Return (x, y, width, height) of every view, the same way rivertile lays them out.
+
+    The views are placed as if the main area was on the left, and then
+    mirrored or transposed into place. Results are cached, so a relayout
+    of a known configuration is a lookup.
+    """
+    if view_count == 0:
+        return ()
+
+    main_count = min(main_count, view_count)
+    secondary_count = view_count - main_count
+    horizontal = main_location in ("left", "right")
+    # the extent of the output along and across the main axis
+    extent, cross_extent = (width, height) if horizontal else (height, width)
+    usable_width = max(extent - 2 * outer_padding, 0)
+    usable_height = max(cross_extent - 2 * outer_padding, 0)
+
+    if secondary_count > 0:
+        main_width = int(main_ratio * usable_width)
+        secondary_width = usable_width - main_width
+        secondary_height, secondary_rest = divmod(usable_height, secondary_count)
+    else:
+        main_width = usable_width
+    main_height, main_rest = divmod(usable_height, main_count)
+
+    views = []
+    for index in range(view_count):
+        if index < main_count:
+            x = 0
+            y = index * main_height + (main_rest if index > 0 else 0)
+            view_width = main_width
+            view_height = main_height + (main_rest if index == 0 else 0)
+        else:
+            index -= main_count
+            x = main_width
+            y = index * secondary_height + (secondary_rest if index > 0 else 0)
+            view_width = secondary_width
+            view_height = secondary_height + (secondary_rest if index == 0 else 0)
+
+        x += outer_padding + view_padding
+        y += outer_padding + view_padding
+        view_width = max(view_width - 2 * view_padding, 0)
+        view_height = max(view_height - 2 * view_padding, 0)
+
+        if main_location == "left":
+            views.append((x, y, view_width, view_height))
+        elif main_location == "right":
+            views.append((extent - view_width - x, y, view_width, view_height))
+        elif main_location == "top":
+            views.append((y, x, view_height, view_width))
+        else:
+            views.append((y, extent - view_width - x, view_height, view_width))
+    return tuple(views)
+
+
+def clamp_parameters(parameters: dict):
+    """Limit the parameters to the values rivertile accepts."""
+    # rounded, so that stepping back and forth hits the same cached layouts
+    parameters["main-ratio"] = round(min(max(parameters["main-ratio"], 0.1), 0.9), 3)
+    parameters["main-count"] = max(parameters["main-count"], 1)
+    parameters["view-padding"] = max(parameters["view-padding"], 0)
+    parameters["outer-padding"] = max(parameters["outer-padding"], 0)
+
+
+def apply_user_command(parameters: dict, command: str):
+    """
+    Change parameters according to a command sent with send-layout-cmd.
+
+    Accepts the commands of rivertile, e.g. "main-ratio +0.05",
+    "main-count -1" or "main-location top". Numeric values starting with a
+    sign are relative to the current value.
+    """
+    name, _, value = command.strip().partition(" ")
+    value = value.strip()
+    if name not in parameters or not value:
+        print(f"Unknown layout command: {command}", file=sys.stderr)
+        return
+
+    if name == "main-location":
+        if value not in ("top", "bottom", "left", "right"):
+            print(f"Unknown main location: {value}", file=sys.stderr)
+            return
+        parameters[name] = value
+        return
+
+    parse = float if name == "main-ratio" else int
+    try:
+        number = parse(value)
+    except ValueError:
+        print(f"Invalid value for {name}: {value}", file=sys.stderr)
+        return
+    if value[0] in "+-":
+        number += parameters[name]
+    parameters[name] = number
+    clamp_parameters(parameters)
+
+
+class LayoutGenerator:
+    """
+    A layout generator implementing river-layout-v3 in Python.
+
+    Registers a layout for every output under namespace and answers
+    layout demands with compute_layout. Every output keeps its own copy of
+    the parameters, which are changed with send-layout-cmd.
+    """
+
+    def __init__(self, namespace: str, parameters: dict, path: Optional[str] = None):
+        self.namespace = namespace
+        self.parameters = dict(parameters)
+        clamp_parameters(self.parameters)
+        self.connection = wayland.Connection(path)
+        # output global name -> (layout id, parameters of that output)
+        self.outputs: dict[int, tuple[int, dict]] = {}
+
+        self.manager = self.connection.bind("river_layout_manager_v3", 1)
+        self.connection.on_global = self._on_global
+        self.connection.on_global_remove = self._on_global_remove
+        for name, (interface, version) in list(self.connection.globals.items()):
+            self._on_global(name, interface, version)
+        self.connection.flush()
+
+    def run(self):
+        while True:
+            self.connection.dispatch()
+
+    def _on_global(self, name: int, interface: str, version: int):
+        if interface != "wl_output":
+            return
+
+        output = self.connection.bind("wl_output", 1, name=name)
+        parameters = dict(self.parameters)
+        layout = self.connection.new_id()
+        self.connection.handlers[layout] = functools.partial(
+            self._on_layout_event, layout, parameters
+        )
+        self.outputs[name] = (layout, parameters)
+        self.connection.send(
+            self.manager, MANAGER_GET_LAYOUT, "uus", layout, output, self.namespace
+        )
+
+    def _on_global_remove(self, name: int):
+        if name in self.outputs:
+            layout, _ = self.outputs.pop(name)
+            self.connection.send(layout, LAYOUT_DESTROY)
+            self.connection.handlers.pop(layout, None)
+
+    def _on_layout_event(
+        self, layout: int, parameters: dict, opcode: int, payload: bytes
+    ):
+        if opcode == LAYOUT_NAMESPACE_IN_USE:
+            raise wayland.WaylandError(
+                f"The layout namespace {self.namespace} is already in use"
+            )
+
+        if opcode == LAYOUT_USER_COMMAND:
+            apply_user_command(parameters, wayland.unpack("s", payload)[0])
+            return
+
+        if opcode == LAYOUT_DEMAND:
+            view_count, width, height, _, serial = wayland.unpack("uuuuu", payload)
+            views = compute_layout(
+                view_count,
+                width,
+                height,
+                parameters["view-padding"],
+                parameters["outer-padding"],
+                parameters["main-location"],
+                parameters["main-count"],
+                parameters["main-ratio"],
+            )
+            for x, y, view_width, view_height in views:
+                self.connection.send(
+                    layout,
+                    LAYOUT_PUSH_VIEW_DIMENSIONS,
+                    "iiuuu",
+                    x,
+                    y,
+                    view_width,
+                    view_height,
+                    serial,
+                )
+            self.connection.send(
+                layout, LAYOUT_COMMIT, "su", parameters["main-location"], serial
+            )
 
 
 def start(
@@ -8,7 +224,16 @@ def start(
     main_location: Literal["top", "bottom", "left", "right"] = "left",
     main_count: int = 1,
     main_ratio: float = 0.6,
-):
+    namespace: str = "rivertile",
+    fallback: bool = True,
+) -> int:
+    """
+    Start the layout generator in a child process and return its pid.
+
+    The child runs LayoutGenerator without executing another program, and
+    only falls back to rivertile if river cannot be reached and fallback
+    is set.
+    """
     kwargs = {
         "view-padding": view_padding,
         "outer-padding": outer_padding,
@@ -16,8 +241,29 @@ def start(
         "main-count": main_count,
         "main-ratio": main_ratio,
     }
-    rivertile_command = "rivertile"
-    for key, value in kwargs.items():
-        rivertile_command += f" -{key} {value}"
+    pid = os.fork()
+    if pid != 0:
+        return pid
 
-    os.system(f"{rivertile_command} &")
+    # never return into the caller from the child process
+    try:
+        # the parent keeps using its river-control connection
+        river_utils.disconnect()
+        try:
+            generator = LayoutGenerator(namespace, kwargs)
+        except wayland.WaylandError as error:
+            if not fallback:
+                raise
+            print(
+                f"Cannot generate layouts, starting rivertile: {error}", file=sys.stderr
+            )
+            rivertile_command = ["rivertile"]
+            for key, value in kwargs.items():
+                rivertile_command += [f"-{key}", str(value)]
+            os.execvp("rivertile", rivertile_command)
+        generator.run()
+    except wayland.WaylandError as error:
+        # river exited or rejected the layout
+        print(f"Layout generator stopped: {error}", file=sys.stderr)
+    finally:
+        os._exit(1)
@@ -0,0 +1,311 @@
+"""Tests of the backends and the incremental apply of river_utils against FakeRiver."""
+
+import os
+import sys
+
+import pytest
+
+import fake_river
+import river_utils
+import wayland
+
+
+@pytest.fixture(autouse=True)
+def native_backend():
+    river_utils.set_backend("native")
+    yield
+    river_utils.set_backend(None)
+
+
+@pytest.fixture
+def river(monkeypatch):
+    with fake_river.FakeRiver() as river:
+        monkeypatch.setenv("WAYLAND_DISPLAY", river.path)
+        yield river
+
+
+def control_requests(river: fake_river.FakeRiver) -> list[tuple[int, str]]:
+    """(opcode, argument) of every zriver_control_v1 request, in the order received."""
+    requests = []
+    for interface, opcode, payload in river.messages:
+        if interface != "zriver_control_v1":
+            continue
+        if opcode == river_utils.CONTROL_ADD_ARGUMENT:
+            requests.append((opcode, wayland.unpack("s", payload)[0]))
+        else:
+            requests.append((opcode, ""))
+    return requests
+
+
+def test_batch_wire_messages(river):
+    with river_utils.batch():
+        river_utils.map(["Super"], "Return", "spawn alacritty")
+        river_utils.set_repeat(50, 300)
+
+    add, run = river_utils.CONTROL_ADD_ARGUMENT, river_utils.CONTROL_RUN_COMMAND
+    assert control_requests(river) == [
+        (add, "map"),
+        (add, "normal"),
+        (add, "Super"),
+        (add, "Return"),
+        (add, "spawn"),
+        (add, "alacritty"),
+        (run, ""),
+        (add, "set-repeat"),
+        (add, "50"),
+        (add, "300"),
+        (run, ""),
+    ]
+    # every command was sent over one connection, before the first reply
+    assert river.connections == 1
+    assert [args for _, args in river.commands] == [
+        ["map", "normal", "Super", "Return", "spawn", "alacritty"],
+        ["set-repeat", "50", "300"],
+    ]
+
+
+def test_declare_mode_is_sent_first(river):
+    with river_utils.batch():
+        river_utils.map(["Super"], "R", "enter-mode resize")
+        river_utils.declare_mode("resize")
+        river_utils.map(["None"], "Escape", "enter-mode normal", mode="resize")
+
+    assert [args[0] for _, args in river.commands] == ["declare-mode", "map", "map"]
+    # the other commands keep their order
+    assert river.commands[1][1][-1] == "resize"
+    assert river.commands[2][1][1] == "resize"
+
+
+def test_failures_are_reported_per_command(monkeypatch, capsys):
+    def fail(args):
+        return "unknown mode" if args[:2] == ["map", "missing"] else None
+
+    with fake_river.FakeRiver(fail=fail) as river:
+        monkeypatch.setenv("WAYLAND_DISPLAY", river.path)
+        with river_utils.batch() as batch:
+            river_utils.map(["Super"], "Q", "close")
+            river_utils.map(["Super"], "Q", "close", mode="missing")
+
+    assert batch.failures == [
+        (["map", "missing", "Super", "Q", "close"], "unknown mode"),
+    ]
+    assert "unknown mode" in capsys.readouterr().err
+
+
+def test_river_control_run_returns_failures(river):
+    river.fail = lambda args: "bad" if args[0] == "bad" else None
+    control = river_utils.RiverControl(river.path)
+    try:
+        assert control.run([["good"], ["bad", "1"], ["good"], ["bad", "2"]]) == [
+            (["bad", "1"], "bad"),
+            (["bad", "2"], "bad"),
+        ]
+    finally:
+        control.close()
+
+
+def test_native_backend_reconnects(monkeypatch):
+    with fake_river.FakeRiver() as first:
+        monkeypatch.setenv("WAYLAND_DISPLAY", first.path)
+        assert river_utils._run_native([["spawn", "foot"]]) == []
+        assert first.connections == 1
+
+    # first is gone, the commands fail and the connection is dropped
+    failures = river_utils._run_native([["spawn", "foot"], ["spawn", "emacs"]])
+    assert [args for args, _ in failures] == [["spawn", "foot"], ["spawn", "emacs"]]
+    assert river_utils._control is None
+
+    with fake_river.FakeRiver() as second:
+        monkeypatch.setenv("WAYLAND_DISPLAY", second.path)
+        assert river_utils._run_native([["spawn", "emacs"]]) == []
+        assert [args for _, args in second.commands] == [["spawn", "emacs"]]
+
+
+def test_native_backend_falls_back_to_riverctl(monkeypatch, tmp_path):
+    monkeypatch.setenv("WAYLAND_DISPLAY", str(tmp_path / "wayland-missing"))
+    started = []
+    monkeypatch.setattr(
+        river_utils, "_riverctl_process", lambda args: started.append(args)
+    )
+    assert river_utils._run_native([["spawn", "foot"]]) == []
+    assert started == [["spawn", "foot"]]
+    assert river_utils._control is None
+
+
+def sent(river: fake_river.FakeRiver) -> list[list[str]]:
+    """The commands river received since the last call."""
+    commands = [args for _, args in river.commands]
+    river.commands.clear()
+    return commands
+
+
+def test_apply_unmaps_removed_bindings(river, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    with river_utils.apply(snapshot):
+        river_utils.map(["Super"], "Q", "close")
+        river_utils.map(["Super"], "F", "toggle-fullscreen", release=True)
+    sent(river)
+
+    with river_utils.apply(snapshot):
+        river_utils.map(["Super"], "Q", "close")
+    assert sent(river) == [["unmap", "-release", "normal", "Super", "F"]]
+
+
+def test_apply_removes_removed_rules(river, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    with river_utils.apply(snapshot):
+        river_utils.add_filter("float", "app-id", "pavucontrol")
+        river_utils.add_filter("csd", "title", "popup")
+    sent(river)
+
+    with river_utils.apply(snapshot):
+        river_utils.add_filter("csd", "title", "popup")
+    assert sent(river) == [["float-filter-remove", "app-id", "pavucontrol"]]
+
+
+def configure():
+    river_utils.declare_mode("resize")
+    river_utils.map(["Super"], "Q", "close")
+    river_utils.map_pointer(["Super"], "BTN_LEFT", "move-view")
+    river_utils.set_repeat(50, 300)
+    river_utils.color("border", "0x5e81ac", "focused")
+    river_utils.add_filter("float", "app-id", "pavucontrol")
+    river_utils.set_default_layout("rivertile")
+
+
+def test_apply_does_not_resend_unchanged_settings(river, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    with river_utils.apply(snapshot):
+        configure()
+        river_utils._riverctl("spawn", "alacritty")
+    assert len(sent(river)) == 8
+
+    with river_utils.apply(snapshot):
+        configure()
+        river_utils._riverctl("spawn", "alacritty")
+    # commands that do not establish a setting are always sent
+    assert sent(river) == [["spawn", "alacritty"]]
+
+    with river_utils.apply(snapshot):
+        configure()
+        river_utils.set_repeat(40, 300)
+    assert sent(river) == [["set-repeat", "40", "300"]]
+
+
+def test_apply_does_not_save_failed_commands(river, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    river.fail = lambda args: "invalid rate" if args[0] == "set-repeat" else None
+    with river_utils.apply(snapshot) as batch:
+        configure()
+    assert [args for args, _ in batch.failures] == [["set-repeat", "50", "300"]]
+    sent(river)
+
+    river.fail = lambda args: None
+    with river_utils.apply(snapshot):
+        configure()
+    # only the command river rejected is sent again
+    assert sent(river) == [["set-repeat", "50", "300"]]
+
+
+def test_apply_ignores_snapshots_of_other_sessions(monkeypatch, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    with fake_river.FakeRiver() as first:
+        monkeypatch.setenv("WAYLAND_DISPLAY", first.path)
+        with river_utils.apply(snapshot):
+            configure()
+            river_utils.map(["Super"], "F", "toggle-fullscreen")
+    river_utils.set_backend("native")
+
+    with fake_river.FakeRiver() as second:
+        monkeypatch.setenv("WAYLAND_DISPLAY", second.path)
+        with river_utils.apply(snapshot):
+            configure()
+        # a new river knows nothing of the old configuration: nothing is
+        # unmapped and everything is sent again
+        assert len(sent(second)) == 7
+
+
+def test_stages_declare_modes_first():
+    declare = ["declare-mode", "resize"]
+    enter = ["map", "normal", "Super", "R", "enter-mode", "resize"]
+    leave = ["map", "resize", "None", "Escape", "enter-mode", "normal"]
+    assert list(river_utils._stages([enter, declare, leave])) == [
+        [[declare]],
+        [[enter], [leave]],
+    ]
+
+
+def test_stages_keep_the_order_of_a_setting():
+    slow = ["set-repeat", "20", "600"]
+    close = ["map", "normal", "Super", "Q", "close"]
+    fast = ["set-repeat", "50", "300"]
+    kill = ["map", "normal", "Super", "Q", "spawn", "xkill"]
+    border = ["border-width", "2"]
+    assert list(river_utils._stages([slow, close, fast, kill, border])) == [
+        [[slow, fast], [close, kill], [border]],
+    ]
+
+
+def test_stages_commands_without_identity_are_barriers():
+    before = ["set-repeat", "50", "300"]
+    spawn = ["spawn", "alacritty"]
+    layout = ["output-layout", "rivertile"]
+    after = ["map", "normal", "Super", "Q", "close"]
+    assert list(river_utils._stages([before, spawn, layout, after])) == [
+        [[before]],
+        [[spawn]],
+        [[layout]],
+        [[after]],
+    ]
+
+
+# runs a command over river-control in a process of its own, like riverctl
+RIVERCTL = """#!{python}
+import sys
+
+sys.path.insert(0, {here!r})
+import river_utils
+
+control = river_utils.RiverControl()
+for _, message in control.run([sys.argv[1:]]):
+    print(message, file=sys.stderr)
+    sys.exit(1)
+"""
+
+
+def test_riverctl_pool_against_fake_river(river, monkeypatch, tmp_path):
+    riverctl = tmp_path / "riverctl"
+    riverctl.write_text(
+        RIVERCTL.format(
+            python=sys.executable, here=os.path.dirname(river_utils.__file__)
+        )
+    )
+    riverctl.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    river.fail = lambda args: "unknown keysym" if "Nope" in args else None
+
+    modes = [["declare-mode", "resize"], ["declare-mode", "passthrough"]]
+    maps = [
+        ["map", mode, "Super", key, "spawn", "true"]
+        for mode in ("resize", "passthrough", "normal")
+        for key in ("H", "J", "K", "L")
+    ]
+    repeats = [["set-repeat", "20", "600"], ["set-repeat", "50", "300"]]
+    spawn = ["spawn", "alacritty"]
+    later = ["map", "normal", "Super", "Nope", "close"]
+    commands = [*maps[:6], repeats[0], *modes, *maps[6:], repeats[1], spawn, later]
+
+    failures = river_utils._run_riverctl_pool(commands)
+
+    assert failures == [(later, "unknown keysym")]
+    received = [args for _, args in sorted(river.commands, key=lambda item: item[0])]
+    assert sorted(map(tuple, received)) == sorted(map(tuple, commands))
+    position = {tuple(args): index for index, args in enumerate(received)}
+    for args in maps:
+        assert position[tuple(args)] > max(position[tuple(mode)] for mode in modes)
+    assert position[tuple(repeats[0])] < position[tuple(repeats[1])]
+    for args in commands:
+        if args is not spawn:
+            assert (position[tuple(args)] < position[tuple(spawn)]) == (
+                args is not later
+            )
@@ -0,0 +1,130 @@
+"""Tests of the layout generator of rivertile_utils, driven by FakeRiver."""
+
+import threading
+
+import pytest
+
+import fake_river
+import rivertile_utils
+import wayland
+
+WIDTH, HEIGHT = 1000, 600
+
+# the geometries rivertile pushes for 3 views on a 1000x600 output with
+# view and outer padding 6, main count 1 and main ratio 0.6
+RIVERTILE = {
+    "left": [(12, 12, 580, 576), (604, 12, 384, 282), (604, 306, 384, 282)],
+    "right": [(408, 12, 580, 576), (12, 12, 384, 282), (12, 306, 384, 282)],
+    "top": [(12, 12, 976, 340), (12, 364, 482, 224), (506, 364, 482, 224)],
+    "bottom": [(12, 248, 976, 340), (12, 12, 482, 224), (506, 12, 482, 224)],
+}
+
+
+def parameters(**changes) -> dict:
+    defaults = {
+        "view-padding": 6,
+        "outer-padding": 6,
+        "main-location": "left",
+        "main-count": 1,
+        "main-ratio": 0.6,
+    }
+    return {**defaults, **changes}
+
+
+@pytest.fixture
+def layout():
+    """Start a LayoutGenerator with the given parameters on a fresh FakeRiver."""
+    rivers, generators = [], []
+
+    def start(outputs: int = 1, **changes) -> fake_river.FakeRiver:
+        river = fake_river.FakeRiver(outputs=outputs).__enter__()
+        rivers.append(river)
+        generator = rivertile_utils.LayoutGenerator(
+            "rivertile", parameters(**changes), river.path
+        )
+
+        def run():
+            try:
+                generator.run()
+            except (OSError, wayland.WaylandError):
+                # FakeRiver stopped
+                pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        generators.append((generator, thread))
+        return river
+
+    yield start
+    for river in rivers:
+        river.stop()
+    for generator, thread in generators:
+        thread.join(timeout=5)
+        generator.connection.close()
+
+
+@pytest.mark.parametrize("location", RIVERTILE)
+def test_main_locations(layout, location):
+    river = layout(**{"main-location": location})
+    assert river.demand_layout(3, WIDTH, HEIGHT) == (location, RIVERTILE[location])
+
+
+def test_no_views(layout):
+    river = layout()
+    assert river.demand_layout(0, WIDTH, HEIGHT) == ("left", [])
+
+
+def test_uneven_split(layout):
+    river = layout()
+    # the first view of a stack gets the remaining pixel
+    assert river.demand_layout(3, WIDTH, HEIGHT + 1)[1] == [
+        (12, 12, 580, 577),
+        (604, 12, 384, 283),
+        (604, 307, 384, 282),
+    ]
+
+
+def test_main_count_above_view_count(layout):
+    river = layout(**{"main-count": 3})
+    assert river.demand_layout(2, WIDTH, HEIGHT)[1] == [
+        (12, 12, 976, 282),
+        (12, 306, 976, 282),
+    ]
+
+
+def test_main_ratio_command(layout):
+    river = layout()
+    river.send_layout_command("main-ratio +0.05")
+    assert river.demand_layout(3, WIDTH, HEIGHT)[1][:2] == [
+        (12, 12, 630, 576),
+        (654, 12, 334, 282),
+    ]
+
+
+def test_main_count_command(layout):
+    river = layout(**{"main-count": 2})
+    river.send_layout_command("main-count -1")
+    assert river.demand_layout(3, WIDTH, HEIGHT)[1] == RIVERTILE["left"]
+    # never below one main view
+    river.send_layout_command("main-count -1")
+    assert river.demand_layout(3, WIDTH, HEIGHT)[1] == RIVERTILE["left"]
+
+
+def test_main_location_command(layout):
+    river = layout()
+    river.send_layout_command("main-location bottom")
+    assert river.demand_layout(3, WIDTH, HEIGHT) == ("bottom", RIVERTILE["bottom"])
+
+
+def test_outputs_have_their_own_parameters(layout):
+    river = layout(outputs=2)
+    river.send_layout_command("main-location right", output=1)
+    assert river.demand_layout(3, WIDTH, HEIGHT, output=0)[1] == RIVERTILE["left"]
+    assert river.demand_layout(3, WIDTH, HEIGHT, output=1)[1] == RIVERTILE["right"]
+
+
+def test_parameters_are_clamped(layout):
+    river = layout(**{"main-count": 0, "main-ratio": 2.0})
+    assert river.demand_layout(3, WIDTH, HEIGHT)[1] == list(
+        rivertile_utils.compute_layout(3, WIDTH, HEIGHT, 6, 6, "left", 1, 0.9)
+    )
@@ -0,0 +1,262 @@
+"""
+A minimal Wayland wire protocol client.
+
+Only what is needed to talk to river's own protocols is implemented:
+encoding and decoding of messages, the display and registry objects and
+buffered, pipelined sending of requests. File descriptor passing is not
+supported.
+"""
+
+import os
+import socket
+import struct
+from typing import Any, Callable, Optional
+
+DISPLAY_ID = 1
+
+# wl_display
+DISPLAY_SYNC = 0
+DISPLAY_GET_REGISTRY = 1
+DISPLAY_ERROR = 0
+DISPLAY_DELETE_ID = 1
+
+# wl_registry
+REGISTRY_BIND = 0
+REGISTRY_GLOBAL = 0
+REGISTRY_GLOBAL_REMOVE = 1
+
+# wl_callback
+CALLBACK_DONE = 0
+
+_HEADER = struct.Struct("=II")
+_WORD = struct.Struct("=I")
+_INT = struct.Struct("=i")
+
+
+class WaylandError(Exception):
+    pass
+
+
+def socket_path(environ: Optional[dict] = None) -> str:
+    """Return the path of the compositor socket described by the environment."""
+    environ = os.environ if environ is None else environ
+    display = environ.get("WAYLAND_DISPLAY")
+    if not display:
+        raise WaylandError("WAYLAND_DISPLAY is not set")
+    if os.path.isabs(display):
+        return display
+    runtime_dir = environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        raise WaylandError("XDG_RUNTIME_DIR is not set")
+    return os.path.join(runtime_dir, display)
+
+
+def pack(signature: str, *args: Any) -> bytes:
+    """
+    Encode args according to signature.
+
+    Every character of the signature describes one argument:
+    - i :: int
+    - u :: uint, object or new_id
+    - f :: fixed, given as float
+    - s :: string (None for a null string)
+    - a :: array, given as bytes
+    """
+    data = bytearray()
+    for kind, arg in zip(signature, args, strict=True):
+        if kind == "i":
+            data += _INT.pack(arg)
+        elif kind == "u":
+            data += _WORD.pack(arg)
+        elif kind == "f":
+            data += _INT.pack(round(arg * 256))
+        elif kind in "sa":
+            if arg is None:
+                data += _WORD.pack(0)
+                continue
+            raw = arg.encode() + b"\0" if kind == "s" else bytes(arg)
+            data += _WORD.pack(len(raw))
+            data += raw + b"\0" * (-len(raw) % 4)
+        else:
+            raise ValueError(f"Unknown argument type {kind}")
+    return bytes(data)
+
+
+def unpack(signature: str, payload: bytes) -> list:
+    """Decode a message payload according to signature, see pack."""
+    args: list = []
+    offset = 0
+    for kind in signature:
+        if kind == "i":
+            args.append(_INT.unpack_from(payload, offset)[0])
+            offset += 4
+        elif kind == "u":
+            args.append(_WORD.unpack_from(payload, offset)[0])
+            offset += 4
+        elif kind == "f":
+            args.append(_INT.unpack_from(payload, offset)[0] / 256)
+            offset += 4
+        elif kind in "sa":
+            (length,) = _WORD.unpack_from(payload, offset)
+            offset += 4
+            raw = payload[offset : offset + length]
+            offset += length + (-length % 4)
+            if kind == "a":
+                args.append(raw)
+            else:
+                args.append(raw[:-1].decode() if length else None)
+        else:
+            raise ValueError(f"Unknown argument type {kind}")
+    return args
+
+
+def message(object_id: int, opcode: int, payload: bytes = b"") -> bytes:
+    """Prefix payload with the message header."""
+    return _HEADER.pack(object_id, (len(payload) + 8) << 16 | opcode) + payload
+
+
+def split_messages(buffer: bytearray) -> list[tuple[int, int, bytes]]:
+    """Remove all complete messages from buffer and return them."""
+    messages = []
+    while len(buffer) >= 8:
+        object_id, size_opcode = _HEADER.unpack_from(buffer)
+        size = size_opcode >> 16
+        if size < 8:
+            raise WaylandError(f"Invalid message size {size}")
+        if len(buffer) < size:
+            break
+        messages.append((object_id, size_opcode & 0xFFFF, bytes(buffer[8:size])))
+        del buffer[:size]
+    return messages
+
+
+Handler = Callable[[int, bytes], None]
+
+
+class Connection:
+    """
+    A client connection to a Wayland compositor.
+
+    Requests are buffered by send and only written on flush, so that many
+    requests can be pipelined without waiting for replies. Events are
+    dispatched to the handler registered for the receiving object.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(path or socket_path())
+        except OSError as error:
+            self.socket.close()
+            raise WaylandError(f"Could not connect to the compositor: {error}")
+
+        self._next_id = DISPLAY_ID + 1
+        self._output = bytearray()
+        self._input = bytearray()
+        self.handlers: dict[int, Handler] = {DISPLAY_ID: self._handle_display}
+        # name -> (interface, version) of every global announced by the compositor
+        self.globals: dict[int, tuple[str, int]] = {}
+        # called with name, interface and version of globals added later on
+        self.on_global: Optional[Callable[[int, str, int], None]] = None
+        # called with the name of removed globals
+        self.on_global_remove: Optional[Callable[[int], None]] = None
+
+        self.registry = self.new_id(self._handle_registry)
+        self.send(DISPLAY_ID, DISPLAY_GET_REGISTRY, "u", self.registry)
+        try:
+            self.roundtrip()
+        except (OSError, WaylandError):
+            self.socket.close()
+            raise
+
+    def new_id(self, handler: Optional[Handler] = None) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        if handler is not None:
+            self.handlers[object_id] = handler
+        return object_id
+
+    def send(self, object_id: int, opcode: int, signature: str = "", *args: Any):
+        self._output += message(object_id, opcode, pack(signature, *args))
+
+    def flush(self):
+        if self._output:
+            self.socket.sendall(self._output)
+            self._output.clear()
+
+    def dispatch(self):
+        """Block until at least one event was received and dispatch all received events."""
+        self.flush()
+        data = self.socket.recv(65536)
+        if not data:
+            raise WaylandError("The compositor closed the connection")
+        self._input += data
+        for object_id, opcode, payload in split_messages(self._input):
+            handler = self.handlers.get(object_id)
+            if handler is not None:
+                handler(opcode, payload)
+
+    def roundtrip(self):
+        """Wait until the compositor processed all requests sent so far."""
+        done = []
+        callback = self.new_id(lambda opcode, payload: done.append(True))
+        self.send(DISPLAY_ID, DISPLAY_SYNC, "u", callback)
+        while not done:
+            self.dispatch()
+
+    def find_global(self, interface: str) -> Optional[tuple[int, int]]:
+        """Return name and version of the first global implementing interface."""
+        for name, (global_interface, version) in self.globals.items():
+            if global_interface == interface:
+                return name, version
+        return None
+
+    def bind(
+        self,
+        interface: str,
+        version: int,
+        handler: Optional[Handler] = None,
+        name: Optional[int] = None,
+    ) -> int:
+        """Bind the global called name, or the first one implementing interface."""
+        if name is None:
+            found = self.find_global(interface)
+            if found is None:
+                raise WaylandError(f"The compositor does not support {interface}")
+            name, available = found
+        else:
+            available = self.globals[name][1]
+        object_id = self.new_id(handler)
+        self.send(
+            self.registry,
+            REGISTRY_BIND,
+            "usuu",
+            name,
+            interface,
+            min(version, available),
+            object_id,
+        )
+        return object_id
+
+    def close(self):
+        self.socket.close()
+
+    def _handle_display(self, opcode: int, payload: bytes):
+        if opcode == DISPLAY_ERROR:
+            object_id, code, error = unpack("uus", payload)
+            raise WaylandError(f"Error {code} on object {object_id}: {error}")
+        if opcode == DISPLAY_DELETE_ID:
+            (object_id,) = unpack("u", payload)
+            self.handlers.pop(object_id, None)
+
+    def _handle_registry(self, opcode: int, payload: bytes):
+        if opcode == REGISTRY_GLOBAL:
+            name, interface, version = unpack("usu", payload)
+            self.globals[name] = (interface, version)
+            if self.on_global is not None:
+                self.on_global(name, interface, version)
+        elif opcode == REGISTRY_GLOBAL_REMOVE:
+            (name,) = unpack("u", payload)
+            self.globals.pop(name, None)
+            if self.on_global_remove is not None:
+                self.on_global_remove(name)